@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Chrome 启动配置基准：对比 default 与 lean (见 web_monitor.chrome_profile) 的
+内存 (RSS)、CPU 占用和会话列表扫描延迟，用来估算单机可承载的账号数。
+
+两个配置依次使用同一个 Chrome 用户目录运行，先用任一配置扫码登录一次即可：
+
+    python bench_chrome_profile.py --config wechat_auto_service_v2/config.json --duration 60
+
+仅支持 Linux (通过 /proc 统计 chromedriver 及其子进程)。
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+
+from modules.proc_stats import tree_usage
+from modules.web_monitor import WebMonitor
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def run_profile(profile: str, monitor_cfg: dict, duration: float, warmup: float, scan_interval: float) -> dict:
+    logger = logging.getLogger(f"bench.{profile}")
+    cfg = dict(monitor_cfg)
+    cfg["chrome_profile"] = profile
+    monitor = WebMonitor(logger=logger, ai_model=None, config=cfg)
+    if not monitor.initialize():
+        return {"profile": profile, "error": "initialize/login failed"}
+    try:
+        root_pid = monitor.browser_pid()
+        time.sleep(max(0.0, warmup))
+
+        start = tree_usage(root_pid)
+        started_at = time.perf_counter()
+        latencies_ms: list[float] = []
+        rss_samples: list[float] = []
+        failures = 0
+        next_sample = 0.0
+        while time.perf_counter() - started_at < duration:
+            t0 = time.perf_counter()
+            snapshot = monitor.get_chat_list_snapshot()
+            latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+            if snapshot is None:
+                failures += 1
+            if time.perf_counter() >= next_sample:
+                rss_samples.append(tree_usage(root_pid)["rss_mb"])
+                next_sample = time.perf_counter() + 1.0
+            time.sleep(max(0.0, scan_interval))
+        wall = time.perf_counter() - started_at
+        end = tree_usage(root_pid)
+
+        return {
+            "profile": profile,
+            "processes": end["processes"],
+            "rss_mb_avg": round(sum(rss_samples) / len(rss_samples), 1) if rss_samples else 0.0,
+            "rss_mb_peak": max(rss_samples) if rss_samples else 0.0,
+            "cpu_pct": round(100.0 * (end["cpu_sec"] - start["cpu_sec"]) / wall, 1) if wall > 0 else 0.0,
+            "scans": len(latencies_ms),
+            "scan_failures": failures,
+            "scan_ms_p50": round(_percentile(latencies_ms, 50), 2),
+            "scan_ms_p95": round(_percentile(latencies_ms, 95), 2),
+            "scan_ms_max": round(max(latencies_ms), 2) if latencies_ms else 0.0,
+        }
+    finally:
+        monitor.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare Chrome profiles (RSS / CPU / scan latency)")
+    parser.add_argument("--config", default="wechat_auto_service_v2/config.json",
+                        help="v2 config (uses its web_monitor section) or a bare web_monitor dict")
+    parser.add_argument("--profiles", default="default,lean")
+    parser.add_argument("--duration", type=float, default=60.0, help="measurement seconds per profile")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds to settle after login")
+    parser.add_argument("--scan-interval", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux"):
+        print("bench_chrome_profile.py needs /proc (Linux).", file=sys.stderr)
+        return 2
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    monitor_cfg = dict(raw.get("web_monitor") or raw)
+    # The benchmark only reads the chat list; never reply to anything.
+    monitor_cfg["observer_enabled"] = False
+
+    results = []
+    for profile in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        print(f"[bench] {profile}: measuring {args.duration:.0f}s ...", file=sys.stderr)
+        results.append(run_profile(profile, monitor_cfg, args.duration, args.warmup, args.scan_interval))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+
+    columns = ["profile", "processes", "rss_mb_avg", "rss_mb_peak", "cpu_pct",
+               "scans", "scan_failures", "scan_ms_p50", "scan_ms_p95", "scan_ms_max"]
+    print("  ".join(f"{c:>13}" for c in columns))
+    for row in results:
+        if "error" in row:
+            print(f"{row['profile']:>13}  {row['error']}")
+            continue
+        print("  ".join(f"{str(row.get(c, '')):>13}" for c in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
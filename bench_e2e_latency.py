@@ -0,0 +1,456 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+端到端延迟基准：在本地模拟的微信网页 (modules/mock_wechat_web.py) 上用无界面 Chrome 驱动
+WebMonitor 或 WeChatAutoRuntime，按设定速率注入入站消息并发送回复，统计：
+
+- 检测延迟：消息注入 -> 监控回调 (monitor) / 进入网关 outbox (runtime)
+- 发送延迟：发起发送 -> 页面发出 (mock 服务收到)，以及发起发送 -> 发送完成 (ACK / 任务结束)
+- 每条消息的 WebDriver 往返次数 (按命令细分)、吞吐量、Chrome 进程树 CPU
+
+不需要真实微信账号，任何装有 Chrome 的 Linux 机器上结果可复现：
+
+    python bench_e2e_latency.py --mode both --contacts 20 --rate 2 --send-rate 1 --duration 60
+
+--config 可指定 v2 配置，沿用其中的 web_monitor / send 设置 (页面地址、Chrome 目录等会被覆盖)。
+--script 可指定 JSON 时间线代替随机流量：[{"at": 0.5, "contact": "bench_user_001", "count": 3}, ...]
+"""
+
+import argparse
+import json
+import logging
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from modules.mock_wechat_web import MockWeChatServer, SentMessage, TrafficGenerator, extract_tokens, make_contacts
+from modules.proc_stats import tree_usage
+from modules.web_monitor import WebMonitor
+from wechat_auto_service_v2.runtime import WeChatAutoRuntime
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def _summary(values_ms: list[float]) -> dict:
+    return {
+        "count": len(values_ms),
+        "p50": round(_percentile(values_ms, 50), 1),
+        "p95": round(_percentile(values_ms, 95), 1),
+        "p99": round(_percentile(values_ms, 99), 1),
+        "max": round(max(values_ms), 1) if values_ms else 0.0,
+        "mean": round(sum(values_ms) / len(values_ms), 1) if values_ms else 0.0,
+    }
+
+
+class RoundTripCounter:
+    """Counts WebDriver commands (one HTTP round trip to chromedriver each) by wrapping `driver.execute`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def attach(self, driver) -> None:
+        original = driver.execute
+
+        def execute(driver_command, params=None):
+            with self._lock:
+                self._counts[driver_command] += 1
+            return original(driver_command, params)
+
+        driver.execute = execute
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self._counts)
+
+
+class LatencyRecorder:
+    """Matches benchmark tokens between injections, detections, the mock server and send completions."""
+
+    def __init__(self, generator: TrafficGenerator):
+        self.generator = generator
+        self._lock = threading.Lock()
+        self.detected: dict[str, float] = {}
+        self.duplicates = 0
+        self._send_token = 0
+        self.sends: dict[str, dict] = {}
+
+    def on_detect(self, text: str) -> None:
+        now = time.time()
+        with self._lock:
+            for token in extract_tokens(text):
+                if not token.startswith("[bench-"):
+                    continue
+                if token in self.detected:
+                    self.duplicates += 1
+                else:
+                    self.detected[token] = now
+
+    def on_server_send(self, sent: SentMessage) -> None:
+        with self._lock:
+            for token in extract_tokens(sent.text):
+                entry = self.sends.get(token)
+                if entry is not None and "visible" not in entry:
+                    entry["visible"] = sent.received_at
+
+    def new_send(self) -> str:
+        with self._lock:
+            self._send_token += 1
+            token = f"[send-{self._send_token:06d}]"
+            self.sends[token] = {"started": time.time()}
+            return token
+
+    def finish_send(self, token: str, state: str) -> None:
+        with self._lock:
+            entry = self.sends.get(token)
+            if entry is not None:
+                entry["done"] = time.time()
+                entry["state"] = state
+
+    def pending(self) -> int:
+        with self._lock:
+            undetected = sum(1 for t in self.generator.injected if t not in self.detected)
+            unfinished = sum(1 for e in self.sends.values() if "done" not in e)
+        return undetected + unfinished
+
+    def report(self) -> dict:
+        with self._lock:
+            injected = dict(self.generator.injected)
+            detect_ms = [
+                (self.detected[token] - msg.injected_at) * 1000.0 for token, msg in injected.items() if token in self.detected
+            ]
+            sends = [dict(e) for e in self.sends.values()]
+            duplicates = self.duplicates
+        visible_ms = [(e["visible"] - e["started"]) * 1000.0 for e in sends if "visible" in e]
+        done_ms = [(e["done"] - e["started"]) * 1000.0 for e in sends if "done" in e]
+        return {
+            "inbound_injected": len(injected),
+            "inbound_detected": len(detect_ms),
+            "inbound_missed": len(injected) - len(detect_ms),
+            "inbound_duplicates": duplicates,
+            "detect_ms": _summary(detect_ms),
+            "sends_started": len(sends),
+            "sends_visible": len(visible_ms),
+            "send_states": dict(Counter(e.get("state", "unfinished") for e in sends)),
+            "send_visible_ms": _summary(visible_ms),
+            "send_done_ms": _summary(done_ms),
+        }
+
+
+def _send_loop(
+    recorder: LatencyRecorder,
+    targets: list[str],
+    rate_per_sec: float,
+    duration_sec: float,
+    send_fn: Callable[[str, str], str],
+    pool: ThreadPoolExecutor,
+    stop: threading.Event,
+    seed: Optional[int],
+) -> None:
+    """Poisson send arrivals; each send runs in the pool so a slow send does not delay the next arrival."""
+    if rate_per_sec <= 0 or not targets:
+        return
+    rng = random.Random(seed)
+    deadline = time.time() + duration_sec
+
+    def _one(contact: str, token: str) -> None:
+        try:
+            state = send_fn(contact, f"{token} reply to {contact}")
+        except Exception as exc:
+            state = f"error:{type(exc).__name__}"
+        recorder.finish_send(token, state)
+
+    while not stop.is_set():
+        delay = rng.expovariate(rate_per_sec)
+        if time.time() + delay >= deadline or stop.wait(delay):
+            return
+        pool.submit(_one, rng.choice(targets), recorder.new_send())
+
+
+def _run_window(
+    args,
+    mode: str,
+    generator: TrafficGenerator,
+    recorder: LatencyRecorder,
+    counter: RoundTripCounter,
+    send_fn: Callable[[str, str], str],
+    browser_pid: Optional[int],
+) -> dict:
+    targets = [c.name for c in generator.contacts if not c.is_group]
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, args.send_workers), thread_name_prefix=f"bench_send[{mode}]")
+    script = TrafficGenerator.load_script(args.script) if args.script else None
+
+    counter.reset()
+    usage_start = tree_usage(browser_pid)
+    started = time.time()
+    inject_thread = threading.Thread(
+        target=(lambda: generator.run_script(script, stop)) if script else (lambda: generator.run(args.duration, stop)),
+        daemon=True,
+        name="bench_inject",
+    )
+    send_thread = threading.Thread(
+        target=_send_loop,
+        args=(recorder, targets, args.send_rate, args.duration, send_fn, pool, stop, args.seed),
+        daemon=True,
+        name="bench_send_loop",
+    )
+    try:
+        inject_thread.start()
+        send_thread.start()
+        inject_thread.join()
+        send_thread.join()
+        drain_deadline = time.time() + max(0.0, args.drain)
+        while recorder.pending() and time.time() < drain_deadline:
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        stop.set()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
+    wall = time.time() - started
+    usage_end = tree_usage(browser_pid)
+    commands = counter.snapshot()
+
+    result = {"mode": mode, "window_sec": round(wall, 1)}
+    result.update(recorder.report())
+    handled = result["inbound_detected"] + result["sends_visible"]
+    total_commands = sum(commands.values())
+    result.update({
+        "inbound_per_sec": round(result["inbound_detected"] / wall, 2) if wall > 0 else 0.0,
+        "sends_per_sec": round(result["sends_visible"] / wall, 2) if wall > 0 else 0.0,
+        "webdriver_round_trips": total_commands,
+        "round_trips_per_message": round(total_commands / handled, 1) if handled else None,
+        "round_trips_per_sec": round(total_commands / wall, 1) if wall > 0 else 0.0,
+        "top_commands": dict(commands.most_common(8)),
+        "chrome_cpu_pct": round(100.0 * (usage_end["cpu_sec"] - usage_start["cpu_sec"]) / wall, 1) if wall > 0 else 0.0,
+        "chrome_rss_mb": usage_end["rss_mb"],
+    })
+    return result
+
+
+def bench_monitor(args, server: MockWeChatServer, monitor_cfg: dict) -> dict:
+    """WebMonitor alone: detection = message callback, send = send_message_with_ack_result."""
+    generator = TrafficGenerator(server, args.rate, hot_contacts=args.hot_contacts, mention=_mention(monitor_cfg), seed=args.seed)
+    recorder = LatencyRecorder(generator)
+    server.on_send = recorder.on_server_send
+
+    def _on_message(message_data: dict) -> None:
+        recorder.on_detect(message_data.get("content") or "")
+        return None
+
+    monitor = WebMonitor(logger=logging.getLogger("bench.monitor"), ai_model=None, config=monitor_cfg, message_callback=_on_message)
+    if not monitor.initialize():
+        return {"mode": "monitor", "error": "initialize failed (is Chrome installed?)"}
+    counter = RoundTripCounter()
+    counter.attach(monitor.driver)
+    try:
+        threading.Thread(target=monitor.monitor_messages, daemon=True, name="bench_monitor_loop").start()
+        time.sleep(max(0.0, args.warmup))
+
+        def _send(contact: str, text: str) -> str:
+            return monitor.send_message_with_ack_result(contact, text, ack_timeout_sec=args.ack_timeout).state
+
+        monitor.driver_profile(reset=True)
+        result = _run_window(args, "monitor", generator, recorder, counter, _send, monitor.browser_pid())
+        _attach_driver_profile(result, monitor)
+        return result
+    finally:
+        monitor.close()
+
+
+def bench_runtime(args, server: MockWeChatServer, monitor_cfg: dict, send_cfg: dict) -> dict:
+    """Full gateway runtime: detection = payload in the WS outbox, send = enqueue_text job lifecycle."""
+    generator = TrafficGenerator(server, args.rate, hot_contacts=args.hot_contacts, mention=_mention(monitor_cfg), seed=args.seed)
+    recorder = LatencyRecorder(generator)
+    server.on_send = recorder.on_server_send
+
+    runtime = WeChatAutoRuntime({
+        "bot": {"wxid": "wxid_bench", "nickname": "bench"},
+        "web_monitor": monitor_cfg,
+        "send": send_cfg,
+        "merge": {"enabled": bool(args.merge)},
+    })
+    if not runtime.start_automation():
+        return {"mode": "runtime", "error": "start_automation failed (is Chrome installed?)"}
+    account = runtime.account()
+    monitor = account._web_monitor
+    counter = RoundTripCounter()
+    counter.attach(monitor.driver)
+    stop = threading.Event()
+
+    def _consume_outbox() -> None:
+        # Stands in for ws_broadcast_loop: what LangBot would receive.
+        while not stop.is_set():
+            try:
+                item = runtime._outbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            for msg in item.payload.get("messages") or []:
+                recorder.on_detect(msg.get("content") or "")
+
+    def _send(contact: str, text: str) -> str:
+        ok, job_id = runtime.enqueue_text(contact, text)
+        if not ok:
+            return "not_queued"
+        while not stop.is_set():
+            job = runtime.get_send_job(job_id)
+            if job and job["done"]:
+                return job["state"]
+            time.sleep(0.005)
+        return "unfinished"
+
+    consumer = threading.Thread(target=_consume_outbox, daemon=True, name="bench_outbox")
+    consumer.start()
+    try:
+        time.sleep(max(0.0, args.warmup))
+        monitor.driver_profile(reset=True)
+        result = _run_window(args, "runtime", generator, recorder, counter, _send, monitor.browser_pid())
+        _attach_driver_profile(result, monitor)
+        result["runtime_stats"] = {k: v for k, v in account.snapshot_stats().items() if k != "monitor"}
+        return result
+    finally:
+        stop.set()
+        runtime.stop_automation()
+
+
+def _attach_driver_profile(result: dict, monitor: WebMonitor) -> None:
+    profile = monitor.driver_profile()
+    if profile is not None:
+        result["driver_profile"] = {"units": profile["units"], "by_method": profile["by_method"]}
+
+
+def _mention(monitor_cfg: dict) -> str:
+    return str(monitor_cfg.get("bot_group_nickname", "机器人小助手botAI"))
+
+
+def _print_table(results: list[dict]) -> None:
+    for row in results:
+        print(f"== {row.get('mode')} ==")
+        if "error" in row:
+            print(f"  error: {row['error']}")
+            continue
+        for key in ("detect_ms", "send_visible_ms", "send_done_ms"):
+            s = row[key]
+            print(f"  {key:<16} n={s['count']:<5} p50={s['p50']:<8} p95={s['p95']:<8} p99={s['p99']:<8} max={s['max']}")
+        print(
+            f"  inbound  injected={row['inbound_injected']} detected={row['inbound_detected']} "
+            f"missed={row['inbound_missed']} duplicates={row['inbound_duplicates']} ({row['inbound_per_sec']}/s)"
+        )
+        print(f"  sends    started={row['sends_started']} visible={row['sends_visible']} ({row['sends_per_sec']}/s) states={row['send_states']}")
+        print(
+            f"  webdriver round trips={row['webdriver_round_trips']} per_message={row['round_trips_per_message']} "
+            f"per_sec={row['round_trips_per_sec']}"
+        )
+        print(f"  top commands {row['top_commands']}")
+        profile = row.get("driver_profile")
+        if profile:
+            for kind, u in sorted(profile["units"].items()):
+                print(
+                    f"  per {kind:<8} n={u['units']:<5} round trips avg={u['commands_avg']} p95={u['commands_p95']} "
+                    f"wire={u['wire_ms_avg']}ms of {u['wall_ms_avg']}ms"
+                )
+            for name, m in list(profile["by_method"].items())[:8]:
+                print(f"  method {name:<28} n={m['count']:<6} total={m['total_ms']}ms avg={m['avg_ms']}ms {m['commands']}")
+        print(f"  chrome cpu={row['chrome_cpu_pct']}% rss={row['chrome_rss_mb']}MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark against a local mock of WeChat Web")
+    parser.add_argument("--mode", choices=["monitor", "runtime", "both"], default="both")
+    parser.add_argument("--config", default="", help="optional v2 config; its web_monitor/send sections are reused")
+    parser.add_argument("--contacts", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=0)
+    parser.add_argument("--hot-contacts", type=int, default=0, help="route most traffic to this many busy chats")
+    parser.add_argument("--rate", type=float, default=2.0, help="inbound messages per second (Poisson)")
+    parser.add_argument("--send-rate", type=float, default=1.0, help="outgoing sends per second (0 = none)")
+    parser.add_argument("--send-workers", type=int, default=8)
+    parser.add_argument("--ack-timeout", type=float, default=3.0, help="monitor mode ACK wait (seconds)")
+    parser.add_argument("--ack-delay-ms", type=float, default=120.0, help="mock server delay before confirming a send")
+    parser.add_argument("--send-fail-rate", type=float, default=0.0)
+    parser.add_argument("--merge", action="store_true", help="runtime mode: keep inbound merging enabled")
+    parser.add_argument("--script", default="", help="JSON timeline of inbound messages instead of random traffic")
+    parser.add_argument("--duration", type=float, default=60.0, help="measurement seconds per mode")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--drain", type=float, default=10.0, help="max seconds to wait for stragglers")
+    parser.add_argument("--profile", default="lean", help="chrome_profile (default | lean)")
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--driver-profile", action="store_true", help="break WebDriver round trips down by WebMonitor method")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    raw: dict = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    base_monitor = dict(raw.get("web_monitor") or {})
+    send_cfg = dict(raw.get("send") or {})
+
+    modes = ["monitor", "runtime"] if args.mode == "both" else [args.mode]
+    results = []
+    for mode in modes:
+        server = MockWeChatServer(
+            make_contacts(args.contacts, args.groups),
+            ack_delay_ms=args.ack_delay_ms,
+            send_fail_rate=args.send_fail_rate,
+            seed=args.seed,
+        )
+        url = server.start()
+        profile_dir = tempfile.mkdtemp(prefix=f"wechat_bench_{mode}_")
+        monitor_cfg = dict(base_monitor)
+        monitor_cfg.update({
+            "wechat_web_url": url,
+            "user_data_dir": profile_dir,
+            "chrome_profile": args.profile,
+            "chrome_headless": not args.headed,
+            "chrome_debug_port": 0,
+            "watchdog_enabled": False,
+            "contact_list_mode": "blacklist",
+            "contact_blacklist": [],
+            "trigger_keywords": [],
+            "driver_profiler_enabled": bool(args.driver_profile),
+            "driver_profiler_log_interval_sec": 0,
+        })
+        print(f"[bench] {mode}: mock page {url}, measuring {args.duration:.0f}s ...", file=sys.stderr)
+        try:
+            if mode == "monitor":
+                results.append(bench_monitor(args, server, monitor_cfg))
+            else:
+                results.append(bench_runtime(args, server, monitor_cfg, send_cfg))
+        finally:
+            server.stop()
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        _print_table(results)
+    return 0 if all("error" not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from modules.driver_scheduler import PRIORITY_HOUSEKEEPING, CancelledError
+from modules.proc_stats import tree_usage
+
+
+class BrowserWatchdog:
+    """
+    Memory watchdog running next to `WebMonitor.monitor_messages`.
+
+    - Every `interval_sec` samples CDP `Performance.getMetrics` (JS heap, DOM nodes, listeners)
+      and the RSS of the chromedriver/Chrome process tree.
+    - After `breach_samples` consecutive samples over a threshold, waits for a quiet window
+      (no chat activity for `quiet_sec` and `quiet_check()` true, e.g. send queue drained),
+      then asks the monitor to recycle the browser on the same user_data_dir (login reused).
+    - If no quiet window shows up within `force_after_sec`, recycles anyway.
+    """
+
+    def __init__(self, monitor, config: dict, logger, quiet_check: Optional[Callable[[], bool]] = None):
+        self.monitor = monitor
+        self.logger = logger
+        self.quiet_check = quiet_check
+        cfg = config or {}
+        self.interval_sec = max(1.0, float(cfg.get("watchdog_interval_sec", 60)))
+        self.max_rss_mb = float(cfg.get("watchdog_max_rss_mb", 1500))
+        self.max_js_heap_mb = float(cfg.get("watchdog_max_js_heap_mb", 512))
+        self.max_dom_nodes = int(cfg.get("watchdog_max_dom_nodes", 200000))
+        self.max_uptime_hours = float(cfg.get("watchdog_max_uptime_hours", 0))  # 0 = no age limit
+        self.breach_samples = max(1, int(cfg.get("watchdog_breach_samples", 2)))
+        self.quiet_sec = max(0.0, float(cfg.get("watchdog_quiet_sec", 30)))
+        self.force_after_sec = max(0.0, float(cfg.get("watchdog_force_after_sec", 900)))
+        self.drain_timeout_sec = max(0.0, float(cfg.get("watchdog_drain_timeout_sec", 30)))
+        self.sample_timeout_sec = max(0.5, float(cfg.get("watchdog_sample_timeout_sec", 2)))
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._breaches = 0
+        self._due_since: Optional[float] = None
+        self._due_reason = ""
+        self._perf_session: Optional[str] = None
+        self._browser_started_at = time.time()
+        self._last_sample: dict = {}
+        self._recycles: deque = deque(maxlen=20)
+        self.recycle_count = 0
+        self.recycle_failures = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._browser_started_at = time.time()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="wechat_browser_watchdog")
+        self._thread.start()
+        self.logger.info(
+            f"浏览器内存看门狗已启动: 间隔 {self.interval_sec:.0f}s, RSS 上限 {self.max_rss_mb:.0f}MB, "
+            f"JS 堆上限 {self.max_js_heap_mb:.0f}MB, DOM 节点上限 {self.max_dom_nodes}"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            try:
+                self._tick()
+            except Exception as e:
+                self.logger.warning(f"浏览器看门狗检查失败: {e}")
+
+    def _tick(self) -> None:
+        sample = self.sample()
+        if sample is None:
+            return
+        reason = self._breach_reason(sample)
+        if reason:
+            self._breaches += 1
+        elif self._due_since is None:
+            self._breaches = 0
+        if self._due_since is None and self._breaches >= self.breach_samples:
+            self._due_since = time.time()
+            self._due_reason = reason
+            self.logger.warning(f"浏览器资源超限 ({reason})，等待空闲窗口回收浏览器")
+        if self._due_since is None:
+            return
+
+        forced = self.force_after_sec and time.time() - self._due_since >= self.force_after_sec
+        if not forced and not self._is_quiet():
+            return
+        if forced:
+            self.logger.warning(f"{self.force_after_sec:.0f}s 内未等到空闲窗口，强制回收浏览器")
+        self._recycle(self._due_reason)
+
+    def sample(self) -> Optional[dict]:
+        """Sample page metrics (CDP) and process-tree RSS; None when the driver is busy or gone."""
+        driver = getattr(self.monitor, "driver", None)
+        if driver is None:
+            return None
+
+        def _metrics():
+            session = getattr(driver, "session_id", None)
+            if self._perf_session != session:
+                driver.execute_cdp_cmd("Performance.enable", {})
+                self._perf_session = session
+            return driver.execute_cdp_cmd("Performance.getMetrics", {})
+
+        try:
+            # Lowest priority on the driver thread: queued behind sends, ACK polls and scans.
+            raw = self.monitor.run_on_driver(_metrics, PRIORITY_HOUSEKEEPING, "watchdog_sample", timeout=self.sample_timeout_sec)
+        except (TimeoutError, CancelledError):
+            return None  # busy or shutting down: try again next interval rather than delaying sends
+        metrics = {m.get("name"): m.get("value") for m in (raw or {}).get("metrics", []) if isinstance(m, dict)}
+        usage = tree_usage(self.monitor.browser_pid())
+        sample = {
+            "ts": time.time(),
+            "rss_mb": usage["rss_mb"],
+            "processes": usage["processes"],
+            "js_heap_mb": round(float(metrics.get("JSHeapUsedSize") or 0) / (1024 * 1024), 1),
+            "dom_nodes": int(metrics.get("Nodes") or 0),
+            "js_listeners": int(metrics.get("JSEventListeners") or 0),
+            "documents": int(metrics.get("Documents") or 0),
+            "browser_age_sec": round(time.time() - self._browser_started_at, 1),
+        }
+        with self._lock:
+            self._last_sample = sample
+        return sample
+
+    def _breach_reason(self, sample: dict) -> str:
+        if self.max_rss_mb and sample["rss_mb"] > self.max_rss_mb:
+            return f"RSS {sample['rss_mb']:.0f}MB > {self.max_rss_mb:.0f}MB"
+        if self.max_js_heap_mb and sample["js_heap_mb"] > self.max_js_heap_mb:
+            return f"JS 堆 {sample['js_heap_mb']:.0f}MB > {self.max_js_heap_mb:.0f}MB"
+        if self.max_dom_nodes and sample["dom_nodes"] > self.max_dom_nodes:
+            return f"DOM 节点 {sample['dom_nodes']} > {self.max_dom_nodes}"
+        if self.max_uptime_hours and sample["browser_age_sec"] > self.max_uptime_hours * 3600:
+            return f"运行时长超过 {self.max_uptime_hours:g}h"
+        return ""
+
+    def _is_quiet(self) -> bool:
+        try:
+            idle_sec = float(self.monitor.idle_seconds())
+        except Exception:
+            idle_sec = 0.0
+        if idle_sec < self.quiet_sec:
+            return False
+        if self.quiet_check is not None:
+            try:
+                return bool(self.quiet_check())
+            except Exception:
+                return False
+        return True
+
+    def _wait_for_drain(self) -> None:
+        if self.quiet_check is None:
+            return
+        deadline = time.time() + self.drain_timeout_sec
+        while time.time() < deadline and not self._stop.is_set():
+            try:
+                if self.quiet_check():
+                    return
+            except Exception:
+                return
+            time.sleep(0.2)
+        self.logger.warning("等待发送队列清空超时，继续回收浏览器")
+
+    def _recycle(self, reason: str) -> None:
+        self._wait_for_drain()
+        before = dict(self._last_sample)
+        started = time.time()
+        ok = False
+        try:
+            ok = bool(self.monitor.recycle_browser(reason=reason))
+        finally:
+            duration = time.time() - started
+            with self._lock:
+                self.recycle_count += 1
+                if not ok:
+                    self.recycle_failures += 1
+                self._recycles.append({
+                    "ts": started,
+                    "reason": reason,
+                    "ok": ok,
+                    "duration_sec": round(duration, 2),
+                    "rss_mb_before": before.get("rss_mb"),
+                    "js_heap_mb_before": before.get("js_heap_mb"),
+                    "dom_nodes_before": before.get("dom_nodes"),
+                })
+            self._breaches = 0
+            self._due_since = None
+            self._due_reason = ""
+            self._perf_session = None
+            self._browser_started_at = time.time()
+        if ok:
+            self.logger.info(f"浏览器已回收 ({reason})，耗时 {duration:.1f}s，登录状态已复用")
+        else:
+            self.logger.error(f"浏览器回收失败 ({reason})，耗时 {duration:.1f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            durations = [r["duration_sec"] for r in self._recycles]
+            return {
+                "last_sample": dict(self._last_sample),
+                "recycle_due": self._due_since is not None,
+                "recycle_due_reason": self._due_reason,
+                "recycle_count": self.recycle_count,
+                "recycle_failures": self.recycle_failures,
+                "recycle_avg_sec": round(sum(durations) / len(durations), 2) if durations else 0.0,
+                "recent_recycles": list(self._recycles),
+            }
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class MessageDedupStore:
+    """
+    Bounded "already processed" set for message signatures.
+
+    - Keys are stored as fixed-size 64-bit blake2b digests, so memory does not grow
+      with message length.
+    - True LRU eviction (oldest-touched first) once `max_entries` is reached, plus an
+      optional TTL: an evicted/expired entry is the oldest one, never an arbitrary one.
+    - O(1) lookups; thread-safe; hit/miss/eviction counters for monitoring.
+    """
+
+    def __init__(self, max_entries: int = 20000, ttl_sec: Optional[float] = 7 * 24 * 3600):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_sec = float(ttl_sec) if ttl_sec else None
+        self._entries: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    @staticmethod
+    def digest(signature: str) -> int:
+        data = str(signature).encode("utf-8", errors="surrogatepass")
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+    def _expire_locked(self, now: float) -> None:
+        if self.ttl_sec is None:
+            return
+        cutoff = now - self.ttl_sec
+        while self._entries:
+            key, ts = next(iter(self._entries.items()))
+            if ts >= cutoff:
+                break
+            self._entries.popitem(last=False)
+            self.expired += 1
+
+    def _insert_locked(self, key: int, now: float) -> None:
+        self._entries[key] = now
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def check_and_add(self, signature: str) -> bool:
+        """Record the signature; return True if it was new, False if already processed."""
+        key = self.digest(signature)
+        now = time.time()
+        with self._lock:
+            self._expire_locked(now)
+            if key in self._entries:
+                self.hits += 1
+                self._entries[key] = now
+                self._entries.move_to_end(key)
+                return False
+            self.misses += 1
+            self._insert_locked(key, now)
+            return True
+
+    def add(self, signature: str) -> None:
+        key = self.digest(signature)
+        now = time.time()
+        with self._lock:
+            self._expire_locked(now)
+            self._insert_locked(key, now)
+
+    def __contains__(self, signature: str) -> bool:
+        key = self.digest(signature)
+        with self._lock:
+            self._expire_locked(time.time())
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
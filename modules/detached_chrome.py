@@ -0,0 +1,130 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Optional
+from urllib.parse import urlparse
+
+WECHAT_WEB_URL = "https://wx.qq.com/"
+
+
+class DetachedChrome:
+    """
+    A Chrome instance that outlives the gateway process.
+
+    Chrome is started once with `--remote-debugging-port` and its own session (not a child of
+    chromedriver or of the gateway), so stopping/restarting the gateway leaves the logged-in
+    wx.qq.com page running. On the next start `WebMonitor.initialize` attaches to it through
+    chromedriver's `debuggerAddress` instead of launching a new browser.
+    """
+
+    def __init__(self, host: str, port: int, user_data_dir: str, logger, web_url: str = WECHAT_WEB_URL):
+        self.host = host or "127.0.0.1"
+        self.port = int(port)
+        self.user_data_dir = user_data_dir
+        self.logger = logger
+        self.web_url = web_url or WECHAT_WEB_URL
+        self._web_host = urlparse(self.web_url).netloc
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def _get_json(self, path: str, timeout: float = 1.0):
+        with urllib.request.urlopen(f"http://{self.address}{path}", timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8", errors="replace"))
+
+    def is_alive(self) -> bool:
+        try:
+            return isinstance(self._get_json("/json/version"), dict)
+        except Exception:
+            return False
+
+    def is_wechat_url(self, url: Optional[str]) -> bool:
+        netloc = urlparse(str(url or "")).netloc
+        return bool(netloc) and (netloc == self._web_host or netloc.endswith("wx.qq.com"))
+
+    def wechat_target_id(self) -> Optional[str]:
+        """DevTools target id of the open wx.qq.com tab (chromedriver uses it as the window handle)."""
+        try:
+            targets = self._get_json("/json/list")
+        except Exception:
+            return None
+        for target in targets if isinstance(targets, list) else []:
+            if not isinstance(target, dict) or target.get("type") != "page":
+                continue
+            if self.is_wechat_url(target.get("url")):
+                return str(target.get("id") or "") or None
+        return None
+
+    def launch(self, chrome_binary: Optional[str], args: list[str], timeout_sec: float = 15.0) -> bool:
+        """Start Chrome detached from this process and wait until its DevTools endpoint answers."""
+        if not chrome_binary:
+            self.logger.error("未找到 Chrome 可执行文件，无法以调试端口模式启动 (可配置 chrome_binary)")
+            return False
+        cmd = [chrome_binary]
+        for arg in args:
+            arg = str(arg)
+            # ChromeOptions tolerates switches without dashes (e.g. "user-agent=..."); a raw command line does not.
+            cmd.append(arg if arg.startswith("-") else f"--{arg}")
+        cmd += [
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--password-store=basic",
+            self.web_url,
+        ]
+        popen_kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if sys.platform.startswith("win"):
+            popen_kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            # Own session: Ctrl+C / SIGTERM sent to the gateway's process group does not reach Chrome.
+            popen_kwargs["start_new_session"] = True
+        try:
+            self._process = subprocess.Popen(cmd, **popen_kwargs)
+        except Exception as e:
+            self.logger.error(f"启动 Chrome 失败: {e}")
+            return False
+
+        deadline = time.time() + max(1.0, timeout_sec)
+        while time.time() < deadline:
+            if self.is_alive():
+                self.logger.info(f"已启动独立 Chrome (pid={self._process.pid}, 调试端口 {self.port})")
+                return True
+            if self._process.poll() is not None:
+                self.logger.error(
+                    f"Chrome 启动后立即退出 (code={self._process.returncode})；"
+                    f"可能有另一个 Chrome 正在使用 {self.user_data_dir} 但未开启调试端口"
+                )
+                return False
+            time.sleep(0.1)
+        self.logger.error(f"等待 Chrome 调试端口 {self.address} 超时")
+        return False
+
+    def wait_until_gone(self, timeout_sec: float = 10.0) -> bool:
+        deadline = time.time() + max(0.0, timeout_sec)
+        while time.time() < deadline:
+            if not self.is_alive():
+                if self._process is not None:
+                    try:
+                        self._process.wait(timeout=max(0.1, deadline - time.time()))
+                    except Exception:
+                        pass
+                return True
+            time.sleep(0.1)
+        return False
+
+    def browser_pid(self) -> Optional[int]:
+        """PID of the Chrome browser process (launched here, or found via the profile's SingletonLock)."""
+        if self._process is not None and self._process.poll() is None:
+            return self._process.pid
+        try:
+            # Linux/macOS: SingletonLock -> "<hostname>-<pid>"
+            target = os.readlink(os.path.join(self.user_data_dir, "SingletonLock"))
+            return int(target.rsplit("-", 1)[-1])
+        except (OSError, ValueError):
+            return None
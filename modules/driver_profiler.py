@@ -0,0 +1,228 @@
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Iterable, Optional
+
+# Frames of the `driver.execute` wrapper itself: never the caller a command belongs to.
+_WRAPPER_FRAMES = frozenset(("_instrument_driver", "timed_execute"))
+
+
+class _CommandAgg:
+    __slots__ = ("count", "total_sec", "max_sec")
+
+    def __init__(self):
+        self.count = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total_sec += seconds
+        if seconds > self.max_sec:
+            self.max_sec = seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_sec * 1000.0, 1),
+            "avg_ms": round(self.total_sec * 1000.0 / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_sec * 1000.0, 1),
+        }
+
+
+class ProfileUnit:
+    """One unit of driver work (a monitor cycle or a send); `kind` may be refined before it closes."""
+
+    __slots__ = ("kind", "started", "commands", "wire_sec", "by_command")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.commands = 0
+        self.wire_sec = 0.0
+        self.by_command: Counter = Counter()
+
+
+class _UnitScope:
+    def __init__(self, profiler: "DriverProfiler", kind: str):
+        self._profiler = profiler
+        self._unit = ProfileUnit(kind)
+        self._opened = False
+
+    def __enter__(self) -> ProfileUnit:
+        self._opened = self._profiler._open_unit(self._unit)
+        return self._unit
+
+    def __exit__(self, *exc) -> bool:
+        if self._opened:
+            self._profiler._close_unit(self._unit)
+        return False
+
+
+class DriverProfiler:
+    """
+    WebDriver round-trip profiler (opt-in, fed by the WebMonitor `driver.execute` wrapper).
+
+    - Every command is one HTTP round trip to chromedriver; elements returned by the driver
+      send their commands through the same `execute`, so they are covered too.
+    - Commands are attributed to the innermost calling method of `owner_class` (found by
+      walking the stack), and counted per command type. Python 3.10 code objects have no
+      qualified name, so there frames are matched by name against `owner_methods`.
+    - `unit(kind)` groups the commands of one monitor cycle / one send; the last `window`
+      units per kind give rolling per-cycle and per-send summaries.
+    - A compact summary is logged every `log_interval_sec` (0 disables logging).
+    """
+
+    def __init__(
+        self,
+        logger,
+        owner_file: str,
+        owner_class: str = "WebMonitor",
+        owner_methods: Optional[Iterable[str]] = None,
+        window: int = 200,
+        log_interval_sec: float = 60.0,
+    ):
+        self.logger = logger
+        self.owner_file = owner_file
+        self.owner_class = owner_class
+        self.owner_methods = frozenset(owner_methods) if owner_methods is not None else None
+        self.window = max(1, int(window))
+        self.log_interval_sec = max(0.0, float(log_interval_sec))
+        self._lock = threading.Lock()
+        self._unit: Optional[ProfileUnit] = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._since = time.time()
+            self._last_log = time.monotonic()
+            self._by_command: dict[str, _CommandAgg] = {}
+            self._by_method: dict[str, _CommandAgg] = {}
+            self._method_commands: dict[str, Counter] = {}
+            self._units: dict[str, deque] = {}
+
+    # -----------------------
+    # recording
+    # -----------------------
+    def _caller(self) -> str:
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == self.owner_file:
+                method = self._owner_method(code.co_name, getattr(code, "co_qualname", None))  # Python 3.11+
+                if method:
+                    return method
+            frame = frame.f_back
+        return "<other>"
+
+    def _owner_method(self, name: str, qualname: Optional[str]) -> Optional[str]:
+        """Owner-class method a frame of `owner_file` belongs to; None to keep walking up the stack."""
+        if qualname is not None:
+            parts = qualname.split(".")
+            if len(parts) > 1 and parts[0] == self.owner_class and parts[1] not in _WRAPPER_FRAMES:
+                return parts[1]
+            return None
+        # Python 3.10: only the bare name, so skip the wrapper and nested helpers (lambdas, closures).
+        if name in _WRAPPER_FRAMES or name.startswith("<"):
+            return None
+        if self.owner_methods is not None and name not in self.owner_methods:
+            return None
+        return name
+
+    def record(self, command: str, seconds: float) -> None:
+        """Called by the driver wrapper after each command (on the calling thread)."""
+        method = self._caller()
+        with self._lock:
+            self._by_command.setdefault(command, _CommandAgg()).add(seconds)
+            self._by_method.setdefault(method, _CommandAgg()).add(seconds)
+            self._method_commands.setdefault(method, Counter())[command] += 1
+            unit = self._unit
+            if unit is not None:
+                unit.commands += 1
+                unit.wire_sec += seconds
+                unit.by_command[command] += 1
+        self._maybe_log()
+
+    def unit(self, kind: str) -> _UnitScope:
+        """Context manager around one cycle / send; nested units fold into the outer one."""
+        return _UnitScope(self, kind)
+
+    def _open_unit(self, unit: ProfileUnit) -> bool:
+        with self._lock:
+            if self._unit is not None:
+                return False
+            self._unit = unit
+            return True
+
+    def _close_unit(self, unit: ProfileUnit) -> None:
+        wall_sec = time.perf_counter() - unit.started
+        with self._lock:
+            if self._unit is unit:
+                self._unit = None
+            self._units.setdefault(unit.kind, deque(maxlen=self.window)).append(
+                (unit.commands, unit.wire_sec, wall_sec, unit.by_command)
+            )
+        self._maybe_log()
+
+    # -----------------------
+    # reporting
+    # -----------------------
+    @staticmethod
+    def _unit_summary(entries: list) -> dict:
+        commands = sorted(e[0] for e in entries)
+        n = len(entries)
+        wire = sum(e[1] for e in entries)
+        wall = sum(e[2] for e in entries)
+        per_command: Counter = Counter()
+        for e in entries:
+            per_command.update(e[3])
+        return {
+            "units": n,
+            "commands_avg": round(sum(commands) / n, 1),
+            "commands_p95": commands[min(n - 1, int(round(0.95 * (n - 1))))],
+            "commands_max": commands[-1],
+            "wire_ms_avg": round(wire * 1000.0 / n, 1),
+            "wall_ms_avg": round(wall * 1000.0 / n, 1),
+            # Share of the unit's wall time spent waiting on WebDriver round trips.
+            "wire_share": round(wire / wall, 3) if wall > 0 else 0.0,
+            "top_commands_per_unit": {cmd: round(c / n, 2) for cmd, c in per_command.most_common(5)},
+        }
+
+    def summary(self, top: int = 20) -> dict:
+        with self._lock:
+            by_command = {k: v.to_dict() for k, v in self._by_command.items()}
+            by_method = {k: dict(v.to_dict(), commands=dict(self._method_commands[k].most_common(6))) for k, v in self._by_method.items()}
+            units = {kind: self._unit_summary(list(entries)) for kind, entries in self._units.items() if entries}
+            since = self._since
+
+        def ranked(data: dict) -> dict:
+            return dict(sorted(data.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[: max(1, int(top))])
+
+        return {
+            "since": since,
+            "commands": sum(v["count"] for v in by_command.values()),
+            "wire_ms_total": round(sum(v["total_ms"] for v in by_command.values()), 1),
+            "units": units,
+            "by_method": ranked(by_method),
+            "by_command": ranked(by_command),
+        }
+
+    def _maybe_log(self) -> None:
+        if not self.log_interval_sec:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < self.log_interval_sec:
+                return
+            self._last_log = now
+        try:
+            data = self.summary(top=5)
+            units = "; ".join(
+                f"{kind} x{u['units']}: {u['commands_avg']} 次往返/{u['wire_ms_avg']}ms (p95 {u['commands_p95']} 次, 占 {u['wire_share']:.0%})"
+                for kind, u in sorted(data["units"].items())
+            )
+            methods = ", ".join(f"{name} {m['count']}次/{m['total_ms']:.0f}ms" for name, m in data["by_method"].items())
+            self.logger.info(f"WebDriver 往返统计: 共 {data['commands']} 次 {data['wire_ms_total']:.0f}ms | {units or '无'} | 耗时最多: {methods}")
+        except Exception as e:
+            self.logger.debug(f"WebDriver 往返统计输出失败: {e}")
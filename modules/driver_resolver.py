@@ -0,0 +1,246 @@
+import glob
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+_VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)(?:\.(\d+))?")
+_DRIVER_NAMES = ("chromedriver", "chromedriver.exe")
+_manifest_lock = threading.Lock()
+
+
+def _parse_version(text: str) -> Optional[str]:
+    match = _VERSION_RE.search(text or "")
+    return match.group(0) if match else None
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    return version.split(".", 1)[0] if version else None
+
+
+def _run_version(binary: str, timeout: float = 5.0) -> Optional[str]:
+    try:
+        out = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=timeout)
+        return _parse_version((out.stdout or "") + " " + (out.stderr or ""))
+    except Exception:
+        return None
+
+
+def _ensure_executable(path: str) -> str:
+    """Normalize a resolved driver path: companion files -> the real binary, and make sure it has +x."""
+    p = Path(path)
+    # webdriver-manager may (incorrectly) return a non-binary companion file on some platforms
+    # e.g. THIRD_PARTY_NOTICES.chromedriver, which will raise "Exec format error".
+    if p.name not in _DRIVER_NAMES:
+        for name in _DRIVER_NAMES:
+            candidate = p.parent / name
+            if candidate.exists():
+                p = candidate
+                break
+    # Ensure the resolved driver is executable (some caches unpack without +x on macOS)
+    try:
+        if p.exists() and not os.access(str(p), os.X_OK):
+            mode = os.stat(str(p)).st_mode
+            os.chmod(str(p), mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    except Exception:
+        # best-effort; Selenium will raise if still not executable
+        pass
+    return str(p)
+
+
+def _usable(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+class ChromeDriverResolver:
+    """
+    Resolves the chromedriver binary without touching the network on warm starts.
+
+    Order:
+    1. explicit `chromedriver_path` from config
+    2. manifest cache entry for the local Chrome major version
+    3. a matching driver already on disk (PATH, webdriver-manager cache)
+    4. webdriver-manager download (the only step that needs the network)
+    5. offline last resort: any cached driver, newest first
+
+    The manifest also remembers the Chrome binary's mtime/size, so the Chrome version is only
+    re-read (`chrome --version`) after Chrome itself was updated.
+    """
+
+    def __init__(self, config: dict, logger):
+        cfg = config or {}
+        self.logger = logger
+        self.explicit_path = str(cfg.get("chromedriver_path") or "").strip()
+        self.chrome_binary = str(cfg.get("chrome_binary") or "").strip()
+        self.manifest_path = os.path.abspath(os.path.expanduser(
+            str(cfg.get("chromedriver_manifest_path") or os.path.join("~", ".wechat_auto", "chromedriver_manifest.json"))
+        ))
+        self.allow_download = bool(cfg.get("chromedriver_allow_download", True))
+        self.last_source = ""
+        self.last_resolve_ms = 0.0
+
+    # -----------------------
+    # manifest
+    # -----------------------
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            tmp = f"{self.manifest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.manifest_path)
+        except Exception as e:
+            self.logger.debug(f"写入 chromedriver 缓存清单失败: {e}")
+
+    # -----------------------
+    # chrome version
+    # -----------------------
+    def _chrome_candidates(self) -> list[str]:
+        if self.chrome_binary:
+            return [self.chrome_binary]
+        if sys.platform == "darwin":
+            return [
+                "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                os.path.expanduser("~/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"),
+                "/Applications/Chromium.app/Contents/MacOS/Chromium",
+            ]
+        if sys.platform.startswith("win"):
+            roots = [os.environ.get(k, "") for k in ("PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA")]
+            return [os.path.join(r, "Google", "Chrome", "Application", "chrome.exe") for r in roots if r]
+        found = []
+        for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+            path = shutil.which(name)
+            if path:
+                found.append(path)
+        return found
+
+    def chrome_binary_path(self) -> Optional[str]:
+        """First existing Chrome/Chromium binary (config `chrome_binary` or the platform defaults)."""
+        for binary in self._chrome_candidates():
+            if os.path.isfile(binary):
+                return binary
+        return None
+
+    def _chrome_version(self, manifest: dict) -> Optional[str]:
+        for binary in self._chrome_candidates():
+            try:
+                st = os.stat(binary)
+            except OSError:
+                continue
+            fingerprint = {"binary": binary, "mtime": int(st.st_mtime), "size": int(st.st_size)}
+            cached = manifest.get("chrome") or {}
+            if cached.get("version") and all(cached.get(k) == v for k, v in fingerprint.items()):
+                return str(cached["version"])
+            version = _run_version(binary)
+            if version:
+                manifest["chrome"] = dict(fingerprint, version=version)
+                return version
+        return None
+
+    # -----------------------
+    # driver lookup
+    # -----------------------
+    def _local_drivers(self) -> list[str]:
+        paths = []
+        on_path = shutil.which("chromedriver")
+        if on_path:
+            paths.append(on_path)
+        wdm_root = os.path.expanduser(os.environ.get("WDM_LOCAL_CACHE", "") or os.path.join("~", ".wdm"))
+        for name in _DRIVER_NAMES:
+            paths.extend(glob.glob(os.path.join(wdm_root, "drivers", "chromedriver", "**", name), recursive=True))
+        return [p for p in dict.fromkeys(paths) if os.path.isfile(p)]
+
+    def _find_local_match(self, major: str) -> Optional[tuple[str, str]]:
+        for path in self._local_drivers():
+            path = _ensure_executable(path)
+            version = _run_version(path)
+            if version and _major(version) == major:
+                return path, version
+        return None
+
+    def _remember(self, manifest: dict, major: Optional[str], path: str, version: Optional[str], source: str) -> None:
+        if not major:
+            return
+        drivers = manifest.setdefault("drivers", {})
+        drivers[major] = {"path": path, "version": version or "", "source": source, "resolved_at": int(time.time())}
+
+    def resolve(self) -> Optional[str]:
+        """Return a chromedriver path, or None to let Selenium Manager try on its own."""
+        started = time.perf_counter()
+        try:
+            return self._resolve()
+        finally:
+            self.last_resolve_ms = round((time.perf_counter() - started) * 1000.0, 1)
+            self.logger.info(f"chromedriver 解析: source={self.last_source or 'none'} 耗时 {self.last_resolve_ms}ms")
+
+    def _resolve(self) -> Optional[str]:
+        if self.explicit_path:
+            path = _ensure_executable(os.path.expanduser(self.explicit_path))
+            if _usable(path):
+                self.last_source = "config"
+                return path
+            self.logger.warning(f"配置的 chromedriver_path 不可用: {self.explicit_path}，继续自动解析")
+
+        with _manifest_lock:
+            manifest = self._load_manifest()
+            chrome_version = self._chrome_version(manifest)
+            major = _major(chrome_version)
+
+            entry = (manifest.get("drivers") or {}).get(major) if major else None
+            if entry and _usable(entry.get("path")):
+                self.last_source = "manifest"
+                self._save_manifest(manifest)  # chrome fingerprint may have been refreshed
+                return str(entry["path"])
+
+            if major:
+                local = self._find_local_match(major)
+                if local:
+                    self._remember(manifest, major, local[0], local[1], "local")
+                    self._save_manifest(manifest)
+                    self.last_source = "local"
+                    return local[0]
+
+            if self.allow_download:
+                try:
+                    from webdriver_manager.chrome import ChromeDriverManager
+
+                    path = _ensure_executable(ChromeDriverManager().install())
+                    if _usable(path):
+                        self._remember(manifest, major, path, _run_version(path), "webdriver-manager")
+                        self._save_manifest(manifest)
+                        self.last_source = "webdriver-manager"
+                        return path
+                except Exception as e:
+                    self.logger.warning(f"webdriver-manager 获取 chromedriver 失败 (可能处于离线环境): {e}")
+
+            # Offline last resort: newest cached driver even if the major version differs.
+            cached = sorted(
+                ((v or {}) for v in (manifest.get("drivers") or {}).values()),
+                key=lambda e: e.get("resolved_at", 0),
+                reverse=True,
+            )
+            for e in cached:
+                if _usable(e.get("path")):
+                    self.logger.warning(
+                        f"未找到与 Chrome {chrome_version or '?'} 匹配的 chromedriver，使用缓存的 {e.get('version') or e.get('path')}"
+                    )
+                    self.last_source = "manifest-stale"
+                    return str(e["path"])
+
+        self.last_source = ""
+        return None
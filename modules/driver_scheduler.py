@@ -0,0 +1,263 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+PRIORITY_SEND = 0
+PRIORITY_ACK = 1
+PRIORITY_SCAN = 2
+PRIORITY_HOUSEKEEPING = 3
+PRIORITY_NAMES = {
+    PRIORITY_SEND: "send",
+    PRIORITY_ACK: "ack",
+    PRIORITY_SCAN: "scan",
+    PRIORITY_HOUSEKEEPING: "housekeeping",
+}
+
+_STOP = object()
+
+
+class _PriorityStats:
+    def __init__(self, window: int = 1000):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.inline = 0
+        self.wait_ms: deque = deque(maxlen=window)
+        self.run_ms: deque = deque(maxlen=window)
+
+    def snapshot(self, queued: int) -> dict:
+        waits = sorted(self.wait_ms)
+        runs = list(self.run_ms)
+
+        def pct(values: list, p: float) -> float:
+            if not values:
+                return 0.0
+            return round(values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))], 1)
+
+        return {
+            "queued": queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "inline": self.inline,
+            "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p50": pct(waits, 50),
+            "wait_ms_p95": pct(waits, 95),
+            "wait_ms_max": round(waits[-1], 1) if waits else 0.0,
+            "run_ms_avg": round(sum(runs) / len(runs), 1) if runs else 0.0,
+            "run_ms_max": round(max(runs), 1) if runs else 0.0,
+        }
+
+
+class DriverScheduler:
+    """
+    Single owner of a WebDriver session: one thread executes queued tasks one at a time,
+    highest priority first (send > ack > scan > housekeeping, FIFO within a priority).
+
+    - `submit()` returns a Future; `call()` waits for it, or runs inline when already on the
+      driver thread (nested driver operations never deadlock).
+    - Long tasks (chat scans) poll `preempt_requested()` between steps and return early, so a
+      send waits at most for the step in progress instead of the whole scan.
+    - `lock` is held while a task runs, so code that still takes it directly stays serialized.
+    - Per-priority queue-wait and run-time stats.
+    """
+
+    def __init__(self, logger, name: str = "wechat_driver", lock: Optional[threading.RLock] = None):
+        self.logger = logger
+        self.name = name
+        self.lock = lock or threading.RLock()
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._state_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._current_priority: Optional[int] = None
+        self._queued = {p: 0 for p in PRIORITY_NAMES}
+        self._stats = {p: _PriorityStats() for p in PRIORITY_NAMES}
+        # Optional hook: on_task_done(priority, wait_sec, run_sec), called on the driver thread.
+        self.on_task_done: Optional[Callable[[int, float, float], None]] = None
+
+    # -----------------------
+    # lifecycle
+    # -----------------------
+    def start(self) -> None:
+        with self._state_lock:
+            self._ensure_thread_locked()
+
+    def _ensure_thread_locked(self) -> bool:
+        """Start the driver thread if needed; False while a stopping thread is still shutting down."""
+        if self._thread is not None and self._thread.is_alive():
+            return not self._stopping or self._thread is threading.current_thread()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Finish the running task, cancel everything still queued and end the driver thread."""
+        with self._state_lock:
+            if self._thread is None:
+                return
+            self._stopping = True
+        self._queue.put((-1, next(self._seq), _STOP, None, 0.0))
+
+    def is_driver_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    # -----------------------
+    # submitting work
+    # -----------------------
+    def submit(self, fn: Callable, priority: int = PRIORITY_HOUSEKEEPING, name: str = "") -> Future:
+        future: Future = Future()
+        future.task_name = name or getattr(fn, "__name__", "task")
+        while True:
+            with self._state_lock:
+                if self._ensure_thread_locked():
+                    self._queued[priority] = self._queued.get(priority, 0) + 1
+                    self._stats[priority].submitted += 1
+                    future.in_queue = True
+                    self._queue.put((int(priority), next(self._seq), fn, future, time.perf_counter()))
+                    # A caller that gives up (call() timeout) cancels the future while it is still queued.
+                    future.add_done_callback(lambda f, p=int(priority): self._uncount_cancelled(f, p))
+                    return future
+                stopping_thread = self._thread
+            # A previous stop() is still winding down: wait for it, then start a fresh driver thread.
+            stopping_thread.join(timeout=1.0)
+
+    def call(self, fn: Callable, priority: int = PRIORITY_HOUSEKEEPING, name: str = "", timeout: Optional[float] = None):
+        """
+        Run `fn` on the driver thread and return its result (exceptions propagate).
+        On timeout a task that has not started yet is cancelled and TimeoutError is raised.
+        """
+        if self.is_driver_thread():
+            with self._state_lock:
+                self._stats[priority].inline += 1
+            return fn()
+        future = self.submit(fn, priority, name)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"driver task '{future.task_name}' did not finish within {timeout}s")
+
+    def _uncount_cancelled(self, future: Future, priority: int) -> None:
+        """Drop a cancelled, still-queued task from the counts so it no longer requests preemption."""
+        if not future.cancelled() or not getattr(future, "in_queue", False):
+            return
+        with self._state_lock:
+            if future.in_queue:
+                future.in_queue = False
+                self._queued[priority] -= 1
+
+    def _dequeued_locked(self, priority: int, future: Future) -> None:
+        if future.in_queue:
+            future.in_queue = False
+            self._queued[priority] -= 1
+
+    def preempt_requested(self) -> bool:
+        """True when a task of higher priority than the running one is waiting (call between scan steps)."""
+        with self._state_lock:
+            current = self._current_priority
+            if current is None:
+                return False
+            return any(count > 0 for p, count in self._queued.items() if p < current)
+
+    def pending(self, priority: Optional[int] = None) -> int:
+        with self._state_lock:
+            if priority is None:
+                return sum(self._queued.values())
+            return self._queued.get(priority, 0)
+
+    # -----------------------
+    # driver thread
+    # -----------------------
+    def _run(self) -> None:
+        while True:
+            priority, _, fn, future, submitted_at = self._queue.get()
+            if fn is _STOP:
+                break
+            with self._state_lock:
+                self._dequeued_locked(priority, future)
+                stopping = self._stopping
+            if stopping or not future.set_running_or_notify_cancel():
+                if stopping:
+                    future.cancel()
+                    future.set_running_or_notify_cancel()
+                with self._state_lock:
+                    self._stats[priority].cancelled += 1
+                continue
+            started = time.perf_counter()
+            with self._state_lock:
+                self._current_priority = priority
+                self._stats[priority].wait_ms.append((started - submitted_at) * 1000.0)
+            ok = True
+            try:
+                with self.lock:
+                    result = fn()
+            except BaseException as exc:  # delivered to the caller through the future
+                ok = False
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            finally:
+                run_sec = time.perf_counter() - started
+                with self._state_lock:
+                    self._current_priority = None
+                    stats = self._stats[priority]
+                    stats.run_ms.append(run_sec * 1000.0)
+                    if ok:
+                        stats.completed += 1
+                    else:
+                        stats.failed += 1
+                hook = self.on_task_done
+                if hook is not None:
+                    try:
+                        hook(priority, started - submitted_at, run_sec)
+                    except Exception:
+                        pass
+        with self._state_lock:
+            # Under the state lock: a concurrent submit() either lands before this drain (cancelled)
+            # or sees no thread and starts a new one.
+            self._drain_cancelled_locked()
+            if self._thread is threading.current_thread():
+                self._thread = None
+
+    def _drain_cancelled_locked(self) -> None:
+        while True:
+            try:
+                priority, _, fn, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if fn is _STOP or future is None:
+                continue
+            # Uncounted before cancel(): the done callback then returns without taking the state lock.
+            self._dequeued_locked(priority, future)
+            self._stats[priority].cancelled += 1
+            future.cancel()
+            future.set_running_or_notify_cancel()
+
+    def stats(self) -> dict:
+        with self._state_lock:
+            return {
+                "running": PRIORITY_NAMES.get(self._current_priority, None) if self._current_priority is not None else None,
+                "priorities": {
+                    PRIORITY_NAMES[p]: self._stats[p].snapshot(self._queued.get(p, 0)) for p in PRIORITY_NAMES
+                },
+            }
+
+
+__all__ = [
+    "CancelledError",
+    "DriverScheduler",
+    "PRIORITY_ACK",
+    "PRIORITY_HOUSEKEEPING",
+    "PRIORITY_NAMES",
+    "PRIORITY_SCAN",
+    "PRIORITY_SEND",
+]
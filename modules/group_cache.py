@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Iterable, Optional
+
+
+def is_group_username(username: Optional[str]) -> bool:
+    """WeChat group ids: "<id>@chatroom" (wechat08 / LangBot side) or "@@<hash>" (wx.qq.com data-username)."""
+    if not isinstance(username, str) or not username:
+        return False
+    return username.endswith("@chatroom") or username.startswith("@@")
+
+
+class GroupChatCache:
+    """
+    Per-contact "is this a group chat" classification.
+
+    - Entries derived from a chat-list `data-username` are authoritative and refreshed on
+      every snapshot; entries learned from the active-chat DOM expire after `ttl_sec`.
+    - Keyed by display name and by username; when a username shows up under a new display
+      name (rename), the old name's entry is dropped.
+    - Thread-safe; hit/miss counters for monitoring.
+    """
+
+    def __init__(self, ttl_sec: float = 3600.0, max_entries: int = 5000):
+        self.ttl_sec = max(0.0, float(ttl_sec))
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        # key (display name or username) -> (is_group, stored_at, authoritative)
+        self._entries: dict[str, tuple[bool, float, bool]] = {}
+        # username -> display name last seen for it
+        self._names: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.renames = 0
+
+    def lookup(self, contact: Optional[str], username: Optional[str] = None) -> Optional[bool]:
+        """Return the cached classification, or None if unknown/expired."""
+        if is_group_username(username):
+            return True
+        now = time.time()
+        with self._lock:
+            for key in (username, contact):
+                if not key:
+                    continue
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                is_group, stored_at, authoritative = entry
+                if not authoritative and self.ttl_sec and now - stored_at > self.ttl_sec:
+                    del self._entries[key]
+                    continue
+                self.hits += 1
+                return is_group
+            self.misses += 1
+            return None
+
+    def store(self, contact: Optional[str], is_group: bool, username: Optional[str] = None) -> None:
+        """Record a classification learned from the page (not authoritative: expires after ttl_sec)."""
+        now = time.time()
+        with self._lock:
+            for key in (username, contact):
+                if not key:
+                    continue
+                current = self._entries.get(key)
+                if current is not None and current[2]:
+                    continue  # never override a username-derived entry with a DOM guess
+                self._entries[key] = (bool(is_group), now, False)
+            self._trim_locked()
+
+    def observe_snapshot(self, items: Iterable) -> None:
+        """Refresh from chat-list snapshot items (objects with `nickname` and `username`)."""
+        now = time.time()
+        with self._lock:
+            for item in items:
+                username = getattr(item, "username", "") or ""
+                nickname = getattr(item, "nickname", "") or ""
+                if not username:
+                    continue
+                is_group = is_group_username(username)
+                previous = self._names.get(username)
+                if previous is not None and previous != nickname:
+                    # Renamed: the old display name may now belong to someone else.
+                    self._entries.pop(previous, None)
+                    self.renames += 1
+                self._names[username] = nickname
+                self._entries[username] = (is_group, now, True)
+                if nickname:
+                    self._entries[nickname] = (is_group, now, True)
+            self._trim_locked()
+
+    def invalidate(self, contact: Optional[str]) -> None:
+        with self._lock:
+            self._entries.pop(contact or "", None)
+
+    def _trim_locked(self) -> None:
+        # dicts keep insertion order: drop the oldest entries first
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        while len(self._names) > self.max_entries:
+            self._names.pop(next(iter(self._names)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "renames": self.renames,
+            }
@@ -0,0 +1,289 @@
+import heapq
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Callable, Optional
+
+# Stage name -> (start event, end event). Events are wall-clock timestamps (time.time()).
+STAGES: dict[str, tuple[str, str]] = {
+    "detect": ("observed", "received"),  # DOM mutation seen in-page -> gateway callback
+    "merge": ("received", "emitted"),  # merge window
+    "publish": ("emitted", "published"),  # outbox -> written to the LangBot websocket
+    "langbot": ("published", "reply_received"),  # LangBot processing until SendTxt arrives
+    "enqueue": ("reply_received", "enqueued"),  # SendTxt handler -> send queue
+    "queue": ("enqueued", "send_started"),  # waiting for the send worker
+    "send": ("send_started", "sent"),  # Selenium: select chat, insert text, Enter
+    "ack": ("sent", "settled"),  # page ACK (delivered / failed / unconfirmed)
+}
+_INBOUND_EVENTS = ("observed", "received", "emitted", "published")
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is +Inf.
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram plus a bounded window of raw samples for percentiles."""
+
+    def __init__(self, buckets_ms: tuple = DEFAULT_BUCKETS_MS, window: int = 2000):
+        self.buckets_ms = tuple(sorted(float(b) for b in buckets_ms))
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self._window: deque = deque(maxlen=window)
+
+    def observe(self, value_ms: float) -> None:
+        value_ms = max(0.0, float(value_ms))
+        i = 0
+        while i < len(self.buckets_ms) and value_ms > self.buckets_ms[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self._window.append(value_ms)
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """[(upper bound ms, samples <= bound)], last bound is +inf."""
+        out = []
+        running = 0
+        for bound, n in zip(list(self.buckets_ms) + [float("inf")], self.counts):
+            running += n
+            out.append((bound, running))
+        return out
+
+    def snapshot(self) -> dict:
+        values = sorted(self._window)
+
+        def pct(p: float) -> float:
+            if not values:
+                return 0.0
+            return round(values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))], 1)
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(values[-1], 1) if values else 0.0,
+        }
+
+
+@dataclass
+class MessageTrace:
+    trace_id: str
+    account: str
+    conversation: str
+    events: dict = field(default_factory=dict)
+    inbound_msg_id: int = 0
+    job_id: int = 0
+    state: str = ""
+    # Stages already fed to the histograms. A reply shares its inbound trace's set for the
+    # stages that start from an inbound event, so several replies count them only once.
+    observed: set = field(default_factory=set)
+    inbound_observed: Optional[set] = None
+
+    def mark(self, event: str, ts: Optional[float] = None) -> bool:
+        """Record an event once (the first occurrence wins, e.g. across send retries)."""
+        if event in self.events:
+            return False
+        self.events[event] = time.time() if ts is None else float(ts)
+        return True
+
+    def stages_ms(self) -> dict[str, float]:
+        out = {}
+        for stage, (start, end) in STAGES.items():
+            if start in self.events and end in self.events:
+                out[stage] = round(max(0.0, self.events[end] - self.events[start]) * 1000.0, 1)
+        return out
+
+    def total_ms(self) -> Optional[float]:
+        start = self.events.get("observed", self.events.get("received", self.events.get("reply_received")))
+        end = self.events.get("settled")
+        if start is None or end is None:
+            return None
+        return round(max(0.0, end - start) * 1000.0, 1)
+
+    def to_dict(self) -> dict:
+        first = min(self.events.values()) if self.events else 0.0
+        return {
+            "traceId": self.trace_id,
+            "wxid": self.account,
+            "conversation": self.conversation,
+            "inboundMsgId": self.inbound_msg_id,
+            "jobId": self.job_id,
+            "state": self.state,
+            "totalMs": self.total_ms(),
+            "stagesMs": self.stages_ms(),
+            "events": {k: round((v - first) * 1000.0, 1) for k, v in sorted(self.events.items(), key=lambda kv: kv[1])},
+            "startedAt": first,
+        }
+
+
+class LatencyTracer:
+    """
+    End-to-end latency tracing for the gateway.
+
+    - An inbound trace starts in the web monitor callback and follows the message through
+      the merge window and the websocket publish.
+    - A SendTxt reply is correlated to the latest inbound trace of the same conversation
+      (within `correlation_window_sec`) and gets its own trace: a copy of the inbound events
+      plus enqueue / queue / send / ACK events of its SendJob.
+    - Each stage feeds a histogram once per trace as soon as both of its events are known;
+      stages starting from an inbound event count once per inbound message even when it gets
+      several replies. Finished reply traces are kept in a recent ring and a slowest-N heap.
+    """
+
+    def __init__(self, correlation_window_sec: float = 120.0, keep_slowest: int = 50, keep_recent: int = 200):
+        self.correlation_window_sec = max(0.0, float(correlation_window_sec))
+        self.keep_slowest = max(1, int(keep_slowest))
+        self._lock = threading.Lock()
+        self._ids = count(1)
+        self.histograms: dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in list(STAGES) + ["total"]}
+        # trace_id -> inbound trace still waiting for publish / a reply
+        self._open: dict[str, MessageTrace] = {}
+        # (account, conversation) -> latest emitted inbound trace
+        self._by_conversation: dict[tuple[str, str], MessageTrace] = {}
+        self._recent: deque = deque(maxlen=max(1, int(keep_recent)))
+        self._slowest: list[tuple[float, int, dict]] = []
+        self.uncorrelated_replies = 0
+        # Optional export hook: on_stage(stage, seconds, account) for every observed stage (and "total").
+        self.on_stage: Optional[Callable[[str, float, str], None]] = None
+
+    def _export(self, stage: str, ms: float, account: str) -> None:
+        hook = self.on_stage
+        if hook is not None:
+            try:
+                hook(stage, ms / 1000.0, account)
+            except Exception:
+                pass
+
+    def _new_id(self) -> str:
+        return f"{int(time.time() * 1000):x}-{next(self._ids)}"
+
+    def _observe_locked(self, trace: MessageTrace, event: str) -> None:
+        for stage, (start, end) in STAGES.items():
+            if end == event and start in trace.events:
+                seen = trace.inbound_observed if trace.inbound_observed is not None and start in _INBOUND_EVENTS else trace.observed
+                if stage in seen:
+                    continue
+                seen.add(stage)
+                ms = max(0.0, trace.events[end] - trace.events[start]) * 1000.0
+                self.histograms[stage].observe(ms)
+                self._export(stage, ms, trace.account)
+
+    def mark(self, trace: Optional[MessageTrace], event: str, ts: Optional[float] = None) -> None:
+        if trace is None:
+            return
+        with self._lock:
+            if trace.mark(event, ts):
+                self._observe_locked(trace, event)
+
+    # -----------------------
+    # inbound side
+    # -----------------------
+    def start_inbound(self, account: str, conversation: str, observed_at: Optional[float] = None) -> MessageTrace:
+        trace = MessageTrace(trace_id=self._new_id(), account=str(account), conversation=str(conversation))
+        with self._lock:
+            if observed_at:
+                trace.mark("observed", observed_at)
+            trace.mark("received")
+            self._observe_locked(trace, "received")
+        return trace
+
+    def emitted(self, trace: Optional[MessageTrace], conversation: str, msg_id: int) -> None:
+        """Merged message handed to the outbox; `conversation` is the wechat08 fromUser."""
+        if trace is None:
+            return
+        with self._lock:
+            trace.conversation = str(conversation)
+            trace.inbound_msg_id = int(msg_id)
+            if trace.mark("emitted"):
+                self._observe_locked(trace, "emitted")
+            self._open[trace.trace_id] = trace
+            self._by_conversation[(trace.account, trace.conversation)] = trace
+            self._expire_locked(time.time())
+
+    def published(self, trace_id: str) -> None:
+        if not trace_id:
+            return
+        with self._lock:
+            trace = self._open.get(trace_id)
+            if trace is not None and trace.mark("published"):
+                self._observe_locked(trace, "published")
+
+    def _expire_locked(self, now: float) -> None:
+        horizon = now - self.correlation_window_sec
+        for trace_id, trace in list(self._open.items()):
+            if trace.events.get("emitted", now) < horizon:
+                del self._open[trace_id]
+                key = (trace.account, trace.conversation)
+                if self._by_conversation.get(key) is trace:
+                    del self._by_conversation[key]
+
+    # -----------------------
+    # reply side
+    # -----------------------
+    def start_reply(self, account: str, conversation: str, received_at: Optional[float] = None) -> MessageTrace:
+        """Trace for a SendTxt reply, correlated to the latest inbound message of the conversation."""
+        now = time.time() if received_at is None else float(received_at)
+        trace = MessageTrace(trace_id=self._new_id(), account=str(account), conversation=str(conversation))
+        with self._lock:
+            self._expire_locked(now)
+            inbound = self._by_conversation.get((trace.account, trace.conversation))
+            if inbound is not None:
+                trace.inbound_msg_id = inbound.inbound_msg_id
+                trace.inbound_observed = inbound.observed
+                for event in _INBOUND_EVENTS:
+                    if event in inbound.events:
+                        trace.events[event] = inbound.events[event]
+            else:
+                self.uncorrelated_replies += 1
+            trace.mark("reply_received", now)
+            self._observe_locked(trace, "reply_received")
+        return trace
+
+    def finish(self, trace: Optional[MessageTrace], state: str, job_id: int = 0) -> None:
+        """SendJob settled (acked / unconfirmed / sent / failed)."""
+        if trace is None:
+            return
+        with self._lock:
+            if trace.state:
+                return
+            trace.state = str(state)
+            trace.job_id = int(job_id)
+            if trace.mark("settled"):
+                self._observe_locked(trace, "settled")
+            total = trace.total_ms()
+            if total is not None:
+                self.histograms["total"].observe(total)
+                self._export("total", total, trace.account)
+            record = trace.to_dict()
+            self._recent.append(record)
+            entry = (total or 0.0, next(self._ids), record)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    # -----------------------
+    # reporting
+    # -----------------------
+    def slowest(self, limit: int = 20) -> list[dict]:
+        with self._lock:
+            entries = sorted(self._slowest, key=lambda e: e[0], reverse=True)
+        return [record for _, _, record in entries[: max(0, int(limit))]]
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        with self._lock:
+            records = list(self._recent)
+        return list(reversed(records))[: max(0, int(limit))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {name: hist.snapshot() for name, hist in self.histograms.items()},
+                "open_traces": len(self._open),
+                "uncorrelated_replies": self.uncorrelated_replies,
+            }
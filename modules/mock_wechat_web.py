@@ -0,0 +1,553 @@
+"""
+Local stand-in for wx.qq.com, used to benchmark WebMonitor / WeChatAutoRuntime without a real account.
+
+The page reproduces the DOM the monitor relies on (default selectors of web_monitor):
+`.main`, `#search_bar input`, `#J_NavChatScrollBody .chat_item[data-username]` with
+`.nickname .nickname_text`, `.info .msg` and `.web_wechat_reddot_middle`, `#chatArea` with
+`.chat_hd .nickname`, `.message.ng-scope` bubbles holding `.js_message_plain`, outgoing bubbles
+(`.me`) with `.ico_loading` / `.ico_fail` state icons, and a contenteditable `#editArea`
+(Enter sends, Ctrl+Enter inserts a newline).
+
+- Inbound messages are injected from Python (`MockWeChatServer.inject`, `TrafficGenerator`) and
+  reach the page over a long-poll, like WeChat's sync loop.
+- Sent messages are POSTed back; the server records them, waits `ack_delay_ms` and echoes a
+  server msg id, which clears the bubble's loading icon (or shows `.ico_fail`).
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable, Optional
+from urllib.parse import parse_qs, urlparse
+
+TOKEN_RE = re.compile(r"\[(?:bench|send)-\d+\]")
+
+
+@dataclass(frozen=True)
+class MockContact:
+    name: str
+    username: str
+    is_group: bool = False
+
+
+@dataclass(frozen=True)
+class InboundMessage:
+    seq: int
+    msg_id: str
+    contact: str
+    username: str
+    text: str
+    injected_at: float
+
+
+@dataclass(frozen=True)
+class SentMessage:
+    msg_id: str
+    contact: str
+    text: str
+    received_at: float
+    ok: bool
+
+
+def make_contacts(count: int, groups: int = 0, prefix: str = "bench_user") -> list[MockContact]:
+    """`count` private chats plus `groups` group chats (wx.qq.com style "@@" usernames for groups)."""
+    contacts = [MockContact(f"{prefix}_{i:03d}", f"@{i:032x}") for i in range(1, max(0, count) + 1)]
+    contacts += [MockContact(f"bench_group_{i:03d}", f"@@{i:064x}", is_group=True) for i in range(1, max(0, groups) + 1)]
+    return contacts
+
+
+MOCK_PAGE_HTML = r"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>微信网页版 (mock)</title>
+<style>
+body { margin: 0; font: 14px sans-serif; }
+.main { display: flex; height: 100vh; }
+.panel { width: 280px; border-right: 1px solid #ddd; display: flex; flex-direction: column; }
+#search_bar input { width: 90%; margin: 8px; }
+#J_NavChatScrollBody { overflow-y: auto; flex: 1; }
+.chat_item { padding: 8px; cursor: pointer; position: relative; border-bottom: 1px solid #eee; }
+.chat_item.active { background: #ddd; }
+.chat_item.filtered { display: none; }
+.web_wechat_reddot_middle { position: absolute; right: 8px; top: 8px; background: #f33; color: #fff;
+  border-radius: 8px; padding: 0 5px; font-size: 12px; }
+.info .msg { color: #888; font-size: 12px; white-space: nowrap; overflow: hidden; }
+#chatArea { flex: 1; display: flex; flex-direction: column; }
+.chat_hd { padding: 10px; border-bottom: 1px solid #ddd; min-height: 20px; }
+.chat_members { color: #888; margin-left: 4px; }
+.box_bd { flex: 1; overflow-y: auto; padding: 10px; }
+.message { margin: 6px 0; }
+.message.me { text-align: right; }
+.bubble { display: inline-block; padding: 6px 10px; border-radius: 4px; border: 1px solid #ddd; background: #fff; }
+.message.me .bubble { background: rgb(169, 236, 155); }
+.js_message_plain { margin: 0; font: inherit; white-space: pre-wrap; }
+.ico_loading, .ico_fail { display: inline-block; width: 10px; height: 10px; margin-right: 4px; }
+.ico_loading { background: #999; }
+.ico_fail { background: #f33; }
+#editArea { min-height: 60px; border-top: 1px solid #ddd; padding: 8px; outline: none; white-space: pre-wrap; }
+</style>
+</head>
+<body>
+<div class="main">
+  <div class="panel">
+    <div id="search_bar"><input type="text" placeholder="搜索"></div>
+    <div id="J_NavChatScrollBody"></div>
+  </div>
+  <div id="chatArea">
+    <div class="chat_hd"><span class="nickname"></span></div>
+    <div class="box_bd"></div>
+    <div id="editArea" contenteditable="true"></div>
+  </div>
+</div>
+<script>
+(function () {
+var CFG = __MOCK_CONFIG__;
+var state = {chats: {}, order: [], active: null, seq: 0, localSeq: 0};
+var list = document.getElementById('J_NavChatScrollBody');
+var pane = document.querySelector('#chatArea .box_bd');
+var header = document.querySelector('#chatArea .chat_hd .nickname');
+var editor = document.getElementById('editArea');
+var search = document.querySelector('#search_bar input');
+
+function chatItem(chat) {
+    var el = document.createElement('div');
+    el.className = 'chat_item';
+    el.setAttribute('data-username', chat.username);
+    el.innerHTML = '<div class="info"><h3 class="nickname"><span class="nickname_text"></span></h3>'
+        + '<p class="msg"></p></div>';
+    el.querySelector('.nickname_text').textContent = chat.name;
+    el.addEventListener('click', function () { activate(chat); });
+    chat.itemEl = el;
+    return el;
+}
+function renderItem(chat) {
+    var el = chat.itemEl;
+    el.classList.toggle('active', chat === state.active);
+    el.querySelector('.msg').textContent = chat.preview || '';
+    var badge = el.querySelector('.web_wechat_reddot_middle');
+    if (chat.unread > 0) {
+        if (!badge) {
+            badge = document.createElement('i');
+            badge.className = 'web_wechat_reddot_middle';
+            el.appendChild(badge);
+        }
+        badge.textContent = String(chat.unread);
+    } else if (badge) {
+        badge.parentNode.removeChild(badge);
+    }
+}
+function moveToTop(chat) {
+    if (list.firstChild !== chat.itemEl) { list.insertBefore(chat.itemEl, list.firstChild); }
+}
+function bubble(m) {
+    var el = document.createElement('div');
+    el.className = 'message ng-scope ' + (m.dir === 'out' ? 'me' : 'you');
+    if (m.msgId) { el.setAttribute('data-msgid', m.msgId); }
+    var b = document.createElement('div');
+    b.className = 'bubble';
+    var pre = document.createElement('pre');
+    pre.className = 'js_message_plain ng-binding';
+    pre.textContent = m.text;
+    b.appendChild(pre);
+    el.appendChild(b);
+    m.el = el;
+    renderStatus(m);
+    return el;
+}
+function renderStatus(m) {
+    if (!m.el || m.dir !== 'out') { return; }
+    if (m.msgId) { m.el.setAttribute('data-msgid', m.msgId); }
+    var icons = m.el.querySelectorAll('.ico_loading, .ico_fail');
+    for (var i = 0; i < icons.length; i++) { icons[i].parentNode.removeChild(icons[i]); }
+    if (m.status === 'sending' || m.status === 'failed') {
+        var icon = document.createElement('i');
+        icon.className = m.status === 'sending' ? 'ico_loading' : 'ico_fail';
+        m.el.insertBefore(icon, m.el.firstChild);
+    }
+}
+function activate(chat) {
+    var previous = state.active;
+    state.active = chat;
+    chat.unread = 0;
+    if (previous && previous !== chat) { renderItem(previous); }
+    renderItem(chat);
+    header.textContent = chat.name;
+    // Only group chats have a member count (the monitor's group indicator probe looks for it).
+    var members = document.querySelector('#chatArea .chat_hd .chat_members');
+    if (members) { members.parentNode.removeChild(members); }
+    if (chat.isGroup) {
+        members = document.createElement('span');
+        members.className = 'chat_members';
+        members.textContent = '(3)';
+        header.parentNode.appendChild(members);
+    }
+    pane.innerHTML = '';
+    var history = chat.messages.slice(-CFG.pane_history);
+    for (var i = 0; i < history.length; i++) { pane.appendChild(bubble(history[i])); }
+    pane.scrollTop = pane.scrollHeight;
+}
+function addMessage(chat, m) {
+    chat.messages.push(m);
+    if (chat.messages.length > CFG.max_history) { chat.messages.shift(); }
+    chat.preview = m.text;
+    moveToTop(chat);
+    if (chat === state.active) {
+        pane.appendChild(bubble(m));
+        while (pane.children.length > CFG.pane_history) { pane.removeChild(pane.firstChild); }
+        pane.scrollTop = pane.scrollHeight;
+    } else if (m.dir === 'in') {
+        chat.unread += 1;
+    }
+    renderItem(chat);
+}
+function chatFor(username, name, isGroup) {
+    var chat = state.chats[username];
+    if (!chat) {
+        chat = {name: name, username: username, isGroup: !!isGroup, messages: [], unread: 0, preview: ''};
+        state.chats[username] = chat;
+        state.order.push(chat);
+        list.appendChild(chatItem(chat));
+        renderItem(chat);
+    }
+    return chat;
+}
+function onInbound(ev) {
+    var chat = chatFor(ev.username, ev.contact, ev.is_group);
+    addMessage(chat, {dir: 'in', text: ev.text, msgId: ev.msg_id});
+}
+function sendText(text) {
+    var chat = state.active;
+    if (!chat || !text) { return; }
+    var m = {dir: 'out', text: text, msgId: '', status: 'sending', localId: 'local-' + (++state.localSeq)};
+    addMessage(chat, m);
+    fetch('/api/send', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({contact: chat.name, username: chat.username, text: text, local_id: m.localId})
+    }).then(function (r) { return r.json(); }).then(function (res) {
+        m.status = res.ok ? 'sent' : 'failed';
+        m.msgId = res.msg_id || '';
+        renderStatus(m);
+    }).catch(function () {
+        m.status = 'failed';
+        renderStatus(m);
+    });
+}
+editor.addEventListener('keydown', function (e) {
+    if (e.key !== 'Enter') { return; }
+    e.preventDefault();
+    if (e.ctrlKey || e.metaKey) {
+        document.execCommand('insertLineBreak');
+        return;
+    }
+    var text = (editor.innerText || '').replace(/\n+$/, '');
+    editor.innerHTML = '';
+    sendText(text);
+});
+search.addEventListener('input', function () {
+    var q = search.value.trim();
+    for (var i = 0; i < state.order.length; i++) {
+        var chat = state.order[i];
+        chat.itemEl.classList.toggle('filtered', !!q && chat.name.indexOf(q) < 0);
+    }
+});
+search.addEventListener('keydown', function (e) {
+    if (e.key === 'Escape') { search.value = ''; search.dispatchEvent(new Event('input')); }
+});
+function poll() {
+    fetch('/api/poll?since=' + state.seq).then(function (r) { return r.json(); }).then(function (res) {
+        var events = res.events || [];
+        for (var i = 0; i < events.length; i++) {
+            state.seq = Math.max(state.seq, events[i].seq);
+            if (events[i].kind === 'inbound') { onInbound(events[i]); }
+        }
+        setTimeout(poll, 0);
+    }).catch(function () { setTimeout(poll, 500); });
+}
+for (var i = 0; i < CFG.contacts.length; i++) {
+    var c = CFG.contacts[i];
+    var chat = chatFor(c.username, c.name, c.is_group);
+    for (var h = 0; h < CFG.history; h++) {
+        chat.messages.push({dir: h % 2 ? 'out' : 'in', text: 'history ' + (h + 1), msgId: c.username + '-h' + h});
+    }
+    chat.preview = chat.messages.length ? chat.messages[chat.messages.length - 1].text : '';
+    renderItem(chat);
+}
+state.seq = CFG.seq;
+poll();
+})();
+</script>
+</body>
+</html>
+"""
+
+
+class MockWeChatServer:
+    """Serves MOCK_PAGE_HTML on localhost and relays inbound/outbound traffic for it (thread-safe)."""
+
+    def __init__(
+        self,
+        contacts: Iterable[MockContact],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ack_delay_ms: float = 120.0,
+        send_fail_rate: float = 0.0,
+        history: int = 2,
+        max_events: int = 5000,
+        seed: Optional[int] = None,
+    ):
+        self.contacts = list(contacts)
+        self._by_name = {c.name: c for c in self.contacts}
+        self.host = host
+        self.port = int(port)
+        self.ack_delay_ms = max(0.0, float(ack_delay_ms))
+        self.send_fail_rate = min(1.0, max(0.0, float(send_fail_rate)))
+        self.history = max(0, int(history))
+        self.on_send: Optional[Callable[[SentMessage], None]] = None
+        self._rng = random.Random(seed)
+        self._cond = threading.Condition()
+        self._events: deque = deque(maxlen=max(100, int(max_events)))
+        self._seq = 0
+        self._msg_seq = 0
+        self._sent: list[SentMessage] = []
+        self._stopping = False
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self) -> str:
+        mock = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def _reply(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, data) -> None:
+                self._reply(200, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path in ("/", "/index.html"):
+                    self._reply(200, mock.render_page().encode("utf-8"), "text/html; charset=utf-8")
+                elif parsed.path == "/api/poll":
+                    query = parse_qs(parsed.query)
+                    since = int((query.get("since") or ["0"])[0] or 0)
+                    self._json({"events": mock.wait_events(since, timeout=25.0)})
+                else:
+                    self._reply(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/api/send":
+                    self._reply(404, b"not found", "text/plain")
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    data = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+                except Exception:
+                    self._reply(400, b"bad request", "text/plain")
+                    return
+                self._json(mock.handle_send(data))
+
+        self._stopping = False
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self.port = int(self._httpd.server_address[1])
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="mock_wechat_web")
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def render_page(self) -> str:
+        with self._cond:
+            seq = self._seq
+        cfg = {
+            "contacts": [{"name": c.name, "username": c.username, "is_group": c.is_group} for c in self.contacts],
+            "history": self.history,
+            "pane_history": 50,
+            "max_history": 200,
+            "seq": seq,  # a reloaded page only receives messages injected after it loaded
+        }
+        return MOCK_PAGE_HTML.replace("__MOCK_CONFIG__", json.dumps(cfg, ensure_ascii=False))
+
+    def inject(self, contact: str, text: str) -> InboundMessage:
+        """Deliver an inbound message from `contact` (a configured name, or a new private chat)."""
+        known = self._by_name.get(contact)
+        with self._cond:
+            self._seq += 1
+            self._msg_seq += 1
+            message = InboundMessage(
+                seq=self._seq,
+                msg_id=f"in-{self._msg_seq}",
+                contact=contact,
+                username=known.username if known else f"@mock-{contact}",
+                text=str(text),
+                injected_at=time.time(),
+            )
+            self._events.append({
+                "kind": "inbound",
+                "seq": message.seq,
+                "msg_id": message.msg_id,
+                "contact": message.contact,
+                "username": message.username,
+                "is_group": bool(known.is_group) if known else False,
+                "text": message.text,
+            })
+            self._cond.notify_all()
+        return message
+
+    def wait_events(self, since: int, timeout: float) -> list[dict]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._stopping or self._seq > since, timeout=timeout)
+            return [ev for ev in self._events if ev["seq"] > since]
+
+    def handle_send(self, data: dict) -> dict:
+        received_at = time.time()
+        ok = self._rng.random() >= self.send_fail_rate
+        with self._cond:
+            self._msg_seq += 1
+            msg_id = f"out-{self._msg_seq}"
+        sent = SentMessage(
+            msg_id=msg_id if ok else "",
+            contact=str(data.get("contact") or ""),
+            text=str(data.get("text") or ""),
+            received_at=received_at,
+            ok=ok,
+        )
+        with self._cond:
+            self._sent.append(sent)
+        callback = self.on_send
+        if callback is not None:
+            try:
+                callback(sent)
+            except Exception:
+                pass
+        if self.ack_delay_ms:
+            time.sleep(self.ack_delay_ms / 1000.0)
+        return {"ok": ok, "msg_id": sent.msg_id}
+
+    def sent_messages(self) -> list[SentMessage]:
+        with self._cond:
+            return list(self._sent)
+
+
+class TrafficGenerator:
+    """
+    Injects inbound traffic into a MockWeChatServer.
+
+    - `run(duration_sec)`: Poisson arrivals at `rate_per_sec`; with `hot_contacts` set, `hot_share` of the
+      traffic goes to that many busy chats, the rest is spread over everyone.
+    - `run_script(events)`: a fixed timeline, e.g. loaded from JSON by `load_script`:
+      `[{"at": 0.5, "contact": "bench_user_001", "text": "hi", "count": 1}, ...]` (`at` in seconds).
+
+    Every message text starts with a unique token (`[bench-000001]`) so consumers can match detections.
+    """
+
+    def __init__(
+        self,
+        server: MockWeChatServer,
+        rate_per_sec: float = 1.0,
+        hot_contacts: int = 0,
+        hot_share: float = 0.8,
+        text_chars: int = 24,
+        mention: str = "",
+        seed: Optional[int] = None,
+    ):
+        self.server = server
+        self.contacts = list(server.contacts)
+        self.rate_per_sec = max(0.001, float(rate_per_sec))
+        self.hot = self.contacts[: max(0, int(hot_contacts))]
+        self.hot_share = min(1.0, max(0.0, float(hot_share)))
+        self.text_chars = max(0, int(text_chars))
+        # Group messages are prefixed with "@<mention> " so group_mention_required does not drop them.
+        self.mention = mention
+        self._rng = random.Random(seed)
+        self._token = 0
+        self._lock = threading.Lock()
+        self.injected: dict[str, InboundMessage] = {}
+
+    def next_token(self) -> str:
+        with self._lock:
+            self._token += 1
+            return f"[bench-{self._token:06d}]"
+
+    def inject(self, contact: MockContact, text: Optional[str] = None) -> InboundMessage:
+        token = self.next_token()
+        body = text if text is not None else "".join(self._rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(self.text_chars))
+        prefix = f"@{self.mention} " if contact.is_group and self.mention else ""
+        message = self.server.inject(contact.name, f"{prefix}{token} {body}".rstrip())
+        with self._lock:
+            self.injected[token] = message
+        return message
+
+    def _pick(self) -> MockContact:
+        if self.hot and self._rng.random() < self.hot_share:
+            return self._rng.choice(self.hot)
+        return self._rng.choice(self.contacts)
+
+    def run(self, duration_sec: float, stop_event: Optional[threading.Event] = None) -> int:
+        """Inject Poisson traffic for `duration_sec`; returns the number of messages injected."""
+        stop_event = stop_event or threading.Event()
+        deadline = time.time() + max(0.0, float(duration_sec))
+        injected = 0
+        while not stop_event.is_set():
+            delay = self._rng.expovariate(self.rate_per_sec)
+            if time.time() + delay >= deadline:
+                break
+            if stop_event.wait(delay):
+                break
+            self.inject(self._pick())
+            injected += 1
+        return injected
+
+    def run_script(self, events: list[dict], stop_event: Optional[threading.Event] = None) -> int:
+        stop_event = stop_event or threading.Event()
+        by_name = {c.name: c for c in self.contacts}
+        started = time.time()
+        injected = 0
+        for ev in sorted(events, key=lambda e: float(e.get("at", 0))):
+            wait = started + float(ev.get("at", 0)) - time.time()
+            if wait > 0 and stop_event.wait(wait):
+                break
+            name = str(ev.get("contact") or "")
+            contact = by_name.get(name) or MockContact(name, f"@mock-{name}")
+            for _ in range(max(1, int(ev.get("count", 1)))):
+                self.inject(contact, ev.get("text"))
+                injected += 1
+        return injected
+
+    @staticmethod
+    def load_script(path: str) -> list[dict]:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        events = data.get("events") if isinstance(data, dict) else data
+        return [e for e in (events or []) if isinstance(e, dict)]
+
+
+def extract_tokens(text: str) -> list[str]:
+    """All benchmark tokens in a (possibly merged) message text."""
+    return TOKEN_RE.findall(str(text or ""))
@@ -0,0 +1,76 @@
+import os
+from typing import Optional
+
+# Linux /proc readers for the Chrome process tree driven by a WebDriver session.
+# Elsewhere (macOS/Windows) every function degrades to empty / zero results.
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_KB = (os.sysconf("SC_PAGE_SIZE") // 1024) if hasattr(os, "sysconf") else 4
+
+
+def _read_stat(pid: int) -> Optional[list[str]]:
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="utf-8", errors="replace") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    # comm (field 2) may contain spaces: split after the closing parenthesis
+    end = raw.rfind(")")
+    if end < 0:
+        return None
+    return raw[end + 2 :].split()
+
+
+def process_tree(root_pid: Optional[int]) -> list[int]:
+    """`root_pid` and all of its descendants (e.g. chromedriver -> chrome -> renderers)."""
+    if not root_pid or not os.path.isdir("/proc"):
+        return []
+    children: dict[int, list[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        fields = _read_stat(int(name))
+        if not fields:
+            continue
+        try:
+            children.setdefault(int(fields[1]), []).append(int(name))
+        except (IndexError, ValueError):
+            continue
+    tree: list[int] = []
+    stack = [int(root_pid)]
+    while stack:
+        pid = stack.pop()
+        if pid in tree:
+            continue
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm", "r", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time consumed so far by `pid`."""
+    fields = _read_stat(pid)
+    if not fields:
+        return 0.0
+    try:
+        return (int(fields[11]) + int(fields[12])) / float(_CLK_TCK)
+    except (IndexError, ValueError):
+        return 0.0
+
+
+def tree_usage(root_pid: Optional[int]) -> dict:
+    """{"processes", "rss_mb", "cpu_sec"} summed over the process tree of `root_pid`."""
+    pids = process_tree(root_pid)
+    return {
+        "processes": len(pids),
+        "rss_mb": round(sum(rss_kb(p) for p in pids) / 1024.0, 1),
+        "cpu_sec": round(sum(cpu_seconds(p) for p in pids), 3),
+    }
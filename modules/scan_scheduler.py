@@ -0,0 +1,130 @@
+import threading
+import time
+from typing import Iterable, Optional
+
+
+class UnreadScanScheduler:
+    """
+    Orders the unread conversations of a chat-list snapshot for one scan cycle.
+
+    Priority = unread badge count (capped) + time the chat has been waiting + VIP boost.
+    Chats that have waited longer than `starvation_sec` are served first regardless
+    of score, so a busy VIP group can never starve a quiet one-to-one chat.
+    """
+
+    def __init__(
+        self,
+        vip_contacts: Optional[Iterable[str]] = None,
+        starvation_sec: float = 10.0,
+        unread_cap: int = 20,
+        wait_weight: float = 2.0,
+        vip_boost: float = 100.0,
+    ):
+        self.vip_contacts = {str(c) for c in (vip_contacts or []) if str(c).strip()}
+        self.starvation_sec = max(0.0, float(starvation_sec))
+        self.unread_cap = max(1, int(unread_cap))
+        self.wait_weight = float(wait_weight)
+        self.vip_boost = float(vip_boost)
+        # chat key -> time it was first seen unread (cleared once served or read elsewhere)
+        self._waiting_since: dict[str, float] = {}
+
+    def is_vip(self, item) -> bool:
+        return item.nickname in self.vip_contacts or (bool(item.username) and item.username in self.vip_contacts)
+
+    def order(self, unread_items: list, now: Optional[float] = None) -> list:
+        """Return unread snapshot items in service order and refresh waiting times."""
+        now = time.time() if now is None else float(now)
+        keys = {item.key for item in unread_items}
+        for key in list(self._waiting_since):
+            if key not in keys:
+                # Read on the phone / another client: stop tracking.
+                del self._waiting_since[key]
+        for item in unread_items:
+            self._waiting_since.setdefault(item.key, now)
+
+        def waited(item) -> float:
+            return max(0.0, now - self._waiting_since.get(item.key, now))
+
+        def score(item) -> float:
+            value = min(int(item.unread), self.unread_cap) + self.wait_weight * waited(item)
+            if self.is_vip(item):
+                value += self.vip_boost
+            return value
+
+        starving = [item for item in unread_items if waited(item) >= self.starvation_sec]
+        starving.sort(key=lambda item: (waited(item), score(item)), reverse=True)
+        starving_keys = {item.key for item in starving}
+        rest = [item for item in unread_items if item.key not in starving_keys]
+        rest.sort(key=lambda item: (score(item), waited(item)), reverse=True)
+        return starving + rest
+
+    def waiting_for(self, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else float(now)
+        since = self._waiting_since.get(key)
+        return 0.0 if since is None else max(0.0, now - since)
+
+    def mark_served(self, key: str) -> None:
+        self._waiting_since.pop(key, None)
+
+
+class AdaptiveCadence:
+    """
+    Scan interval controller for the monitor loop.
+
+    - Fast cadence (`min_sec`) while conversations are active and for `active_hold_sec` after.
+    - Exponential backoff (`backoff_factor`) towards `max_sec` while idle.
+    - Snaps back to `min_sec` immediately on activity (new message, snapshot change, send).
+    """
+
+    def __init__(
+        self,
+        min_sec: float = 0.2,
+        max_sec: float = 10.0,
+        backoff_factor: float = 1.6,
+        active_hold_sec: float = 5.0,
+    ):
+        self.min_sec = max(0.01, float(min_sec))
+        self.max_sec = max(self.min_sec, float(max_sec))
+        self.backoff_factor = max(1.0, float(backoff_factor))
+        self.active_hold_sec = max(0.0, float(active_hold_sec))
+        self._lock = threading.Lock()
+        self._interval = self.min_sec
+        self._reason = "startup"
+        self._last_activity = time.time()
+        self._activity_counts: dict[str, int] = {}
+
+    def note_activity(self, reason: str) -> None:
+        with self._lock:
+            self._interval = self.min_sec
+            self._reason = str(reason)
+            self._last_activity = time.time()
+            self._activity_counts[self._reason] = self._activity_counts.get(self._reason, 0) + 1
+
+    def note_idle(self) -> None:
+        with self._lock:
+            if time.time() - self._last_activity < self.active_hold_sec:
+                self._interval = self.min_sec
+                self._reason = "active_hold"
+                return
+            self._interval = min(self.max_sec, self._interval * self.backoff_factor)
+            self._reason = "idle_ceiling" if self._interval >= self.max_sec else "idle_backoff"
+
+    def current(self) -> float:
+        with self._lock:
+            return self._interval
+
+    def idle_seconds(self) -> float:
+        """Seconds since the last activity (message, snapshot change, send)."""
+        with self._lock:
+            return max(0.0, time.time() - self._last_activity)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval_sec": round(self._interval, 3),
+                "reason": self._reason,
+                "since_activity_sec": round(max(0.0, time.time() - self._last_activity), 3),
+                "min_sec": self.min_sec,
+                "max_sec": self.max_sec,
+                "activity_counts": dict(self._activity_counts),
+            }
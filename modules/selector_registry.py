@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from selenium.common.exceptions import JavascriptException, UnexpectedAlertPresentException
+
+from modules.web_scripts import SELECTOR_PROBE_JS
+
+
+@dataclass(frozen=True)
+class SelectorMatch:
+    selector: str
+    element: Any
+    text: str
+
+
+class SelectorRegistry:
+    """
+    Resolves logical page elements (active-chat header, group indicator, search box, ...)
+    against an ordered list of candidate CSS selectors.
+
+    - All candidates are probed in-page with one execute_script round trip (no implicit wait).
+    - The candidate that matched is remembered for the session and probed first next time.
+    - A different candidate matching later is recorded as a drift event, so a wx.qq.com DOM
+      change shows up in the stats instead of as unexplained slowness.
+    """
+
+    def __init__(self, logger, max_drift_events: int = 50):
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._candidates: dict[str, list[str]] = {}
+        self._resolved: dict[str, str] = {}
+        self._drift_events: deque = deque(maxlen=max(1, int(max_drift_events)))
+        self._timings: dict[str, dict[str, dict[str, float]]] = {}
+        self._misses: dict[str, int] = {}
+
+    def register(self, name: str, candidates: list[str]) -> None:
+        cleaned = [str(c) for c in (candidates or []) if str(c).strip()]
+        with self._lock:
+            self._candidates[name] = cleaned
+            if self._resolved.get(name) not in cleaned:
+                self._resolved.pop(name, None)
+
+    def reset(self) -> None:
+        """Forget resolutions (new browser session); drift history and timings are kept."""
+        with self._lock:
+            self._resolved.clear()
+
+    def candidates(self, name: str) -> list[str]:
+        """Candidate selectors for `name`, the resolved one first."""
+        with self._lock:
+            cands = list(self._candidates.get(name) or [])
+            resolved = self._resolved.get(name)
+        if resolved and resolved in cands:
+            cands.remove(resolved)
+            cands.insert(0, resolved)
+        return cands
+
+    def resolved(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._resolved.get(name)
+
+    def probe(self, driver, name: str, need_text: bool = False, need_visible: bool = False) -> Optional[SelectorMatch]:
+        """Return the first element matching any candidate of `name` (resolved selector first), or None."""
+        cands = self.candidates(name)
+        if not driver or not cands:
+            return None
+        started = time.perf_counter()
+        try:
+            raw = driver.execute_script(SELECTOR_PROBE_JS, cands, {"need_text": need_text, "need_visible": need_visible})
+        except (JavascriptException, UnexpectedAlertPresentException) as e:
+            self.logger.debug(f"选择器探测脚本失败 ({name}): {e}")
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        index = int((raw or {}).get("index", -1)) if isinstance(raw, dict) else -1
+        if index < 0 or index >= len(cands):
+            self._record(name, None, elapsed_ms)
+            return None
+        selector = cands[index]
+        self._record(name, selector, elapsed_ms)
+        return SelectorMatch(selector=selector, element=raw.get("element"), text=str(raw.get("text") or ""))
+
+    def _record(self, name: str, selector: Optional[str], elapsed_ms: float) -> None:
+        with self._lock:
+            bucket = self._timings.setdefault(name, {}).setdefault(
+                selector or "<miss>", {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            bucket["count"] += 1
+            bucket["total_ms"] += elapsed_ms
+            bucket["max_ms"] = max(bucket["max_ms"], elapsed_ms)
+            if selector is None:
+                self._misses[name] = self._misses.get(name, 0) + 1
+                return
+            previous = self._resolved.get(name)
+            self._resolved[name] = selector
+        if previous is None:
+            self.logger.info(f"选择器已解析: {name} -> '{selector}'")
+        elif previous != selector:
+            event = {"name": name, "from": previous, "to": selector, "ts": time.time()}
+            with self._lock:
+                self._drift_events.append(event)
+            self.logger.warning(f"检测到选择器漂移: {name} '{previous}' -> '{selector}' (网页结构可能已变化)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            timings = {
+                name: {
+                    sel: {
+                        "count": int(b["count"]),
+                        "avg_ms": round(b["total_ms"] / b["count"], 3) if b["count"] else 0.0,
+                        "max_ms": round(b["max_ms"], 3),
+                    }
+                    for sel, b in per_sel.items()
+                }
+                for name, per_sel in self._timings.items()
+            }
+            return {
+                "resolved": dict(self._resolved),
+                "misses": dict(self._misses),
+                "drift_events": list(self._drift_events),
+                "timings": timings,
+            }
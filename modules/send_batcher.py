@@ -0,0 +1,37 @@
+import time
+from typing import Callable, Optional
+
+
+class ContactAffinityBatcher:
+    """
+    Orders a window of pending send jobs so that each contact is selected once.
+
+    - Jobs are grouped by target; inside a group the queue order is kept, so replies to
+      one contact never overtake each other.
+    - The chat that is already open is served first (no chat switch at all).
+    - Other groups follow in order of first appearance, except that a group whose oldest
+      job has been waiting longer than `max_reorder_delay_sec` goes ahead of everything,
+      so a busy active chat cannot keep pushing another contact's reply back.
+    """
+
+    def __init__(self, max_reorder_delay_sec: float = 2.0, key: Optional[Callable] = None):
+        self.max_reorder_delay_sec = max(0.0, float(max_reorder_delay_sec))
+        self.key = key or (lambda job: job.to_wxid)
+
+    def plan(self, jobs: list, active_contact: str = "", now: Optional[float] = None) -> list[list]:
+        """Split `jobs` (queue order) into per-contact groups, in service order."""
+        now = time.time() if now is None else float(now)
+        groups: dict[str, list] = {}
+        for job in jobs:
+            groups.setdefault(self.key(job), []).append(job)
+
+        def oldest(target: str) -> float:
+            return min(float(job.created_at) for job in groups[target])
+
+        overdue = [t for t in groups if now - oldest(t) >= self.max_reorder_delay_sec]
+        overdue.sort(key=oldest)
+        rest = [t for t in groups if t not in overdue]
+        if active_contact and active_contact in rest:
+            rest.remove(active_contact)
+            rest.insert(0, active_contact)
+        return [groups[t] for t in overdue + rest]
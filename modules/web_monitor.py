@@ -1,11 +1,11 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
+    JavascriptException,
     NoAlertPresentException,
     NoSuchElementException,
     StaleElementReferenceException,
@@ -14,11 +14,178 @@ from selenium.common.exceptions import (
 )
 import time
 import os # Import os module
-from pathlib import Path
-import stat
 import threading
 import re
-from contextlib import contextmanager
+import sys
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from modules.browser_watchdog import BrowserWatchdog
+from modules.dedup import MessageDedupStore
+from modules.detached_chrome import WECHAT_WEB_URL, DetachedChrome
+from modules.driver_profiler import DriverProfiler, ProfileUnit
+from modules.driver_resolver import ChromeDriverResolver
+from modules.driver_scheduler import (
+    PRIORITY_ACK,
+    PRIORITY_HOUSEKEEPING,
+    PRIORITY_SCAN,
+    PRIORITY_NAMES,
+    PRIORITY_SEND,
+    CancelledError,
+    DriverScheduler,
+)
+from modules.group_cache import GroupChatCache, is_group_username
+from modules.scan_scheduler import AdaptiveCadence, UnreadScanScheduler
+from modules.selector_registry import SelectorRegistry
+from modules.web_scripts import (
+    CHAT_ITEM_BY_INDEX_JS,
+    CHAT_ITEM_LOOKUP_JS,
+    CHAT_ITEM_WAIT_JS,
+    CHAT_LIST_SNAPSHOT_JS,
+    INPUT_BOX_INSERT_TEXT_JS,
+    INPUT_BOX_PREPARE_JS,
+    INPUT_BOX_TEXT_LENGTH_JS,
+    MESSAGE_OBSERVER_DRAIN_JS,
+    MESSAGE_OBSERVER_INSTALL_JS,
+    MESSAGE_PANE_EXTRACT_JS,
+    SEND_ACK_ARM_JS,
+    SEND_ACK_POLL_JS,
+    SEND_ACK_WAIT_JS,
+    SEARCH_BOX_CLEAR_JS,
+)
+
+
+@dataclass(frozen=True)
+class ChatItemSnapshot:
+    index: int
+    nickname: str
+    unread: int
+    username: str
+    active: bool
+    preview_hash: str
+
+    @property
+    def key(self) -> str:
+        return self.username or self.nickname
+
+
+@dataclass(frozen=True)
+class ChatListSnapshot:
+    logged_in: bool
+    taken_at: float
+    items: tuple[ChatItemSnapshot, ...] = field(default_factory=tuple)
+
+    @property
+    def unread_items(self) -> list[ChatItemSnapshot]:
+        return [item for item in self.items if item.unread > 0]
+
+    @property
+    def signature(self) -> tuple:
+        """Changes whenever any chat's unread count, preview or active flag changes."""
+        return tuple((item.key, item.unread, item.preview_hash, item.active) for item in self.items)
+
+    @property
+    def active_item(self) -> Optional[ChatItemSnapshot]:
+        for item in self.items:
+            if item.active:
+                return item
+        return None
+
+    @classmethod
+    def from_raw(cls, raw: dict) -> "ChatListSnapshot":
+        items = []
+        for entry in (raw or {}).get("items") or []:
+            try:
+                items.append(
+                    ChatItemSnapshot(
+                        index=int(entry.get("index", len(items))),
+                        nickname=str(entry.get("nickname") or "").strip(),
+                        unread=int(entry.get("unread") or 0),
+                        username=str(entry.get("username") or ""),
+                        active=bool(entry.get("active")),
+                        preview_hash=str(entry.get("preview_hash") or ""),
+                    )
+                )
+            except (TypeError, ValueError, AttributeError):
+                continue
+        return cls(logged_in=bool((raw or {}).get("logged_in")), taken_at=time.time(), items=tuple(items))
+
+
+@dataclass(frozen=True)
+class PaneMessage:
+    index: int
+    direction: str  # "in" | "out" | "sys"
+    text: str
+    has_content: bool
+    msg_id: str
+    cls: str
+
+
+@dataclass(frozen=True)
+class MessagePane:
+    total: int
+    messages: tuple[PaneMessage, ...] = field(default_factory=tuple)
+
+    def last_received(self) -> Optional[PaneMessage]:
+        for msg in reversed(self.messages):
+            if msg.direction == "in":
+                return msg
+        return None
+
+    def last_outgoing(self) -> Optional[PaneMessage]:
+        for msg in reversed(self.messages):
+            if msg.direction == "out":
+                return msg
+        return None
+
+    @classmethod
+    def from_raw(cls, raw: dict) -> "MessagePane":
+        messages = []
+        for entry in (raw or {}).get("messages") or []:
+            try:
+                messages.append(
+                    PaneMessage(
+                        index=int(entry.get("index", 0)),
+                        direction=str(entry.get("direction") or "in"),
+                        text=str(entry.get("text") or "").strip(),
+                        has_content=bool(entry.get("has_content")),
+                        msg_id=str(entry.get("msg_id") or ""),
+                        cls=str(entry.get("cls") or ""),
+                    )
+                )
+            except (TypeError, ValueError, AttributeError):
+                continue
+        return cls(total=int((raw or {}).get("total") or 0), messages=tuple(messages))
+
+
+@dataclass
+class ReadCursor:
+    """Last message position seen in a conversation (DOM message id preferred, index+text as fallback)."""
+    last_index: int = -1
+    last_text: str = ""
+    last_msg_id: str = ""
+
+
+@dataclass(frozen=True)
+class SendAck:
+    """
+    Send receipt read from the page:
+    delivered (bubble shown, no sending/failed icon), sending (still spinning when last seen),
+    failed (failed icon shown), pending (no matching bubble yet), unarmed (watch could not be
+    armed or is gone), not_sent (contact/input box step failed before Enter).
+    """
+    state: str
+    elapsed_ms: float = 0.0
+    msg_id: str = ""
+
+    @property
+    def ok(self) -> bool:
+        # Only a failed icon or a send that never reached Enter is a confirmed failure; "pending"
+        # (no bubble matched) and "unarmed" give no evidence either way and must not trigger a resend.
+        return self.state not in ("failed", "not_sent")
+
 
 class WebMonitor:
     def __init__(self, logger, ai_model, config, message_callback=None):
@@ -30,10 +197,40 @@ class WebMonitor:
         self.is_running = False
         # Serialize all Selenium operations (monitor loop vs. sending replies) to avoid UI switching races.
         self._driver_lock = threading.RLock()
-        # Give outgoing sends priority: pause monitoring while sending to reduce reply latency.
-        self._pause_event = threading.Event()
-        self._pause_lock = threading.RLock()
-        self._pause_count = 0
+        # One driver thread owns the session: sends > ACK polls > scans > housekeeping. Scans check
+        # preempt_requested() between steps, so a queued send waits for one step, not a whole scan.
+        self._scheduler = DriverScheduler(self.logger, name="wechat_driver", lock=self._driver_lock)
+        self._scheduler.on_task_done = self._on_driver_task_done
+        # Optional metrics sink set by the owner: timing_hook(metric, seconds, labels).
+        # Metrics: "scan_step" {kind=scan|observe}, "driver_task" {priority, phase=wait|run}, "webdriver_command" {command}.
+        self.timing_hook: Optional[Callable[[str, float, dict], None]] = None
+        # Opt-in WebDriver round-trip profiler: commands per calling method, per monitor cycle and per send.
+        self.driver_profiler: Optional[DriverProfiler] = None
+        if self.config.get('driver_profiler_enabled', False):
+            self.driver_profiler = DriverProfiler(
+                self.logger,
+                owner_file=__file__,
+                owner_methods=vars(WebMonitor),
+                window=int(self.config.get('driver_profiler_window', 200)),
+                log_interval_sec=float(self.config.get('driver_profiler_log_interval_sec', 60)),
+            )
+        # Waiting for a send ACK is sliced so queued sends can run in between.
+        self.ack_wait_slice_ms = min(3000, max(50, int(self.config.get('ack_wait_slice_ms', 200))))
+        # Implicit wait stays 0: every lookup that may legitimately miss has its own explicit timeout,
+        # so an absent element costs one round trip instead of a multi-second stall.
+        self.implicit_wait_sec = max(0.0, float(self.config.get('implicit_wait_sec', 0)))
+        self.login_check_timeout_sec = max(0.0, float(self.config.get('login_check_timeout_sec', 0)))
+        self.unread_lookup_timeout_sec = max(0.0, float(self.config.get('unread_lookup_timeout_sec', 0)))
+        self.active_chat_lookup_timeout_sec = max(0.0, float(self.config.get('active_chat_lookup_timeout_sec', 0)))
+        self.element_lookup_timeout_sec = max(0.0, float(self.config.get('element_lookup_timeout_sec', 0.5)))
+        self.input_box_timeout_sec = max(0.0, float(self.config.get('input_box_timeout_sec', 5)))
+        # QR login wait on startup; a browser recycle reuses the session and runs on the driver thread,
+        # so its login wait is much shorter (queued sends wait behind it) and it retries a few times.
+        # `login_timeout` is the older name of the key, still honoured for existing configs.
+        self.login_timeout_sec = max(5.0, float(self.config.get('login_timeout_sec', self.config.get('login_timeout', 120))))
+        self.recycle_login_timeout_sec = max(1.0, float(self.config.get('recycle_login_timeout_sec', 20)))
+        self.recycle_attempts = max(1, int(self.config.get('recycle_attempts', 3)))
+        self.recycle_retry_delay_sec = max(0.0, float(self.config.get('recycle_retry_delay_sec', 5)))
         
         # Selectors from config (provide defaults if not found)
         self.login_success_selector = self.config.get('login_success_selector', '.main')
@@ -41,10 +238,103 @@ class WebMonitor:
         self.unread_msg_selector = self.config.get('unread_msg_selector', '.chat_item:has(.web_wechat_reddot_middle)') # Needs verification!
         self.active_chat_selector = self.config.get('active_chat_selector', '.chat_item.active') # Needs verification!
         self.contact_name_in_list_selector = '.nickname .nickname_text' # Used for both unread and active - VERIFY
+        self.chat_item_selector = self.config.get('chat_item_selector', '.chat_item')
+        self.unread_badge_selector = self.config.get('unread_badge_selector', '.web_wechat_reddot_middle')
+        self.chat_preview_selector = self.config.get('chat_preview_selector', '.info .msg')
+        # Snapshot mode: one execute_script per idle scan instead of several WebDriver round trips.
+        self.chat_list_snapshot_enabled = bool(self.config.get('chat_list_snapshot_enabled', True))
+        self._last_active_preview: dict[str, str] = {}
+        # Last chat seen open (header read, snapshot, click); lets the send worker batch by contact without a round trip.
+        self._active_contact_hint = ""
+        # Contact locator index (display name / data-username -> chat item), refreshed from each snapshot.
+        self._contact_index: dict[str, ChatItemSnapshot] = {}
+        # Drain every unread conversation per cycle (priority + aging), bounded by a time budget.
+        self.scan_cycle_budget_sec = float(self.config.get('scan_cycle_budget_sec', 3.0))
+        self._scan_scheduler = UnreadScanScheduler(
+            vip_contacts=self.config.get('vip_contacts', []),
+            starvation_sec=float(self.config.get('scan_starvation_sec', 10.0)),
+        )
+        # Adaptive cadence: fast while chats are active, exponential backoff to a ceiling when idle.
+        check_interval = float(self.config.get('check_interval', 3))
+        if bool(self.config.get('adaptive_cadence_enabled', True)):
+            self._cadence = AdaptiveCadence(
+                min_sec=float(self.config.get('cadence_min_sec', 0.2)),
+                max_sec=float(self.config.get('cadence_max_sec', max(10.0, check_interval))),
+                backoff_factor=float(self.config.get('cadence_backoff_factor', 1.6)),
+                active_hold_sec=float(self.config.get('cadence_active_hold_sec', 5.0)),
+            )
+        else:
+            # Legacy fixed cadence: 0.2s after activity, check_interval otherwise.
+            self._cadence = AdaptiveCadence(min_sec=0.2, max_sec=check_interval, backoff_factor=1e9, active_hold_sec=0)
+        # Set to cut the current wait short (e.g. a send just happened).
+        self._wake_event = threading.Event()
+        self._last_snapshot_signature: Optional[tuple] = None
+        # Push mode: an injected MutationObserver records new messages in-page; the loop long-polls it.
+        self.observer_enabled = bool(self.config.get('observer_enabled', True))
+        self.observer_long_poll_ms = int(self.config.get('observer_long_poll_ms', 400))
+        # Idle backoff in push mode: pause between long-polls (off the driver thread) up to this ceiling.
+        self.observer_idle_max_sec = max(0.0, float(self.config.get('observer_idle_max_sec', 2.0)))
+        self._observer_gen: Optional[str] = None
+        self.active_contact_header_selectors = self.config.get(
+            'active_contact_header_selectors',
+            [
+                '.chat_hd .nickname',
+                '.chat_info .nickname',
+                '.chat_title .nickname',
+                '.header .chat_name',
+            ],
+        )
+        # Per-conversation read cursors: every message after the cursor is forwarded, in order.
+        self._read_cursors: dict[str, ReadCursor] = {}
+        # Number of trailing `.message` elements read per extraction round trip.
+        self.message_extract_limit = int(self.config.get('message_extract_limit', 30))
+        # 自己发送的消息通常是绿色背景
+        self.outgoing_bg_colors = self.config.get(
+            'outgoing_bg_colors',
+            ['rgb(169, 236, 155)', 'rgb(160, 221, 148)', 'rgb(154, 216, 141)'],
+        )
+        # Logical element -> candidate selectors; resolved once per session, drift is recorded.
+        self.selectors = SelectorRegistry(self.logger)
+        self.selectors.register('active_chat_header', self.active_contact_header_selectors)
+        self.selectors.register(
+            'group_indicator',
+            self.config.get('group_indicator_selectors', ['.chat_hd .chat_members', '.group_chat_indicator', '[data-chattype="group"]']),
+        )
+        self.selectors.register('search_box', self.config.get('search_box_selectors', [
+            "#search_bar input",
+            ".search_bar input",
+            ".frm_search",
+            "input[placeholder*='搜索']",
+            "input[placeholder*='Search']",
+        ]))
+        self.selectors.register('current_user_name', [
+            '.nickname .nickname_text',
+            '.user_info .nickname',
+            '.header .nickname',
+            '.account .nickname',
+        ])
+        self.selectors.register('qr_code', ['.qrcode', '.login_box_qr', '[data-role="qrcode"]', '.js_qr_code_default_login'])
         self.last_message_selector = self.config.get('last_message_selector', '.message.ng-scope') # Needs verification!
         self.received_message_content_selector = self.config.get('received_message_content_selector', '.js_message_plain') # Needs verification!
         self.input_box_selector = self.config.get('input_box_selector', '#editArea') # Needs verification!
-        self.processed_message_signatures = set() # To avoid processing the same message multiple times
+        # Send macro: whole text inserted in one call; over-length replies are split into several messages.
+        self.send_chunk_max_chars = max(1, int(self.config.get('send_chunk_max_chars', 2000)))
+        # Send ACK: state icons inside an outgoing bubble (hidden once delivered).
+        self.ack_sending_selectors = list(self.config.get('ack_sending_selectors', ['.ico_loading']))
+        self.ack_failed_selectors = list(self.config.get('ack_failed_selectors', ['.ico_fail']))
+        self.send_insert_mode = str(self.config.get('send_insert_mode', 'cdp')).strip().lower()  # cdp | script | keys
+        # Memory watchdog (started by the owner via start_watchdog; recycles the browser when it bloats)
+        self._watchdog: Optional[BrowserWatchdog] = None
+        # Group-chat classification per contact (filled from chat-list snapshots, DOM probes as fallback)
+        self._group_cache = GroupChatCache(
+            ttl_sec=float(self.config.get('group_cache_ttl_sec', 3600)),
+            max_entries=int(self.config.get('group_cache_max_entries', 5000)),
+        )
+        # To avoid processing the same message multiple times (bounded LRU/TTL over 64-bit digests)
+        self.processed_message_signatures = MessageDedupStore(
+            max_entries=int(self.config.get('dedup_max_entries', 20000)),
+            ttl_sec=float(self.config.get('dedup_ttl_sec', 7 * 24 * 3600)),
+        )
         self.trigger_keywords = self.config.get('trigger_keywords', [])
         # self.ignored_contacts = self.config.get('ignored_contacts', []) # Replaced by blacklist/whitelist
         # New list mode settings
@@ -58,6 +348,29 @@ class WebMonitor:
         self.user_data_dir_config = self.config.get('user_data_dir', 'wechat_user_data_bot')
         # Construct absolute path directly from the config value
         self.user_data_dir_path = os.path.abspath(self.user_data_dir_config)
+        # Browser profile: "default" (headed, full page) or "lean" (headless, blocked media, no throttling)
+        self.chrome_profile = str(self.config.get('chrome_profile', 'default')).strip().lower()
+        self.chrome_headless = bool(self.config.get('chrome_headless', self.chrome_profile == 'lean'))
+        self.chrome_blocked_url_patterns = list(self.config.get('chrome_blocked_url_patterns', [
+            '*webwxgeticon*', '*webwxgetheadimg*', '*webwxgetmsgimg*', '*webwxgetvideo*',
+            '*webwxgetvoice*', '*/emoji/*', '*emoji*.png', '*.woff', '*.woff2', '*.ttf',
+        ]))
+        self.chrome_extra_args = list(self.config.get('chrome_extra_args', []))
+        self.login_qr_path = self.config.get('login_qr_path', '')
+        # Page to drive: wx.qq.com, or a local mock (modules/mock_wechat_web.py) for benchmarks.
+        self.wechat_web_url = str(self.config.get('wechat_web_url') or WECHAT_WEB_URL)
+        self._driver_resolver = ChromeDriverResolver(self.config, self.logger)
+        # Detached mode: Chrome runs with a remote-debugging port and survives gateway restarts.
+        self.chrome_debug_port = int(self.config.get('chrome_debug_port', 0) or 0)
+        self._detached: Optional[DetachedChrome] = None
+        if self.chrome_debug_port > 0:
+            self._detached = DetachedChrome(
+                self.config.get('chrome_debug_host', '127.0.0.1'),
+                self.chrome_debug_port,
+                self.user_data_dir_path,
+                self.logger,
+                web_url=self.wechat_web_url,
+            )
 
         if self.contact_list_mode not in ["blacklist", "whitelist"]:
             self.logger.warning(f"Invalid contact_list_mode '{self.contact_list_mode}', defaulting to blacklist.")
@@ -69,19 +382,117 @@ class WebMonitor:
             self.logger.info(f"Blacklist: {self.contact_blacklist}")
         self.logger.info(f"Using user data directory: {self.user_data_dir_path}")
 
+    def run_on_driver(self, fn, priority: int = PRIORITY_HOUSEKEEPING, name: str = "", timeout: Optional[float] = None):
+        """
+        在驱动线程上执行 fn() 并返回结果 (已在驱动线程上时直接执行)。
+        超时抛出 TimeoutError；调度器已停止时抛出 CancelledError。
+        """
+        return self._scheduler.call(fn, priority=priority, name=name, timeout=timeout)
+
+    def _emit_timing(self, metric: str, seconds: float, **labels) -> None:
+        hook = self.timing_hook
+        if hook is None:
+            return
+        try:
+            hook(metric, seconds, labels)
+        except Exception:
+            pass
+
+    def _on_driver_task_done(self, priority: int, wait_sec: float, run_sec: float) -> None:
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        self._emit_timing("driver_task", wait_sec, priority=name, phase="wait")
+        self._emit_timing("driver_task", run_sec, priority=name, phase="run")
+
+    def _instrument_driver(self) -> None:
+        """Time every WebDriver command (one HTTP round trip to chromedriver) for the timing hook / profiler."""
+        profiler = self.driver_profiler
+        if self.driver is None or (self.timing_hook is None and profiler is None):
+            return
+        execute = self.driver.execute
+
+        def timed_execute(driver_command, params=None):
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                elapsed = time.perf_counter() - started
+                self._emit_timing("webdriver_command", elapsed, command=driver_command)
+                if profiler is not None:
+                    profiler.record(driver_command, elapsed)
+
+        self.driver.execute = timed_execute
+
+    def _profile_unit(self, kind: str):
+        """Group the WebDriver commands issued inside the block (no-op unless the profiler is enabled)."""
+        if self.driver_profiler is None:
+            return nullcontext(ProfileUnit(kind))
+        return self.driver_profiler.unit(kind)
+
+    def driver_profile(self, reset: bool = False) -> Optional[dict]:
+        """WebDriver 往返统计 (未启用 driver_profiler_enabled 时返回 None)"""
+        if self.driver_profiler is None:
+            return None
+        data = self.driver_profiler.summary()
+        if reset:
+            self.driver_profiler.reset()
+        return data
+
+    def _find_all(self, selector: str, timeout_sec: float = 0.0, root=None) -> list:
+        """
+        显式限时查找：timeout_sec 内轮询直到找到，未找到返回 []。
+        implicit wait 为 0 时，timeout_sec=0 只产生一次往返。
+        """
+        root = self.driver if root is None else root
+        found = root.find_elements(By.CSS_SELECTOR, selector)
+        if found or timeout_sec <= 0:
+            return found
+        try:
+            return WebDriverWait(root, timeout_sec, poll_frequency=0.05).until(
+                lambda r: r.find_elements(By.CSS_SELECTOR, selector)
+            )
+        except TimeoutException:
+            return []
+
+    def _find_first(self, selector: str, timeout_sec: float = 0.0, root=None):
+        found = self._find_all(selector, timeout_sec, root=root)
+        return found[0] if found else None
+
     @contextmanager
-    def _pause_monitoring(self):
-        with self._pause_lock:
-            self._pause_count += 1
-            self._pause_event.set()
+    def _no_implicit_wait(self):
+        # Only needed when implicit_wait_sec is configured above 0 (legacy behaviour).
+        if self.implicit_wait_sec <= 0 or self.driver is None:
+            yield
+            return
+        try:
+            self.driver.implicitly_wait(0)
+        except Exception:
+            pass
         try:
             yield
         finally:
-            with self._pause_lock:
-                self._pause_count -= 1
-                if self._pause_count <= 0:
-                    self._pause_count = 0
-                    self._pause_event.clear()
+            try:
+                self.driver.implicitly_wait(self.implicit_wait_sec)
+            except Exception:
+                pass
+
+    def _preempt_requested(self) -> bool:
+        # Polled by scan steps: a higher-priority task (usually a send) is waiting for the driver.
+        return self._scheduler.preempt_requested()
+
+    def driver_queue_depth(self, priority: Optional[int] = None) -> int:
+        """Tasks waiting for the driver thread (optionally of one priority)."""
+        return self._scheduler.pending(priority)
+
+    def get_stats(self) -> dict:
+        """监控侧运行指标 (供网关 stats 接口使用)"""
+        return {
+            "dedup": self.processed_message_signatures.stats(),
+            "cadence": self._cadence.stats(),
+            "selectors": self.selectors.stats(),
+            "group_cache": self._group_cache.stats(),
+            "scheduler": self._scheduler.stats(),
+            **({"watchdog": self._watchdog.stats()} if self._watchdog is not None else {}),
+        }
 
     def start(self):
         """启动微信Web监控"""
@@ -106,8 +517,7 @@ class WebMonitor:
                 return False
             
             # 检查登录成功元素是否存在
-            login_elements = self.driver.find_elements(By.CSS_SELECTOR, self.login_success_selector)
-            return len(login_elements) > 0
+            return len(self._find_all(self.login_success_selector, self.login_check_timeout_sec)) > 0
             
         except Exception as e:
             self.logger.error(f"检查登录状态失败: {e}")
@@ -119,23 +529,8 @@ class WebMonitor:
             if not self.driver:
                 return False
             
-            # 检查二维码元素
-            qr_selectors = [
-                '.qrcode',
-                '.login_box_qr',
-                '[data-role="qrcode"]',
-                '.js_qr_code_default_login'
-            ]
-            
-            for selector in qr_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements and elements[0].is_displayed():
-                        return True
-                except:
-                    continue
-            
-            return False
+            # 检查二维码元素 (所有候选选择器一次探测)
+            return self.selectors.probe(self.driver, 'qr_code', need_visible=True) is not None
             
         except Exception as e:
             self.logger.error(f"检查二维码状态失败: {e}")
@@ -148,20 +543,9 @@ class WebMonitor:
                 return "未知用户"
             
             # 尝试不同的用户名选择器
-            selectors = [
-                '.nickname .nickname_text',
-                '.user_info .nickname',
-                '.header .nickname',
-                '.account .nickname'
-            ]
-            
-            for selector in selectors:
-                try:
-                    element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if element and element.text:
-                        return element.text
-                except:
-                    continue
+            match = self.selectors.probe(self.driver, 'current_user_name', need_text=True)
+            if match is not None:
+                return match.text
             
             return "微信用户"
             
@@ -176,7 +560,7 @@ class WebMonitor:
                 return
             
             # 查找未读消息
-            unread_chats = self.driver.find_elements(By.CSS_SELECTOR, self.unread_msg_selector)
+            unread_chats = self._find_all(self.unread_msg_selector, self.unread_lookup_timeout_sec)
             
             for chat in unread_chats:
                 try:
@@ -200,14 +584,12 @@ class WebMonitor:
                             "sender": contact_name,
                             "content": latest_message,
                             "timestamp": time.time(),
-                            "is_group": self._is_group_chat()
+                            "is_group": self.is_group_contact(contact_name)
                         }
                         
                         # 检查是否已处理过
                         signature = f"{contact_name}:{latest_message}:{message_data['timestamp']:.0f}"
-                        if signature not in self.processed_message_signatures:
-                            self.processed_message_signatures.add(signature)
-                            
+                        if self.processed_message_signatures.check_and_add(signature):
                             # 调用消息回调
                             if self.message_callback:
                                 self.message_callback(message_data)
@@ -225,23 +607,12 @@ class WebMonitor:
     def _get_active_contact_name(self) -> str:
         """获取当前活跃聊天的联系人名称"""
         try:
-            # 尝试不同的选择器
-            selectors = [
-                '.chat_hd .nickname',
-                '.chat_info .nickname',
-                '.chat_title .nickname',
-                '.header .chat_name'
-            ]
-            
-            for selector in selectors:
-                try:
-                    element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if element and element.text:
-                        return element.text.strip()
-                except:
-                    continue
-            
-            return ""
+            # 尝试不同的选择器 (已解析的选择器优先，一次往返)
+            match = self.selectors.probe(self.driver, 'active_chat_header', need_text=True)
+            name = match.text.strip() if match is not None else ""
+            if name:
+                self._active_contact_hint = name
+            return name
             
         except Exception as e:
             self.logger.error(f"获取联系人名称失败: {e}")
@@ -250,395 +621,542 @@ class WebMonitor:
     def _get_latest_message(self) -> str:
         """获取最新消息内容"""
         try:
-            # 获取所有消息元素
-            messages = self.driver.find_elements(By.CSS_SELECTOR, self.last_message_selector)
-            
-            if not messages:
+            pane = self.read_message_pane(limit=1)
+            if pane is None or not pane.messages:
                 return ""
-            
-            # 获取最后一条消息
-            last_message = messages[-1]
-            
-            # 尝试获取消息内容
-            try:
-                content_element = last_message.find_element(By.CSS_SELECTOR, self.received_message_content_selector)
-                return content_element.text.strip()
-            except:
-                # 如果找不到内容元素，直接返回消息文本
-                return last_message.text.strip()
+            return pane.messages[-1].text
             
         except Exception as e:
             self.logger.error(f"获取最新消息失败: {e}")
             return ""
 
-    def _is_group_chat(self) -> bool:
-        """判断是否为群聊"""
+    def idle_seconds(self) -> float:
+        """距上次会话活动 (新消息 / 会话列表变化 / 发送) 的秒数"""
+        return self._cadence.idle_seconds()
+
+    def active_contact_hint(self) -> str:
+        """最近一次观察到的当前聊天名称 (不产生 WebDriver 往返，可能略有滞后)"""
+        return self._active_contact_hint
+
+    def is_group_contact(self, contact_name: str, username: Optional[str] = None) -> bool:
+        """
+        判断联系人是否为群聊：优先查分类缓存 (来自会话列表快照)，未命中时探测当前聊天窗口。
+        仅在 contact_name 为当前打开的聊天时才会探测页面并缓存结果；否则只按名称猜测，不缓存。
+        """
+        cached = self._group_cache.lookup(contact_name, username)
+        if cached is not None:
+            return cached
+        probed = self.run_on_driver(lambda: self._probe_group_chat(contact_name), PRIORITY_SCAN, "is_group_chat")
+        if probed is None:
+            return self._looks_like_group_name(contact_name)
+        self._group_cache.store(contact_name, probed, username=username)
+        return probed
+
+    def _probe_group_chat(self, contact_name: str) -> Optional[bool]:
+        """
+        通过群聊标识元素判断当前打开的聊天是否为群聊。
+        当前打开的聊天不是 contact_name (或无法确认) 时返回 None，避免把别的聊天的结果记到该联系人名下。
+        """
         try:
-            # 尝试通过页面元素判断是否为群聊
-            group_indicators = [
-                '.chat_hd .chat_members',
-                '.group_chat_indicator',
-                '[data-chattype="group"]'
-            ]
-            
-            for selector in group_indicators:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        return True
-                except:
-                    continue
-            
-            # 通过联系人名称判断（群聊通常有特定格式）
-            contact_name = self._get_active_contact_name()
-            if contact_name and ('群' in contact_name or len(contact_name) > 10):
-                return True
-            
-            return False
-            
+            active = self._get_active_contact_name()
+            if not active or active != str(contact_name or "").strip():
+                return None
+            return self.selectors.probe(self.driver, 'group_indicator') is not None
         except Exception as e:
             self.logger.error(f"判断群聊失败: {e}")
-            return False
+            return None
+
+    @staticmethod
+    def _looks_like_group_name(contact_name: str) -> bool:
+        # Name heuristic only (群聊名称通常较长或含"群")；never cached as a classification.
+        name = str(contact_name or "").strip()
+        return bool(name) and ('群' in name or len(name) > 10)
 
     def send_message(self, contact: str, message: str) -> bool:
         """发送消息到指定联系人"""
+        sent, _ = self._send_message(contact, message)
+        return sent
+
+    def _send_message(self, contact: str, message: str, arm_ack: bool = False) -> tuple[bool, Optional[str]]:
+        """
+        发送消息 (在驱动线程上以最高优先级执行，监控扫描会在当前步骤结束后让出)；
+        arm_ack=True 时在最后一次 Enter 之前布置页面内 ACK 观察器。
+        :return: (是否已发出, ACK 观察器 id)
+        """
         try:
-            if not self.is_logged_in():
-                self.logger.error("未登录，无法发送消息")
-                return False
-            
-            # 发送过程中不要被监控线程切走窗口
-            with self._pause_monitoring():
-                with self._driver_lock:
-                    self._dismiss_any_alert(context="send_message")
-                    # 查找并点击联系人
-                    if not self._select_contact(contact):
-                        self.logger.error(f"找不到联系人: {contact}")
-                        return False
-                    
-                    # 查找输入框
-                    try:
-                        input_box = WebDriverWait(self.driver, 10).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, self.input_box_selector))
-                        )
-                    except TimeoutException:
-                        self.logger.error("找不到输入框")
-                        return False
-                    
-                    # 发送消息
-                    input_box.clear()
-                    # 处理换行，避免消息未完整输入或被拆分发送
-                    lines = str(message).split('\n')
-                    for i, line in enumerate(lines):
-                        input_box.send_keys(line)
-                        if i < len(lines) - 1:
-                            input_box.send_keys(Keys.COMMAND, Keys.ENTER)
-                            time.sleep(0.02)
-                    input_box.send_keys(Keys.ENTER)
-            
-            self.logger.info(f"消息发送成功: {contact} -> {message[:50]}...")
-            return True
-            
+            return self.run_on_driver(
+                lambda: self._send_message_on_driver(contact, message, arm_ack), PRIORITY_SEND, "send_message"
+            )
         except Exception as e:
             self.logger.error(f"发送消息失败: {e}")
+            return False, None
+
+    def _send_message_on_driver(self, contact: str, message: str, arm_ack: bool) -> tuple[bool, Optional[str]]:
+        with self._profile_unit("send"):
+            try:
+                if not self.is_logged_in():
+                    self.logger.error("未登录，无法发送消息")
+                    return False, None
+
+                self._dismiss_any_alert(context="send_message")
+                # 查找并点击联系人
+                if not self._select_contact(contact):
+                    self.logger.error(f"找不到联系人: {contact}")
+                    return False, None
+
+                # 查找输入框
+                input_box = self._find_first(self.input_box_selector, self.input_box_timeout_sec)
+                if input_box is None:
+                    self.logger.error("找不到输入框")
+                    return False, None
+
+                # 发送消息 (整段插入，超长自动分段，每段一次 Enter)
+                watch: dict = {}
+                before_enter = (lambda text: watch.update(id=self._arm_send_ack(text))) if arm_ack else None
+                if not self._send_text_via_input_box(input_box, message, before_final_enter=before_enter):
+                    self.logger.error(f"输入框写入失败: {contact}")
+                    return False, None
+
+                self.logger.info(f"消息发送成功: {contact} -> {message[:50]}...")
+                # A reply usually means the conversation is live: scan at fast cadence right away.
+                self._cadence.note_activity("send")
+                self._wake_event.set()
+                return True, watch.get("id")
+            
+            except Exception as e:
+                self.logger.error(f"发送消息失败: {e}")
+                return False, None
+
+    @staticmethod
+    def _split_message_chunks(text: str, max_chars: int) -> list[str]:
+        """按长度拆分超长消息，尽量在换行处断开"""
+        text = str(text or "").replace("\r\n", "\n").replace("\r", "\n")
+        if len(text) <= max_chars:
+            return [text] if text else []
+        chunks: list[str] = []
+        while len(text) > max_chars:
+            cut = text.rfind("\n", 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            chunks.append(text[:cut])
+            text = text[cut:].lstrip("\n")
+        text = text.rstrip("\n")
+        if text:
+            chunks.append(text)
+        return chunks
+
+    def _input_box_length(self, input_box) -> Optional[int]:
+        """输入框当前文本长度；读取失败返回 None (未知，不等于为空)"""
+        try:
+            length = self.driver.execute_script(INPUT_BOX_TEXT_LENGTH_JS, input_box)
+        except Exception:
+            return None
+        return length if isinstance(length, int) and length >= 0 else None
+
+    def _insert_text(self, input_box, text: str) -> bool:
+        """把整段文本一次性写入(已聚焦的)输入框；多行文本原样插入，无需模拟换行快捷键"""
+        mode = self.send_insert_mode
+        if mode == "cdp" and hasattr(self.driver, "execute_cdp_cmd"):
+            inserted = False
+            try:
+                self.driver.execute_cdp_cmd("Input.insertText", {"text": text})
+                inserted = True
+            except Exception as e:
+                self.logger.debug(f"CDP insertText 失败，改用脚本插入: {e}")
+            if inserted:
+                # The CDP call went through: only fall back when the box is confirmed empty,
+                # otherwise a failed length read would insert the text a second time.
+                length = self._input_box_length(input_box)
+                if length is None:
+                    length = self._input_box_length(input_box)
+                if length is None:
+                    self.logger.debug("CDP insertText 后无法读取输入框长度，按已写入处理")
+                    return True
+                if length > 0:
+                    return True
+                self.logger.debug("CDP insertText 未写入输入框，改用脚本插入")
+        if mode in ("cdp", "script"):
+            try:
+                length = self.driver.execute_script(INPUT_BOX_INSERT_TEXT_JS, input_box, text)
+            except Exception as e:
+                self.logger.debug(f"脚本插入失败: {e}")
+                length = self._input_box_length(input_box)
+            if isinstance(length, int) and length > 0:
+                return True
+            if length is None:
+                self.logger.debug("脚本插入后无法读取输入框长度，按已写入处理")
+                return True
+            self.logger.debug("脚本插入未写入输入框，改用逐键输入")
+        # Last resort: key events, with the platform's newline chord (Cmd+Enter on macOS, Ctrl+Enter elsewhere).
+        newline_modifier = Keys.COMMAND if sys.platform == "darwin" else Keys.CONTROL
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            if line:
+                input_box.send_keys(line)
+            if i < len(lines) - 1:
+                input_box.send_keys(newline_modifier, Keys.ENTER)
+        if self._input_box_length(input_box) == 0:
+            self.logger.warning("逐键输入后输入框仍为空")
+            return False
+        return True
+
+    def _send_text_via_input_box(self, input_box, message: str, before_final_enter=None) -> bool:
+        """
+        发送宏：聚焦并清空输入框 -> 整段插入文本 -> 按一次 Enter。
+        超过 send_chunk_max_chars 的消息拆成多条依次发送。须在驱动线程上调用。
+        before_final_enter(text): 最后一段按 Enter 之前的回调 (用于布置 ACK 观察器)。
+        """
+        chunks = self._split_message_chunks(message, self.send_chunk_max_chars)
+        if not chunks:
             return False
+        for i, chunk in enumerate(chunks):
+            try:
+                focused = self.driver.execute_script(INPUT_BOX_PREPARE_JS, input_box)
+            except Exception:
+                focused = False
+            if not focused:
+                try:
+                    input_box.click()
+                    input_box.clear()
+                except Exception:
+                    pass
+            if not self._insert_text(input_box, chunk):
+                return False
+            if before_final_enter is not None and i == len(chunks) - 1:
+                before_final_enter(chunk)
+            input_box.send_keys(Keys.ENTER)
+        return True
 
     def send_message_with_ack(self, contact: str, message: str, ack_timeout_sec: float = 3.0) -> bool:
         """
         发送消息并等待“发送回执”(ACK)：
-        - 在 DOM 中观察“我方最后一条消息”是否出现/更新为本次发送内容
+        - Enter 之前在页面内布置观察器，等待本次内容的“我方气泡”出现，并读取其发送状态图标
         - 主要用于提升稳定性：防止 UI 卡顿/焦点丢失导致“看似发送但未发送”
         """
+        return self.send_message_with_ack_result(contact, message, ack_timeout_sec=ack_timeout_sec).ok
+
+    def send_message_with_ack_result(self, contact: str, message: str, ack_timeout_sec: float = 3.0) -> SendAck:
+        """同 send_message_with_ack，但返回带状态 (delivered/sending/failed/pending/...) 的 SendAck"""
         if ack_timeout_sec <= 0:
-            return self.send_message(contact, message)
+            return SendAck("delivered" if self.send_message(contact, message) else "not_sent")
+
+        # On the driver thread already (nested call): wait for the ACK inline instead of queueing slices.
+        chain = not self._scheduler.is_driver_thread()
+
+        def _send_and_wait():
+            sent, watch_id = self._send_message_on_driver(contact, message, arm_ack=True)
+            if not sent:
+                return SendAck("not_sent")
+            if not watch_id:
+                return SendAck("unarmed")
+            deadline = time.perf_counter() + max(0.0, float(ack_timeout_sec))
+            if chain:
+                return self._queue_ack_slice(watch_id, deadline)
+            return self._ack_wait_slice(watch_id, deadline, chain=False)
 
         try:
-            if not self.is_logged_in():
-                self.logger.error("未登录，无法发送消息(ack)")
-                return False
-
-            with self._pause_monitoring():
-                with self._driver_lock:
-                    self._dismiss_any_alert(context="send_message_with_ack")
-                    before_sig = self._get_last_outgoing_signature()
-                    ok = self.send_message(contact, message)
-                    if not ok:
-                        return False
-                    if self._wait_for_outgoing_ack(message, before_sig=before_sig, timeout_sec=ack_timeout_sec):
-                        return True
-                    self.logger.warning(
-                        "发送 ACK 超时: contact=%s timeout=%.1fs",
-                        contact,
-                        float(ack_timeout_sec),
-                    )
-                    # ACK is best-effort; avoid duplicate retries due to DOM/selector uncertainty.
-                    return True
+            ack = self._follow_ack(self.run_on_driver(_send_and_wait, PRIORITY_SEND, "send_message_with_ack"))
+            if ack.state != "delivered":
+                self.logger.warning(
+                    "发送 ACK 未确认送达: contact=%s state=%s elapsed=%.0fms timeout=%.1fs",
+                    contact,
+                    ack.state,
+                    ack.elapsed_ms,
+                    float(ack_timeout_sec),
+                )
+            return ack
         except Exception as e:
             self.logger.error(f"发送消息(ack)失败: {e}")
-            return False
+            return SendAck("not_sent")
 
-    def _normalize_text_for_ack(self, text: str) -> str:
-        t = "" if text is None else str(text)
-        t = t.replace("\r\n", "\n").replace("\r", "\n")
-        t = t.replace("\u200b", "").replace("\ufeff", "")
-        t = re.sub(r"\s+", " ", t).strip()
-        return t
+    def send_message_arm_ack(self, contact: str, message: str) -> tuple[bool, Optional[str]]:
+        """
+        流水线发送：发出消息并布置 ACK 观察器后立即返回，不等待回执。
+        :return: (是否已发出, ACK 观察器 id；布置失败时为 None)，之后用 poll_send_acks 查询
+        """
+        return self._send_message(contact, message, arm_ack=True)
 
-    def _extract_message_text(self, message_el) -> str:
+    def poll_send_acks(self, watch_ids: list[str], release: Optional[list[str]] = None) -> Optional[dict[str, SendAck]]:
+        """
+        一次往返读取多个 ACK 观察器的当前状态，并释放调用方已处理完的观察器。
+        :return: {观察器 id: SendAck}；页面脚本执行失败时返回 None
+        """
+        ids = [str(i) for i in (watch_ids or []) if i]
+        if not ids and not release:
+            return {}
+        release_ids = [str(i) for i in (release or []) if i]
         try:
-            try:
-                content_element = message_el.find_element(By.CSS_SELECTOR, self.received_message_content_selector)
-                return (content_element.text or "").strip()
-            except Exception:
-                return (message_el.text or "").strip()
-        except Exception:
-            return ""
+            raw = self.run_on_driver(
+                lambda: self.driver.execute_script(SEND_ACK_POLL_JS, ids, release_ids), PRIORITY_ACK, "poll_send_acks"
+            )
+        except Exception as e:
+            self.logger.debug(f"读取发送 ACK 状态失败: {e}")
+            return None
+        if not isinstance(raw, dict):
+            return None
+        result: dict[str, SendAck] = {}
+        for watch_id in ids:
+            item = raw.get(watch_id)
+            if not isinstance(item, dict):
+                continue
+            result[watch_id] = SendAck(
+                state=str(item.get("state") or "pending"),
+                elapsed_ms=float(item.get("elapsed_ms") or 0.0),
+                msg_id=str(item.get("msg_id") or ""),
+            )
+        return result
 
-    def _is_outgoing_message_el(self, message_el) -> bool:
+    def _script_timeout_sec(self, wait_sec: float = 0.0) -> float:
+        # Async scripts (observer long-poll, search wait, send ACK) must finish well within this.
+        return max(5.0, self.observer_long_poll_ms / 1000.0 + 2.0, float(wait_sec) + 2.0)
+
+    def _arm_send_ack(self, text: str) -> Optional[str]:
+        """Enter 之前布置 ACK 观察器 (页面内 MutationObserver)，返回观察器 id"""
+        expected = self._normalize_text_for_ack(text)
+        if not expected:
+            return None
+        cfg = {
+            "message": self.last_message_selector,
+            "content": self.received_message_content_selector,
+            "outgoing_colors": list(self.outgoing_bg_colors),
+            "expected": expected,
+            "sending": list(self.ack_sending_selectors),
+            "failed": list(self.ack_failed_selectors),
+            "max_watches": 200,
+        }
         try:
-            cls = (message_el.get_attribute("class") or "").lower()
-            # common patterns: "message me", "message ng-scope me"
-            return (" me" in f" {cls} ") or ("from_me" in cls) or ("self" in cls)
-        except Exception:
-            return False
+            return self.driver.execute_script(SEND_ACK_ARM_JS, cfg)
+        except Exception as e:
+            self.logger.debug(f"布置发送 ACK 观察器失败: {e}")
+            return None
 
-    def _get_last_outgoing_signature(self) -> tuple[int, str]:
+    def _ack_wait_slice(self, watch_id: str, deadline: float, chain: bool = True):
         """
-        Returns a best-effort signature (message_count, last_outgoing_text).
-        Falls back to last message overall if outgoing cannot be determined.
+        在驱动线程上等待 ACK 观察器一个切片 (ack_wait_slice_ms，一次 execute_async_script 往返)。
+        未确认且未超时时：chain=True 排队下一片并返回其 Future (片与片之间可插入其它发送)，
+        chain=False 则在本线程继续等待。
         """
-        try:
-            messages = self.driver.find_elements(By.CSS_SELECTOR, self.last_message_selector)
-            total = len(messages)
-            # Prefer a message element that looks like "sent by me"
-            for el in reversed(messages):
-                if self._is_outgoing_message_el(el):
-                    return (total, self._extract_message_text(el))
-            # Fallback: last message overall
-            for el in reversed(messages):
-                txt = self._extract_message_text(el)
-                if txt:
-                    return (total, txt)
-            return (total, "")
-        except Exception:
-            return (0, "")
+        while True:
+            remaining_ms = int(max(0.0, deadline - time.perf_counter()) * 1000)
+            final = remaining_ms <= self.ack_wait_slice_ms
+            try:
+                raw = self.driver.execute_async_script(
+                    SEND_ACK_WAIT_JS, watch_id, remaining_ms if final else self.ack_wait_slice_ms, final
+                )
+            except Exception as e:
+                self.logger.debug(f"等待发送 ACK 失败: {e}")
+                return SendAck("unarmed")
+            if not isinstance(raw, dict):
+                return SendAck("unarmed")
+            ack = SendAck(
+                state=str(raw.get("state") or "pending"),
+                elapsed_ms=float(raw.get("elapsed_ms") or 0.0),
+                msg_id=str(raw.get("msg_id") or ""),
+            )
+            if final or ack.state not in ("pending", "sending"):
+                return ack
+            if chain:
+                return self._queue_ack_slice(watch_id, deadline)
+
+    def _queue_ack_slice(self, watch_id: str, deadline: float) -> Future:
+        # Queued from the driver thread before the current task ends, so the next scan step cannot get ahead of it.
+        return self._scheduler.submit(
+            lambda: self._ack_wait_slice(watch_id, deadline), PRIORITY_ACK, "await_send_ack"
+        )
 
-    def _wait_for_outgoing_ack(self, expected_text: str, before_sig: tuple[int, str], timeout_sec: float) -> bool:
-        expected_norm = self._normalize_text_for_ack(expected_text)
-        if not expected_norm:
-            # Empty messages are not supported; treat as failed.
-            return False
+    def _follow_ack(self, pending) -> SendAck:
+        """沿 ACK 切片链等待最终结果"""
+        try:
+            while isinstance(pending, Future):
+                pending = pending.result()
+        except CancelledError:
+            return SendAck("unarmed")
+        return pending if isinstance(pending, SendAck) else SendAck("unarmed")
 
-        deadline = time.time() + float(timeout_sec)
-        last_seen_sig: tuple[int, str] = before_sig
-        while time.time() < deadline:
-            try:
-                after_sig = self._get_last_outgoing_signature()
-                # Ensure either message count advanced or last text changed (avoid matching an older identical message)
-                changed = after_sig != before_sig and after_sig != last_seen_sig
-                after_norm = self._normalize_text_for_ack(after_sig[1])
-                if changed and expected_norm in after_norm:
-                    return True
-                last_seen_sig = after_sig
-            except StaleElementReferenceException:
-                pass
-            except Exception:
-                pass
-            time.sleep(0.12)
+    def _normalize_text_for_ack(self, text: str) -> str:
+        t = "" if text is None else str(text)
+        t = t.replace("\r\n", "\n").replace("\r", "\n")
+        t = t.replace("\u200b", "").replace("\ufeff", "")
+        t = re.sub(r"\s+", " ", t).strip()
+        return t
 
-        return False
+    def read_message_pane(self, limit: Optional[int] = None) -> Optional[MessagePane]:
+        """
+        一次 execute_script 往返读取当前聊天窗口最后 N 条消息
+        (类名 / 方向 / 文本已在页面内分类)，与聊天记录长度无关。
+        :return: MessagePane；脚本执行失败时返回 None
+        """
+        if not self.driver:
+            return None
+        args = {
+            "message": self.last_message_selector,
+            "content": self.received_message_content_selector,
+            "outgoing_colors": list(self.outgoing_bg_colors),
+            "limit": max(1, int(limit or self.message_extract_limit)),
+        }
+        try:
+            raw = self.driver.execute_script(MESSAGE_PANE_EXTRACT_JS, args)
+        except UnexpectedAlertPresentException:
+            self._dismiss_any_alert(context="read_message_pane")
+            return None
+        except JavascriptException as js_err:
+            self.logger.error(f"读取消息区脚本执行失败: {js_err}")
+            return None
+        if not isinstance(raw, dict):
+            return None
+        return MessagePane.from_raw(raw)
 
     def _select_contact(self, contact_name: str) -> bool:
-        """选择联系人"""
+        """选择联系人 (目标聊天已打开时直接跳过切换)"""
+        requested = str(contact_name or "").strip()
+        if not requested:
+            return False
         try:
             # 防止与监控线程同时操作 DOM
             with self._driver_lock:
                 self._dismiss_any_alert(context="_select_contact")
-                # 优先在左侧会话列表(chat_item)里精准定位，避免误点聊天内容区的同名文本
-                xpaths = [
-                    # exact match
-                    (
-                        "//*[contains(@class,'chat_item')]"
-                        "//*[contains(@class,'nickname_text') and normalize-space(text())=$name]"
-                        "/ancestor::*[contains(@class,'chat_item')][1]"
-                    ),
-                ]
-
-                # Selenium does not support xpath variables; we do minimal escaping for quotes.
-                safe_name = str(contact_name).replace('"', '\\"')
-                try:
-                    # Reduce implicit wait during bulk DOM scans to avoid long stalls.
-                    try:
-                        self.driver.implicitly_wait(0)
-                    except Exception:
-                        pass
-
-                    def _try_click_by_xpaths() -> bool:
-                        for xp in xpaths:
-                            try:
-                                resolved = xp.replace("$name", f'"{safe_name}"')
-                                items = self.driver.find_elements(By.XPATH, resolved)
-                                for item in items[:5]:
-                                    try:
-                                        self.driver.execute_script(
-                                            "arguments[0].scrollIntoView({block: 'center'});", item
-                                        )
-                                    except Exception:
-                                        pass
-                                    try:
-                                        item.click()
-                                    except Exception:
-                                        continue
-
-                                    # Verify the active chat header matches, to avoid sending to a wrong chat
-                                    try:
-                                        WebDriverWait(self.driver, 2).until(
-                                            lambda d: bool(self._get_active_contact_name())
-                                        )
-                                    except Exception:
-                                        pass
-                                    active = (self._get_active_contact_name() or "").strip()
-                                    requested = str(contact_name or "").strip()
-                                    if active and requested:
-                                        if active == requested:
-                                            return True
-                                        # If the UI decorates the title, allow tight containment.
-                                        if requested in active or active in requested:
-                                            return True
-                                        self.logger.warning(
-                                            "选中聊天不匹配: requested='%s' active='%s' (继续查找)",
-                                            requested,
-                                            active,
-                                        )
-                                        continue
-                                    return True
-                            except Exception:
-                                continue
-                        return False
 
-                    # 1) Try exact match directly from visible chat list
-                    if _try_click_by_xpaths():
+                # 0) Fast path: the target chat is already open (common when replying several times)
+                if self._get_active_contact_name() == requested:
+                    self.logger.debug(f"'{requested}' 已是当前聊天，跳过切换。")
+                    return True
+
+                with self._no_implicit_wait():
+                    # 1) 优先在左侧会话列表(chat_item)里精准定位 (联系人索引提供 data-username)，一次页面内查找
+                    indexed = self._contact_index.get(requested)
+                    lookup = {
+                        "item": self.chat_item_selector,
+                        "name": self.contact_name_in_list_selector,
+                        "username": indexed.username if indexed is not None else "",
+                        "nickname": requested,
+                        "contains": False,
+                    }
+                    if self._click_chat_item_and_verify(self._lookup_chat_item(lookup), requested):
                         return True
 
-                    # 2) Filter via search box, then retry exact match (much faster for large lists)
-                    if self._filter_chat_list_for_contact(str(contact_name or "")):
-                        if _try_click_by_xpaths():
-                            self._clear_chat_search_box()
-                            return True
+                    # 2) Filter via search box, wait in-page for the result, then retry exact match
+                    if self._filter_chat_list_for_contact(requested):
+                        timeout = float(self.config.get("search_result_timeout_sec", 1.5))
+                        found = self._wait_for_chat_item(dict(lookup, username=""), timeout)
+                        ok = self._click_chat_item_and_verify(found, requested)
                         self._clear_chat_search_box()
+                        if ok:
+                            return True
 
-                    # 3) Final fallback (less strict): contains match, but still limited and verified
-                    fallback_xpaths = [
-                        (
-                            "//*[contains(@class,'chat_item')]"
-                            "//*[contains(@class,'nickname_text') and contains(normalize-space(text()),$name)]"
-                            "/ancestor::*[contains(@class,'chat_item')][1]"
-                        ),
-                    ]
-                    for xp in fallback_xpaths:
-                        try:
-                            resolved = xp.replace("$name", f'"{safe_name}"')
-                            items = self.driver.find_elements(By.XPATH, resolved)
-                            for item in items:
-                                try:
-                                    self.driver.execute_script(
-                                        "arguments[0].scrollIntoView({block: 'center'});", item
-                                    )
-                                except Exception:
-                                    pass
-                                try:
-                                    item.click()
-                                    active = (self._get_active_contact_name() or "").strip()
-                                    requested = str(contact_name or "").strip()
-                                    if active and requested and (requested in active or active in requested):
-                                        return True
-                                except Exception:
-                                    continue
-                        except Exception:
-                            continue
-
-                    return False
-                finally:
-                    # Restore default implicit wait for other operations
-                    try:
-                        self.driver.implicitly_wait(5)
-                    except Exception:
-                        pass
+                    # 3) Final fallback (less strict): contains match, but still verified
+                    return self._click_chat_item_and_verify(
+                        self._lookup_chat_item(dict(lookup, username="", contains=True)),
+                        requested,
+                    )
             
         except Exception as e:
             self.logger.error(f"选择联系人失败: {e}")
             return False
 
+    def _refresh_contact_index(self, snapshot: ChatListSnapshot) -> None:
+        index: dict[str, ChatItemSnapshot] = {}
+        for item in snapshot.items:
+            if item.nickname:
+                index.setdefault(item.nickname, item)
+            if item.username:
+                index[item.username] = item
+        self._contact_index = index
+        self._group_cache.observe_snapshot(snapshot.items)
+
+    def _lookup_chat_item(self, lookup: dict):
+        try:
+            return self.driver.execute_script(CHAT_ITEM_LOOKUP_JS, lookup)
+        except Exception as e:
+            self.logger.debug(f"会话列表查找失败: {e}")
+            return None
+
+    def _wait_for_chat_item(self, lookup: dict, timeout_sec: float):
+        try:
+            return self.driver.execute_async_script(CHAT_ITEM_WAIT_JS, lookup, int(max(0.0, timeout_sec) * 1000))
+        except Exception as e:
+            self.logger.debug(f"等待搜索结果失败: {e}")
+            return None
+
+    def _click_chat_item_and_verify(self, item, requested: str) -> bool:
+        """点击会话列表项并确认聊天标题与目标一致，避免发错聊天"""
+        if item is None:
+            return False
+        try:
+            item.click()
+        except Exception:
+            return False
+        # Verify the active chat header matches, to avoid sending to a wrong chat
+        try:
+            WebDriverWait(self.driver, 2, poll_frequency=0.05).until(
+                lambda d: bool(self._get_active_contact_name())
+            )
+        except Exception:
+            pass
+        active = (self._get_active_contact_name() or "").strip()
+        if active and requested:
+            if active == requested:
+                return True
+            # If the UI decorates the title, allow tight containment.
+            if requested in active or active in requested:
+                return True
+            self.logger.warning(
+                "选中聊天不匹配: requested='%s' active='%s'",
+                requested,
+                active,
+            )
+            return False
+        return True
+
     def _filter_chat_list_for_contact(self, contact_name: str) -> bool:
         name = str(contact_name or "").strip()
         if not name:
             return False
-        selectors = self.config.get(
-            "search_box_selectors",
-            [
-                "#search_bar input",
-                ".search_bar input",
-                ".frm_search",
-                "input[placeholder*='搜索']",
-                "input[placeholder*='Search']",
-            ],
-        )
-        for sel in selectors:
-            try:
-                box = self.driver.find_element(By.CSS_SELECTOR, sel)
-            except Exception:
-                continue
-            try:
-                box.click()
-            except Exception:
-                pass
-            try:
-                box.send_keys(Keys.COMMAND, "a")
-                box.send_keys(Keys.BACKSPACE)
-            except Exception:
-                try:
-                    box.clear()
-                except Exception:
-                    pass
-            try:
-                box.send_keys(name)
-                time.sleep(0.15)
-                return True
-            except Exception:
-                continue
-        return False
+        match = self.selectors.probe(self.driver, 'search_box')
+        if match is None or match.element is None:
+            return False
+        box = match.element
+        try:
+            box.click()
+        except Exception:
+            pass
+        self._empty_search_box(box)
+        try:
+            box.send_keys(name)
+            return True
+        except Exception:
+            return False
 
     def _clear_chat_search_box(self) -> None:
-        selectors = self.config.get(
-            "search_box_selectors",
-            [
-                "#search_bar input",
-                ".search_bar input",
-                ".frm_search",
-                "input[placeholder*='搜索']",
-                "input[placeholder*='Search']",
-            ],
-        )
-        for sel in selectors:
-            try:
-                box = self.driver.find_element(By.CSS_SELECTOR, sel)
-            except Exception:
-                continue
+        match = self.selectors.probe(self.driver, 'search_box')
+        if match is None or match.element is None:
+            return
+        box = match.element
+        try:
+            box.click()
+        except Exception:
+            pass
+        self._empty_search_box(box)
+        try:
+            box.send_keys(Keys.ESCAPE)
+        except Exception:
+            pass
+
+    def _empty_search_box(self, box) -> None:
+        """清空搜索框：优先脚本清空 (与平台无关)，失败时用本平台的全选快捷键 (macOS Cmd+A，其它 Ctrl+A)"""
+        try:
+            if self.driver.execute_script(SEARCH_BOX_CLEAR_JS, box):
+                return
+        except Exception as e:
+            self.logger.debug(f"脚本清空搜索框失败: {e}")
+        select_all_modifier = Keys.COMMAND if sys.platform == "darwin" else Keys.CONTROL
+        try:
+            box.send_keys(select_all_modifier, "a")
+            box.send_keys(Keys.BACKSPACE)
+        except Exception:
             try:
-                box.click()
+                box.clear()
             except Exception:
                 pass
-            try:
-                box.send_keys(Keys.COMMAND, "a")
-                box.send_keys(Keys.BACKSPACE)
-                box.send_keys(Keys.ESCAPE)
-                return
-            except Exception:
-                try:
-                    box.clear()
-                    return
-                except Exception:
-                    continue
 
     def get_contact_list(self):
         """获取联系人列表"""
@@ -647,7 +1165,7 @@ class WebMonitor:
                 return []
             
             contacts = []
-            contact_elements = self.driver.find_elements(By.CSS_SELECTOR, '.chat_item .nickname_text')
+            contact_elements = self._find_all('.chat_item .nickname_text')
             
             for element in contact_elements:
                 if element.text:
@@ -666,16 +1184,6 @@ class WebMonitor:
         """退出WebMonitor"""
         self.stop()
 
-    def close(self):
-        """关闭浏览器"""
-        try:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
-                self.logger.info("浏览器已关闭")
-        except Exception as e:
-            self.logger.error(f"关闭浏览器失败: {e}")
-
     def _should_process_contact(self, contact_name: str) -> bool:
         """检查是否应该处理该联系人的消息"""
         if self.contact_list_mode == 'whitelist':
@@ -684,57 +1192,44 @@ class WebMonitor:
             return contact_name not in self.contact_blacklist
 
     def initialize(self):
-        """初始化浏览器驱动并打开微信网页版 (支持持久化登录)"""
+        """初始化浏览器驱动并打开微信网页版 (支持持久化登录)；在驱动线程上执行"""
         try:
-            self.logger.info("Initializing Chrome WebDriver...")
-            options = webdriver.ChromeOptions()
-            options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36")
-            options.add_argument('--window-size=1280,800')
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            # Add user data directory argument
-            options.add_argument(f'--user-data-dir={self.user_data_dir_path}')
-
-            driver_path = ChromeDriverManager().install()
-            try:
-                p = Path(driver_path)
-                # webdriver-manager may (incorrectly) return a non-binary companion file on some platforms
-                # e.g. THIRD_PARTY_NOTICES.chromedriver, which will raise "Exec format error".
-                candidate_names = ("chromedriver", "chromedriver.exe")
-                if p.name not in candidate_names:
-                    for name in candidate_names:
-                        candidate = p.parent / name
-                        if candidate.exists():
-                            driver_path = str(candidate)
-                            break
-
-                # Ensure the resolved driver is executable (some caches unpack without +x on macOS)
-                try:
-                    if os.path.exists(driver_path) and not os.access(driver_path, os.X_OK):
-                        st_mode = os.stat(driver_path).st_mode
-                        os.chmod(
-                            driver_path,
-                            st_mode
-                            | stat.S_IXUSR
-                            | stat.S_IXGRP
-                            | stat.S_IXOTH,
-                        )
-                except Exception:
-                    # best-effort; Selenium will raise if still not executable
-                    pass
-            except Exception:
-                # best-effort fallback; keep the original driver_path
-                pass
+            return bool(self.run_on_driver(self._initialize, PRIORITY_HOUSEKEEPING, "initialize"))
+        except CancelledError:
+            self.logger.error("驱动调度器已停止，初始化被取消")
+            return False
 
-            service = ChromeService(driver_path)
-            self.driver = webdriver.Chrome(service=service, options=options)
-            self.driver.implicitly_wait(5)
+    def _initialize(self, login_timeout_sec: Optional[float] = None):
+        login_timeout = self.login_timeout_sec if login_timeout_sec is None else float(login_timeout_sec)
+        try:
+            self.logger.info("Initializing Chrome WebDriver...")
+            started = time.perf_counter()
+            options = self._build_chrome_options()
+            reused_page = False
+            if self._detached is not None:
+                reused_page = self._attach_detached_chrome(options)
+                if reused_page is None:
+                    return False
+            else:
+                self.driver = webdriver.Chrome(service=self._chromedriver_service(), options=options)
+            self._instrument_driver()
+            # New session: selectors are resolved again against the freshly loaded page.
+            self.selectors.reset()
+            # In-page waits (observer long-poll, search results, send ACK) run as async scripts.
+            self.driver.set_script_timeout(self._script_timeout_sec())
+            self.driver.implicitly_wait(self.implicit_wait_sec)
             self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
                 'source': '''Object.defineProperty(navigator, 'webdriver', {get: () => undefined})'''
             })
-            
-            self.logger.info("Navigating to WeChat Web...")
-            self.driver.get('https://wx.qq.com/')
+            if self.chrome_profile == 'lean':
+                self._apply_lean_page_settings()
+
+            if reused_page:
+                # Already on wx.qq.com in a surviving browser: no reload, the login session stays put.
+                self.logger.info(f"已附着到运行中的微信网页 ({self._detached.address})，耗时 {time.perf_counter() - started:.2f}s")
+            else:
+                self.logger.info("Navigating to WeChat Web...")
+                self.driver.get(self.wechat_web_url)
 
             # --- Check for existing login first --- 
             self.logger.info(f"Checking for existing login session using selector: {self.login_success_selector}")
@@ -750,105 +1245,535 @@ class WebMonitor:
                 self.logger.info("未检测到登录会话，需要扫描二维码。")
                 # --- Proceed with QR code login flow --- 
                 self.logger.info("请使用微信扫描二维码登录")
+                if self.chrome_headless:
+                    self._save_login_qr_code()
                 try:
-                    long_wait = WebDriverWait(self.driver, 120) # Keep long wait for manual scan
+                    long_wait = WebDriverWait(self.driver, login_timeout) # Keep long wait for manual scan
                     long_wait.until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, self.login_success_selector))
                     )
                     self.logger.info("扫码登录成功")
                     return True
                 except TimeoutException:
-                    self.logger.error(f"登录超时: 未能在120秒内检测到登录成功标识 '{self.login_success_selector}'. 请确保选择器正确并且已登录。")
-                    self.close()
+                    self.logger.error(f"登录超时: 未能在{login_timeout:.0f}秒内检测到登录成功标识 '{self.login_success_selector}'. 请确保选择器正确并且已登录。")
+                    self._close_driver()
                     return False
                 except Exception as qr_login_err:
                      self.logger.error(f"扫描登录过程中出错: {str(qr_login_err)}")
-                     self.close()
+                     self._close_driver()
                      return False
 
         except Exception as e:
             self.logger.error(f"初始化或登录检查失败: {str(e)}", exc_info=True)
-            self.close()
+            self._close_driver()
             return False
     
+    def _chromedriver_service(self) -> ChromeService:
+        # Cached / offline-capable resolution; webdriver-manager only on a cache miss.
+        driver_path = self._driver_resolver.resolve()
+        return ChromeService(driver_path) if driver_path else ChromeService()
+
+    def _attach_detached_chrome(self, options) -> Optional[bool]:
+        """
+        独立浏览器模式：调试端口上已有 Chrome 则直接附着，否则先以独立进程启动 Chrome 再附着。
+        :return: True = 复用了已打开的微信页面；False = 需要导航到微信；None = 失败
+        """
+        detached = self._detached
+        if detached.is_alive():
+            self.logger.info(f"发现运行中的 Chrome ({detached.address})，直接附着")
+        else:
+            args = [a for a in options.arguments if not a.startswith('--user-data-dir=')]
+            launch_timeout = float(self.config.get('chrome_launch_timeout_sec', 15))
+            if not detached.launch(self._driver_resolver.chrome_binary_path(), args, timeout_sec=launch_timeout):
+                return None
+        attach_options = webdriver.ChromeOptions()
+        attach_options.debugger_address = detached.address
+        self.driver = webdriver.Chrome(service=self._chromedriver_service(), options=attach_options)
+
+        target_id = detached.wechat_target_id()
+        if target_id:
+            try:
+                # chromedriver window handles are DevTools target ids
+                self.driver.switch_to.window(target_id)
+                return True
+            except Exception:
+                for handle in self.driver.window_handles:
+                    self.driver.switch_to.window(handle)
+                    if detached.is_wechat_url(self.driver.current_url):
+                        return True
+        return False
+
+    def browser_pid(self) -> Optional[int]:
+        """Chrome 进程树的根 PID (独立浏览器模式下为 Chrome 本身，否则为 chromedriver)"""
+        if self._detached is not None:
+            pid = self._detached.browser_pid()
+            if pid:
+                return pid
+        try:
+            return self.driver.service.process.pid
+        except Exception:
+            return None
+
+    def start_watchdog(self, quiet_check=None) -> Optional[BrowserWatchdog]:
+        """启动浏览器内存看门狗 (watchdog_enabled=false 时不启动)；quiet_check() 为 True 表示可以安全回收"""
+        if not bool(self.config.get("watchdog_enabled", True)):
+            return None
+        if self._watchdog is None:
+            self._watchdog = BrowserWatchdog(self, self.config, self.logger, quiet_check=quiet_check)
+        self._watchdog.start()
+        return self._watchdog
+
+    def stop_watchdog(self) -> None:
+        if self._watchdog is not None:
+            self._watchdog.stop()
+
+    def recycle_browser(self, reason: str = "") -> bool:
+        """
+        回收浏览器：作为驱动线程上的一个任务执行 (监控扫描与发送在其前后排队)，关闭浏览器
+        (独立浏览器模式下同样关闭 Chrome 本身) 后在同一 user_data_dir 上重新启动，复用已有登录会话。
+        登录等待以 recycle_login_timeout_sec 为上限，失败时最多重试 recycle_attempts 次；
+        全部失败时浏览器保持关闭，监控循环随之退出 (由上层感知并清理运行状态)。
+        返回是否重新登录成功。
+        """
+        self.logger.warning(f"回收浏览器 ({reason or 'manual'}) ...")
+
+        def _recycle() -> bool:
+            for attempt in range(1, self.recycle_attempts + 1):
+                self._close_driver(keep_browser=False)
+                # Page-side state (observer, ACK hub, resolved selectors) dies with the old page.
+                self._observer_gen = None
+                self._last_snapshot_signature = None
+                if self._initialize(login_timeout_sec=self.recycle_login_timeout_sec):
+                    return True
+                self.logger.error(f"浏览器重启失败 (第 {attempt}/{self.recycle_attempts} 次)")
+                if attempt < self.recycle_attempts:
+                    time.sleep(self.recycle_retry_delay_sec)
+            self.is_running = False
+            return False
+
+        try:
+            return bool(self.run_on_driver(_recycle, PRIORITY_HOUSEKEEPING, "recycle_browser"))
+        except CancelledError:
+            return False
+
+    def _build_chrome_options(self):
+        """
+        Chrome 启动参数。chrome_profile:
+        - default: 有界面的完整浏览器 (原行为)
+        - lean: headless=new、关闭后台定时器节流、减少 GPU/光栅化开销；页面资源屏蔽见 _apply_lean_page_settings
+        """
+        options = webdriver.ChromeOptions()
+        options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36")
+        options.add_argument('--window-size=1280,800')
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        # Add user data directory argument
+        options.add_argument(f'--user-data-dir={self.user_data_dir_path}')
+        if self.chrome_headless:
+            options.add_argument("--headless=new")
+        if self.chrome_profile == 'lean':
+            # Keep polling timers and MutationObservers on time when the window is hidden/headless.
+            options.add_argument("--disable-background-timer-throttling")
+            options.add_argument("--disable-backgrounding-occluded-windows")
+            options.add_argument("--disable-renderer-backgrounding")
+            # Less GPU / raster work: a chat UI needs neither.
+            options.add_argument("--disable-gpu")
+            options.add_argument("--disable-smooth-scrolling")
+            options.add_argument("--disable-extensions")
+            options.add_argument("--disable-component-update")
+            options.add_argument("--disable-default-apps")
+            options.add_argument("--mute-audio")
+            options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints,CalculateNativeWinOcclusion")
+        for arg in self.chrome_extra_args:
+            options.add_argument(str(arg))
+        return options
+
+    def _apply_lean_page_settings(self) -> None:
+        """lean 模式：通过 CDP 屏蔽头像/图片/表情雪碧图等资源，并关闭页面动画 (登录二维码不受影响)"""
+        try:
+            if self.chrome_blocked_url_patterns:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+                self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(self.chrome_blocked_url_patterns)})
+            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+                'source': '''
+                    document.addEventListener('DOMContentLoaded', function () {
+                        var st = document.createElement('style');
+                        st.textContent = '*,*::before,*::after{animation:none!important;transition:none!important}';
+                        (document.head || document.documentElement).appendChild(st);
+                    });
+                '''
+            })
+            self.logger.info(f"精简模式: 已屏蔽 {len(self.chrome_blocked_url_patterns)} 类页面资源并关闭动画")
+        except Exception as e:
+            self.logger.warning(f"精简模式页面设置失败 (继续使用完整页面): {e}")
+
+    def _save_login_qr_code(self) -> None:
+        """无界面模式下把登录二维码保存为图片，供扫码"""
+        path = self.login_qr_path or os.path.join(self.user_data_dir_path, 'login_qr.png')
+        try:
+            WebDriverWait(self.driver, 15, poll_frequency=0.2).until(lambda d: self.is_qr_code_visible())
+            match = self.selectors.probe(self.driver, 'qr_code', need_visible=True)
+            if match is None or match.element is None:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            match.element.screenshot(path)
+            self.logger.info(f"无界面模式: 登录二维码已保存到 {os.path.abspath(path)}，请用微信扫码")
+        except Exception as e:
+            self.logger.warning(f"保存登录二维码失败: {e}")
+
     def monitor_messages(self):
-        """监控新消息 (优先处理红点，再检查活跃聊天)"""
-        check_interval = self.config.get('check_interval', 3)
-        driver_lock_timeout = float(self.config.get("driver_lock_timeout_sec", 0.25))
+        """
+        监控新消息 (优先处理红点，再检查活跃聊天)。
+        每个检查步骤作为 scan 优先级任务提交到驱动线程执行；排队中的发送会让当前步骤提前结束并优先执行。
+        """
         active_chat_check_enabled = bool(self.config.get("active_chat_check_enabled", True))
-        self.logger.info(f"开始监控新消息，检查间隔: {check_interval}秒")
+        cadence = self._cadence.stats()
+        self.logger.info(f"开始监控新消息，自适应检查间隔: {cadence['min_sec']}~{cadence['max_sec']}秒")
         self.logger.info(f"触发关键词: {self.trigger_keywords if self.trigger_keywords else '[无 (回复所有)]'}")
         if self.contact_list_mode == 'whitelist':
             self.logger.info(f"白名单模式，仅回复: {self.contact_whitelist}")
         else:
             self.logger.info(f"黑名单模式，忽略: {self.contact_blacklist}")
 
+        if self.observer_enabled:
+            self.logger.info(
+                f"推送模式: 页面内消息观察者 + 长轮询 ({self.observer_long_poll_ms}ms，空闲时间隔退避至 {self.observer_idle_max_sec}秒)，轮询扫描作为后备"
+            )
+        self._observer_gen = None
+        next_full_scan = 0.0
+
         while True:
-            processed_in_cycle = False
             try:
-                # 检查浏览器是否仍然活跃
-                if not self.is_browser_alive():
-                     self.logger.error("浏览器似乎已关闭或无响应，停止监控。")
-                     break
-                
-                # Ensure any unexpected dialogs won't block further DOM operations
-                self._dismiss_any_alert(context="monitor_messages")
-
-                # If a send is in progress, back off to reduce reply latency / wrong-chat risks.
-                if self._pause_event.is_set():
-                    time.sleep(0.05)
-                    continue
-                
-                # 避免在“发送回复”期间切换聊天，导致漏发/错发：监控与发送共享同一把锁
-                # Keep the lock timeout short so sending replies is not delayed by monitoring.
-                if not self._driver_lock.acquire(timeout=driver_lock_timeout):
-                    time.sleep(0.05)
-                    continue
-
-                try:
-                    # --- 1. 查找并处理带红点的未读聊天 ---
-                    unread_chat_items = []
-                    try:
-                        # Use the potentially more precise selector from config
-                        unread_chat_items = self.driver.find_elements(By.CSS_SELECTOR, self.unread_msg_selector)
-                    except Exception as find_err:
-                        self.logger.error(f"查找未读聊天项 ({self.unread_msg_selector}) 时出错: {find_err}")
-
-                    if unread_chat_items:
-                        self.logger.info(f"发现 {len(unread_chat_items)} 个带未读标记的聊天项 (选择器: {self.unread_msg_selector})")
-                        msg_item = unread_chat_items[0] # Process first one
-                        if self.process_chat_item(msg_item): # Returns True if processed
-                            processed_in_cycle = True
-
-                    # --- 2. 如果没有红点项被处理，检查活跃聊天窗口 --- 
-                    if active_chat_check_enabled and not processed_in_cycle:
-                        try:
-                            active_chat_element = self.driver.find_element(By.CSS_SELECTOR, self.active_chat_selector)
-                            self.logger.debug(f"检查活跃聊天窗口 (选择器: {self.active_chat_selector})")
-                            if self.process_chat_item(active_chat_element, check_only_new=True): # Pass flag to only check new
-                                processed_in_cycle = True
-                        except NoSuchElementException:
-                            self.logger.debug("当前无活跃聊天窗口或选择器无效。")
-                        except Exception as active_err:
-                            self.logger.error(f"检查活跃聊天 ({self.active_chat_selector}) 时出错: {active_err}")
-                finally:
-                    self._driver_lock.release()
-
-                # --- 3. 等待下次检查 ---
-                # self.logger.debug("完成检查周期，等待...")
+                due = next_full_scan
+                step = self._scheduler.submit(
+                    lambda: self._monitor_step(active_chat_check_enabled, due), PRIORITY_SCAN, "monitor_step"
+                ).result()
+                if step is None:
+                    self.logger.error("浏览器似乎已关闭或无响应，停止监控。")
+                    break
+                processed_in_cycle, snapshot, need_scan, yielded = step
+
+                # --- 3. 等待下次检查 (自适应节奏) ---
                 if processed_in_cycle:
-                    # Quick follow-up to reduce perceived latency when messages are arriving.
-                    time.sleep(0.2)
+                    self._cadence.note_activity("message")
+                if yielded:
+                    # A send took over mid-step: resume right after it (it is already queued ahead of us).
+                    continue
+                if not processed_in_cycle:
+                    self._cadence.note_idle()
+                interval = self._cadence.current()
+                if need_scan:
+                    next_full_scan = time.time() + interval
                 else:
-                    time.sleep(check_interval)
-
+                    next_full_scan = min(next_full_scan, time.time() + interval)
+                if not (self.observer_enabled and self._observer_gen):
+                    self._wake_event.wait(interval)
+                elif not processed_in_cycle:
+                    # Push mode: the long-poll already waited in-page; when idle, sleep the rest of the
+                    # (capped) interval off the driver thread. The observer buffers events meanwhile.
+                    rest = min(interval, self.observer_idle_max_sec) - self.observer_long_poll_ms / 1000.0
+                    if rest > 0:
+                        self._wake_event.wait(rest)
+                self._wake_event.clear()
+
+            except CancelledError:
+                self.logger.info("驱动调度器已停止，监控循环退出。")
+                break
             except KeyboardInterrupt:
                 raise
             except Exception as e:
                 self.logger.error(f"监控消息主循环出错: {str(e)}")
+                try:
+                    alive = bool(self.run_on_driver(self.is_browser_alive, PRIORITY_SCAN, "is_browser_alive"))
+                except Exception:
+                    alive = False
+                if not alive:
+                    self.logger.error("浏览器似乎已关闭或无响应，停止监控。")
+                    break
                 self.logger.info("发生错误，等待10秒后重试...")
                 time.sleep(10)
 
+    def _monitor_step(self, active_chat_check_enabled: bool, next_full_scan: float) -> Optional[tuple]:
+        """
+        驱动线程上的一个监控步骤：一次观察者长轮询，必要时再做一次会话列表扫描。
+        :return: (是否处理了新消息, 快照, 是否执行了扫描, 是否因发送抢占而提前让出)；浏览器已关闭时返回 None
+        """
+        with self._profile_unit("cycle") as unit:
+            if self.driver is None:
+                return None
+            started = time.perf_counter()
+            processed_in_cycle = False
+            snapshot = None
+            observing = self.observer_enabled and bool(self._observer_gen)
+            need_scan = not observing or time.time() >= next_full_scan
+            if observing:
+                events = self._drain_observer_events(self.observer_long_poll_ms)
+                if events is None:
+                    self.logger.warning("页面消息观察者已失效 (页面可能已重载)，回退到轮询并尝试重新注入。")
+                    self._observer_gen = None
+                    need_scan = True
+                else:
+                    processed_in_cycle, list_changed = self._handle_observer_events(events)
+                    need_scan = need_scan or list_changed
+
+            if need_scan and not self._preempt_requested():
+                snapshot = self.get_chat_list_snapshot() if self.chat_list_snapshot_enabled else None
+                if snapshot is not None:
+                    # 快照模式: 一次往返即可决定本轮是否有事可做
+                    if self._scan_from_snapshot(snapshot, active_chat_check_enabled):
+                        processed_in_cycle = True
+                else:
+                    # 检查浏览器是否仍然活跃
+                    if not self.is_browser_alive():
+                        return None
+                    if self._scan_chat_list_legacy(active_chat_check_enabled):
+                        processed_in_cycle = True
+                if snapshot is not None:
+                    signature = snapshot.signature
+                    if self._last_snapshot_signature is not None and signature != self._last_snapshot_signature:
+                        self._cadence.note_activity("snapshot_changed")
+                    self._last_snapshot_signature = signature
+                if self.observer_enabled and not self._observer_gen and (snapshot is None or snapshot.logged_in):
+                    self._install_message_observer()
+            unit.kind = "scan" if need_scan else "observe"
+        self._emit_timing("scan_step", time.perf_counter() - started, kind=unit.kind)
+        return processed_in_cycle, snapshot, need_scan, self._preempt_requested()
+
+    def _install_message_observer(self) -> bool:
+        """注入 (或复用) 页面内消息观察者；失败时返回 False，监控继续使用轮询"""
+        if not self.driver:
+            return False
+        settle_ms = int(float(self.config.get("observer_switch_settle_sec", 0.8)) * 1000)
+        try:
+            self.driver.set_script_timeout(self._script_timeout_sec())
+            result = self.driver.execute_script(
+                MESSAGE_OBSERVER_INSTALL_JS,
+                {
+                    "list": self.config.get("chat_list_container_selector", "#J_NavChatScrollBody"),
+                    "pane": self.config.get("message_pane_selector", "#chatArea"),
+                    "item": self.chat_item_selector,
+                    "name": self.contact_name_in_list_selector,
+                    "active": self.active_chat_selector,
+                    "badge": self.unread_badge_selector,
+                    "message": self.last_message_selector,
+                    "content": self.received_message_content_selector,
+                    "header": self.selectors.candidates('active_chat_header'),
+                    "outgoing_colors": list(self.outgoing_bg_colors),
+                    "max_events": int(self.config.get("observer_max_events", 500)),
+                    "switch_settle_ms": settle_ms,
+                },
+            )
+        except UnexpectedAlertPresentException:
+            self._dismiss_any_alert(context="install_message_observer")
+            return False
+        except Exception as e:
+            self.logger.warning(f"注入页面消息观察者失败，继续使用轮询: {e}")
+            return False
+        if not isinstance(result, dict) or not result.get("installed"):
+            return False
+        self._observer_gen = str(result.get("gen") or "")
+        if result.get("fresh"):
+            self.logger.info(f"已注入页面消息观察者 (gen={self._observer_gen})")
+        return bool(self._observer_gen)
+
+    def _drain_observer_events(self, wait_ms: int) -> Optional[list[dict]]:
+        """
+        通过 execute_async_script 长轮询页面内事件环形缓冲区。
+        :return: 事件列表；观察者已丢失 (页面重载/容器被替换) 时返回 None
+        """
+        try:
+            result = self.driver.execute_async_script(MESSAGE_OBSERVER_DRAIN_JS, int(max(0, wait_ms)))
+        except UnexpectedAlertPresentException:
+            self._dismiss_any_alert(context="drain_observer_events")
+            return []
+        except TimeoutException:
+            return []
+        except JavascriptException:
+            return None
+        if not isinstance(result, dict) or not result.get("installed"):
+            return None
+        events = [ev for ev in (result.get("events") or []) if isinstance(ev, dict)]
+        dropped = int(result.get("dropped") or 0)
+        if dropped:
+            self.logger.warning(f"页面事件缓冲区溢出，丢弃了 {dropped} 个事件，将执行一次完整扫描。")
+            events.append({"kind": "chat"})
+        return events
+
+    def _handle_observer_events(self, events: list[dict]) -> tuple[bool, bool]:
+        """
+        处理观察者推送的事件。
+        :return: (是否处理了新消息, 是否需要立即完整扫描会话列表)
+        """
+        processed = False
+        need_scan = False
+        for ev in events:
+            kind = ev.get("kind")
+            if kind == "chat":
+                # Another conversation got a badge: it has to be opened by the scan path.
+                need_scan = True
+                continue
+            if kind != "message":
+                continue
+            contact_name = str(ev.get("contact") or "").strip()
+            username = str(ev.get("username") or "")
+            text = str(ev.get("text") or "").strip()
+            msg_id = str(ev.get("msg_id") or "")
+            try:
+                index = int(ev.get("index"))
+            except (TypeError, ValueError):
+                index = -1
+            if contact_name and index >= 0:
+                # Keep the polling path's read cursor in step so it does not re-forward this message.
+                self._advance_read_cursor(username or contact_name, index, text, msg_id)
+            if ev.get("outgoing"):
+                continue
+            if not contact_name or not text:
+                need_scan = True
+                continue
+            if not self._should_process_contact(contact_name):
+                self.logger.debug(f"联系人 '{contact_name}' 被名单过滤，跳过观察者事件。")
+                continue
+            if self._dispatch_new_message(
+                contact_name,
+                text,
+                check_only_new=True,
+                username=username or None,
+                message_key=self._message_key(contact_name, msg_id, index, text) if index >= 0 or msg_id else None,
+                # In-page time the mutation was seen (ms since epoch); start of the latency trace.
+                observed_at=float(ev["ts"]) / 1000.0 if isinstance(ev.get("ts"), (int, float)) else None,
+            ):
+                processed = True
+        return processed, need_scan
+
+    def _scan_from_snapshot(self, snapshot: ChatListSnapshot, active_chat_check_enabled: bool) -> bool:
+        """根据会话列表快照完成一轮扫描 (空闲时不再产生额外的 WebDriver 往返)"""
+        # --- 1. 按优先级依次处理所有带红点的未读聊天 (受本轮时间预算约束，发送可随时抢占) ---
+        processed_any = False
+        unread_items = self._scan_scheduler.order(snapshot.unread_items)
+        if unread_items:
+            self.logger.info(f"发现 {len(unread_items)} 个带未读标记的聊天项 (快照)")
+            deadline = time.time() + max(0.0, self.scan_cycle_budget_sec)
+            for served, item in enumerate(unread_items):
+                if self._preempt_requested():
+                    self.logger.debug("发送任务抢占本轮扫描，剩余未读聊天留到下一轮。")
+                    return processed_any
+                if served and time.time() >= deadline:
+                    self.logger.info(
+                        f"本轮扫描时间预算 ({self.scan_cycle_budget_sec:.1f}s) 已用完，"
+                        f"剩余 {len(unread_items) - served} 个未读聊天留到下一轮。"
+                    )
+                    return processed_any
+                if self.process_chat_item(None, snapshot_item=item):
+                    processed_any = True
+                if not self._preempt_requested():
+                    self._scan_scheduler.mark_served(item.key)
+                # The clicked chat becomes the active one; its current preview is already handled.
+                self._last_active_preview = {item.key: item.preview_hash}
+            # The snapshot's active flag is stale once a chat has been clicked.
+            return processed_any
+
+        # --- 2. 活跃聊天: 仅当列表预览发生变化时才读取消息区 ---
+        if not active_chat_check_enabled:
+            return False
+        active = snapshot.active_item
+        if active is None:
+            self.logger.debug("当前无活跃聊天窗口。")
+            return False
+        if self._last_active_preview.get(active.key) == active.preview_hash:
+            return False
+        self._last_active_preview = {active.key: active.preview_hash}
+        self.logger.debug(f"活跃聊天 '{active.nickname}' 预览已变化，检查新消息")
+        processed = self.process_chat_item(None, check_only_new=True, snapshot_item=active)
+        if self._preempt_requested():
+            # Interrupted by a send; re-check on the next cycle.
+            self._last_active_preview.pop(active.key, None)
+        return processed
+
+    def _scan_chat_list_legacy(self, active_chat_check_enabled: bool) -> bool:
+        """逐元素查询的旧扫描路径 (快照不可用时的后备)"""
+        processed_in_cycle = False
+        # Ensure any unexpected dialogs won't block further DOM operations
+        self._dismiss_any_alert(context="monitor_messages")
+
+        # --- 1. 查找并处理带红点的未读聊天 ---
+        unread_chat_items = []
+        try:
+            # Use the potentially more precise selector from config
+            unread_chat_items = self._find_all(self.unread_msg_selector, self.unread_lookup_timeout_sec)
+        except Exception as find_err:
+            self.logger.error(f"查找未读聊天项 ({self.unread_msg_selector}) 时出错: {find_err}")
+
+        if unread_chat_items:
+            self.logger.info(f"发现 {len(unread_chat_items)} 个带未读标记的聊天项 (选择器: {self.unread_msg_selector})")
+            msg_item = unread_chat_items[0] # Process first one
+            if self.process_chat_item(msg_item): # Returns True if processed
+                processed_in_cycle = True
+
+        # --- 2. 如果没有红点项被处理，检查活跃聊天窗口 --- 
+        if active_chat_check_enabled and not processed_in_cycle:
+            try:
+                active_chat_element = self._find_first(self.active_chat_selector, self.active_chat_lookup_timeout_sec)
+                if active_chat_element is None:
+                    self.logger.debug("当前无活跃聊天窗口或选择器无效。")
+                else:
+                    self.logger.debug(f"检查活跃聊天窗口 (选择器: {self.active_chat_selector})")
+                    if self.process_chat_item(active_chat_element, check_only_new=True): # Pass flag to only check new
+                        processed_in_cycle = True
+            except Exception as active_err:
+                self.logger.error(f"检查活跃聊天 ({self.active_chat_selector}) 时出错: {active_err}")
+        return processed_in_cycle
+
+    def get_chat_list_snapshot(self) -> Optional[ChatListSnapshot]:
+        """
+        通过一次 execute_script 获取整个会话列表的紧凑快照
+        (昵称 / 未读数 / data-username / 是否活跃 / 最后预览哈希)。
+        - 弹窗会被处理后重试一次
+        - 脚本执行失败返回 None (调用方回退到逐元素查询)
+        - 会话已失效等驱动错误直接抛出
+        """
+        if not self.driver:
+            return None
+        selectors = {
+            "login": self.login_success_selector,
+            "item": self.chat_item_selector,
+            "name": self.contact_name_in_list_selector,
+            "badge": self.unread_badge_selector,
+            "unread": self.unread_msg_selector,
+            "active": self.active_chat_selector,
+            "preview": self.chat_preview_selector,
+        }
+        for _ in range(2):
+            try:
+                raw = self.driver.execute_script(CHAT_LIST_SNAPSHOT_JS, selectors)
+            except UnexpectedAlertPresentException:
+                self._dismiss_any_alert(context="chat_list_snapshot")
+                continue
+            except JavascriptException as js_err:
+                self.logger.warning(f"会话列表快照脚本执行失败，回退到逐元素查询: {js_err}")
+                return None
+            if not isinstance(raw, dict):
+                return None
+            snapshot = ChatListSnapshot.from_raw(raw)
+            self._refresh_contact_index(snapshot)
+            if snapshot.active_item is not None:
+                self._active_contact_hint = snapshot.active_item.nickname
+            return snapshot
+        return None
+
+    def _locate_chat_item(self, snapshot_item: ChatItemSnapshot):
+        """按快照中的位置 (必要时按昵称) 取回会话列表项元素，仅在需要点击时调用"""
+        try:
+            return self.driver.execute_script(
+                CHAT_ITEM_BY_INDEX_JS,
+                self.chat_item_selector,
+                int(snapshot_item.index),
+                self.contact_name_in_list_selector,
+                snapshot_item.nickname,
+            )
+        except Exception as e:
+            self.logger.warning(f"定位会话列表项 '{snapshot_item.nickname}' 失败: {e}")
+            return None
+
     def is_browser_alive(self):
         """检查浏览器是否仍在运行"""
         try:
@@ -901,19 +1826,28 @@ class WebMonitor:
             self.logger.warning(f"处理弹窗失败({context}): {e}")
             return False
 
-    def process_chat_item(self, chat_item_element, check_only_new=False):
+    def process_chat_item(self, chat_item_element, check_only_new=False, snapshot_item: Optional[ChatItemSnapshot] = None):
         """
         处理单个聊天项（无论是带红点还是活跃状态）。
-        :param chat_item_element: The WebElement for the chat item.
+        :param chat_item_element: The WebElement for the chat item (may be None when snapshot_item is given).
         :param check_only_new: If True, only process if the last message is newer than the recorded one.
+        :param snapshot_item: Chat list snapshot entry; avoids WebDriver lookups for name/attributes.
         :return: True if a message was processed (reply attempted), False otherwise.
         """
         contact_name = "Unknown"
         try:
-            if self._pause_event.is_set():
+            if self._preempt_requested():
                 return False
-            contact_name_element = chat_item_element.find_element(By.CSS_SELECTOR, self.contact_name_in_list_selector)
-            contact_name = contact_name_element.text.strip()
+            if snapshot_item is not None:
+                contact_name = snapshot_item.nickname
+            else:
+                contact_name_element = self._find_first(
+                    self.contact_name_in_list_selector, self.element_lookup_timeout_sec, root=chat_item_element
+                )
+                if contact_name_element is None:
+                    self.logger.warning(f"聊天项中未找到联系人名称 ({self.contact_name_in_list_selector})，跳过。")
+                    return False
+                contact_name = contact_name_element.text.strip()
 
             # --- Blacklist/Whitelist Check --- 
             if self.contact_list_mode == "whitelist":
@@ -932,19 +1866,25 @@ class WebMonitor:
             if not check_only_new:
                  self.logger.info(f"点击聊天项: '{contact_name}'")
                  try:
-                    if self._pause_event.is_set():
+                    if self._preempt_requested():
+                        return False
+                    if chat_item_element is None and snapshot_item is not None:
+                        chat_item_element = self._locate_chat_item(snapshot_item)
+                    if chat_item_element is None:
+                        self.logger.warning(f"会话列表中已找不到 '{contact_name}'，将在下次循环重试。")
                         return False
                     chat_item_element.click()
+                    self._active_contact_hint = contact_name
                     # Wait for chat to load (avoid fixed sleep)
                     chat_load_timeout = float(self.config.get("chat_load_timeout_sec", 2.0))
                     try:
-                        if self._pause_event.is_set():
+                        if self._preempt_requested():
                             return False
                         WebDriverWait(self.driver, chat_load_timeout).until(
                             EC.presence_of_element_located((By.CSS_SELECTOR, self.last_message_selector))
                         )
                     except Exception:
-                        if self._pause_event.is_set():
+                        if self._preempt_requested():
                             return False
                         WebDriverWait(self.driver, chat_load_timeout).until(
                             EC.presence_of_element_located((By.CSS_SELECTOR, self.input_box_selector))
@@ -953,68 +1893,33 @@ class WebMonitor:
                      self.logger.error(f"点击聊天项 '{contact_name}' 时出错: {click_err}")
                      return False # Could not process
 
-            # 获取最后一条接收到的消息
+            # 读取消息区，并取出读游标之后的所有接收消息
             # Active-chat polling should be fast to avoid blocking outgoing sends.
-            last_message_text = self.get_last_received_message(contact_name, fast=bool(check_only_new))
-
-            if last_message_text:
-                message_signature = f"{contact_name}::{last_message_text}"
-                if message_signature in self.processed_message_signatures:
-                    if check_only_new:
-                         self.logger.debug(f"活跃聊天 '{contact_name}' 的最后消息已处理过。")
-                    else: 
-                         self.logger.info(f"消息已处理过: {message_signature[:50]}...")
-                    return False # Not processed in this instance
-
-                # 新消息!
-                self.logger.info(f"从 '{contact_name}' 获取到新消息: {last_message_text[:50]}...")
-                self.processed_message_signatures.add(message_signature)
-                if len(self.processed_message_signatures) > 1000: # Limit cache size
-                    self.processed_message_signatures.pop()
-                
-                # --- Group Mention Check (Placeholder) --- 
-                # TODO: Implement actual group chat detection based on selectors/indicators
-                is_group = self.detect_if_group_chat(chat_item_element, contact_name) 
-                if is_group and self.group_mention_required:
-                    if not self._is_bot_mentioned_in_text(last_message_text):
-                        self.logger.info(f"群聊消息未 @{self.bot_group_nickname}，跳过回复。")
-                        # 记录消息但不记录未回复原因
-                        if hasattr(self.logger, "log_chat"):
-                            self.logger.log_chat(last_message_text, "")
-                        return False # Processed signature but didn't reply
-                    else:
-                        self.logger.info(f"群聊消息检测到 @{self.bot_group_nickname}。")
-                # --- End Group Mention Check --- 
-
-                # --- Keyword Check --- 
-                triggered = False
-                if not self.trigger_keywords:
-                    triggered = True
-                else:
-                    for keyword in self.trigger_keywords:
-                        if keyword in last_message_text:
-                            self.logger.info(f"消息包含关键词 '{keyword}'，触发回复。")
-                            triggered = True
-                            break
-                
-                if triggered:
-                    # Pass contact_name for per-contact prompts
-                    reply = self.process_and_reply(contact_name, last_message_text)
-                    # 记录带有实际回复的消息
-                    if reply and hasattr(self.logger, "log_chat"):
-                        self.logger.log_chat(last_message_text, reply)
-                    return True
-                else:
-                    self.logger.info(f"消息不包含任何触发关键词，跳过回复。")
-                    # 记录消息但不记录未回复原因
-                    if hasattr(self.logger, "log_chat"):
-                        self.logger.log_chat(last_message_text, "")
-                    return False
-
-            else:
+            pane = self._wait_for_message_pane(contact_name, fast=bool(check_only_new))
+            if pane is None:
                 self.logger.warning(f"在聊天 '{contact_name}' 中未能获取到最后接收的消息。")
                 return False # Not processed
 
+            chat_key = snapshot_item.key if snapshot_item is not None else contact_name
+            unread_hint = snapshot_item.unread if (snapshot_item is not None and not check_only_new) else 0
+            new_messages = self._take_new_messages(chat_key, pane, unread_hint=unread_hint)
+            if not new_messages:
+                self.logger.debug(f"聊天 '{contact_name}' 没有读游标之后的新消息。")
+                return False
+
+            processed = False
+            for msg in new_messages:
+                if self._dispatch_new_message(
+                    contact_name,
+                    msg.text,
+                    check_only_new=check_only_new,
+                    chat_item_element=chat_item_element,
+                    username=snapshot_item.username if snapshot_item is not None else None,
+                    message_key=self._message_key(contact_name, msg.msg_id, msg.index, msg.text),
+                ):
+                    processed = True
+            return processed
+
         except StaleElementReferenceException:
             self.logger.warning(f"处理 '{contact_name}' 时元素引用失效，将在下次循环重试。")
             return False
@@ -1026,8 +1931,93 @@ class WebMonitor:
             self.logger.error(f"处理聊天项 '{contact_name}' 时发生意外错误: {str(e)}")
             return False
     
+    def _dispatch_new_message(
+        self,
+        contact_name: str,
+        message_text: str,
+        check_only_new: bool = False,
+        chat_item_element=None,
+        username: Optional[str] = None,
+        message_key: Optional[str] = None,
+        observed_at: Optional[float] = None,
+    ) -> bool:
+        """
+        对一条已读取到的接收消息执行去重、群聊 @ 检查、关键词过滤并回复/回调。
+        轮询扫描与页面内观察者 (observer) 推送的消息共用此入口。
+        :param message_key: Per-message identity (DOM id or position); defaults to contact + text.
+        :param observed_at: Wall-clock time the message appeared in the DOM, when known (observer path).
+        :return: True if a reply/callback was attempted.
+        """
+        message_signature = message_key or f"{contact_name}::{message_text}"
+        if not self.processed_message_signatures.check_and_add(message_signature):
+            if check_only_new:
+                 self.logger.debug(f"活跃聊天 '{contact_name}' 的最后消息已处理过。")
+            else: 
+                 self.logger.info(f"消息已处理过: {message_signature[:50]}...")
+            return False # Not processed in this instance
+
+        # 新消息!
+        self.logger.info(f"从 '{contact_name}' 获取到新消息: {message_text[:50]}...")
+
+        # --- Group Mention Check (Placeholder) --- 
+        # TODO: Implement actual group chat detection based on selectors/indicators
+        is_group = self.detect_if_group_chat(chat_item_element, contact_name, username=username)
+        if is_group and self.group_mention_required:
+            if not self._is_bot_mentioned_in_text(message_text):
+                self.logger.info(f"群聊消息未 @{self.bot_group_nickname}，跳过回复。")
+                # 记录消息但不记录未回复原因
+                if hasattr(self.logger, "log_chat"):
+                    self.logger.log_chat(message_text, "")
+                return False # Processed signature but didn't reply
+            else:
+                self.logger.info(f"群聊消息检测到 @{self.bot_group_nickname}。")
+        # --- End Group Mention Check --- 
+
+        # --- Keyword Check --- 
+        triggered = False
+        if not self.trigger_keywords:
+            triggered = True
+        else:
+            for keyword in self.trigger_keywords:
+                if keyword in message_text:
+                    self.logger.info(f"消息包含关键词 '{keyword}'，触发回复。")
+                    triggered = True
+                    break
+
+        if triggered:
+            # Pass contact_name for per-contact prompts
+            reply = self.process_and_reply(contact_name, message_text, observed_at=observed_at)
+            # 记录带有实际回复的消息
+            if reply and hasattr(self.logger, "log_chat"):
+                self.logger.log_chat(message_text, reply)
+            return True
+        else:
+            self.logger.info(f"消息不包含任何触发关键词，跳过回复。")
+            # 记录消息但不记录未回复原因
+            if hasattr(self.logger, "log_chat"):
+                self.logger.log_chat(message_text, "")
+            return False
+    
     def get_last_received_message(self, contact_name, fast: bool = False):
         """获取当前打开聊天窗口中最后一条*接收*到的消息内容"""
+        pane = self._wait_for_message_pane(contact_name, fast=fast)
+        if pane is None:
+            return None
+        # 通过类名和背景颜色在页面内判断是否为自己发送的消息，这里只取最后一条接收消息
+        last_msg = pane.last_received()
+        if last_msg is None:
+            self.logger.info(f"在聊天 '{contact_name}' 中未找到接收到的消息。")
+            return None
+        self.logger.debug(f"最后接收消息: 类名: {last_msg.cls}, 有内容元素: {last_msg.has_content}")
+        if not last_msg.has_content:
+            self.logger.warning(
+                f"在来自 '{contact_name}' 的最后一条消息中未找到内容元素 "
+                f"'{self.received_message_content_selector}'，使用fallback文本。"
+            )
+        return last_msg.text if last_msg.text else None
+
+    def _wait_for_message_pane(self, contact_name, fast: bool = False) -> Optional[MessagePane]:
+        """等待当前聊天窗口的消息加载并一次性读取 (读取失败/超时返回 None)"""
         if fast:
             message_load_timeout = float(self.config.get("message_load_timeout_fast_sec", 0.2))
             max_attempts = int(self.config.get("message_load_fast_attempts", 1))
@@ -1035,68 +2025,23 @@ class WebMonitor:
             message_load_timeout = float(self.config.get("message_load_timeout_sec", 2.0))
             max_attempts = int(self.config.get("message_load_attempts", 3))
 
+        def _pane_loaded(_driver):
+            pane = self.read_message_pane()
+            return pane if pane is not None and pane.total > 0 else False
+
         max_attempts = max(1, max_attempts)
         for attempt in range(max_attempts):
-            if self._pause_event.is_set():
+            if self._preempt_requested():
                 return None
             try:
-                # Wait briefly for messages to potentially load.
+                # Wait briefly for messages to potentially load; each probe is a single extraction round trip.
                 # In fast mode, avoid long waits to keep UI free for sending.
                 try:
-                    WebDriverWait(self.driver, message_load_timeout).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, self.last_message_selector))
-                    )
+                    return WebDriverWait(self.driver, message_load_timeout, poll_frequency=0.1).until(_pane_loaded)
                 except TimeoutException:
                     if fast:
                         return None
                     raise
-                messages = self.driver.find_elements(By.CSS_SELECTOR, self.last_message_selector)
-                if messages:
-                    # Iterate backwards to find the last message NOT sent by us
-                    for i in range(len(messages) - 1, -1, -1):
-                        if self._pause_event.is_set():
-                            return None
-                        last_msg = messages[i]
-                        msg_class = last_msg.get_attribute('class') or ''
-                        
-                        # 检查背景颜色，自己的消息通常是绿色背景
-                        background_color = ""
-                        try:
-                            background_color = last_msg.value_of_css_property('background-color')
-                            self.logger.debug(f"消息背景颜色: {background_color}, 类名: {msg_class}")
-                        except Exception:
-                            pass
-                            
-                        # 通过类名和背景颜色双重判断是否为自己发送的消息
-                        is_sent_by_me = (
-                            'message-send' in msg_class
-                            or 'message-sys' in msg_class
-                            or 'rgb(169, 236, 155)' in background_color
-                            or 'rgb(160, 221, 148)' in background_color
-                            or 'rgb(154, 216, 141)' in background_color
-                        )
-                        
-                        self.logger.debug(f"是否为自己发送的消息: {is_sent_by_me}")
-                        
-                        if not is_sent_by_me:
-                            try:
-                                content_element = last_msg.find_element(
-                                    By.CSS_SELECTOR, self.received_message_content_selector
-                                )
-                                return content_element.text.strip()
-                            except NoSuchElementException:
-                                self.logger.warning(
-                                    f"在来自 '{contact_name}' 的最后一条消息中未找到内容元素 "
-                                    f"'{self.received_message_content_selector}'，使用fallback文本。"
-                                )
-                                text = (last_msg.text or "").strip()
-                                return text if text else None
-                    
-                    self.logger.info(f"在聊天 '{contact_name}' 中未找到接收到的消息。")
-                    return None
-                else:
-                    self.logger.info(f"在聊天 '{contact_name}' 中未找到任何消息元素 ({self.last_message_selector}).")
-                    return None
             except StaleElementReferenceException:
                 if fast:
                     return None
@@ -1107,11 +2052,60 @@ class WebMonitor:
                 self.logger.warning(f"等待聊天 '{contact_name}' 的消息元素 ({self.last_message_selector}) 时超时。")
                 return None
             except Exception as e:
-                self.logger.error(f"获取 '{contact_name}' 最后一条消息时出错: {str(e)}")
+                self.logger.error(f"读取 '{contact_name}' 的消息区时出错: {str(e)}")
                 return None
         return None
     
-    def process_and_reply(self, contact_name, message):
+    def _message_key(self, contact_name: str, msg_id: str, index: int, text: str) -> str:
+        """去重用的单条消息标识：优先 DOM 消息 id，否则用位置 + 文本 (重复的相同文本不会被误丢弃)"""
+        if msg_id:
+            return f"{contact_name}::id:{msg_id}"
+        return f"{contact_name}::#{int(index)}::{text}"
+
+    def _take_new_messages(self, chat_key: str, pane: MessagePane, unread_hint: int = 0) -> list[PaneMessage]:
+        """
+        返回读游标之后的所有接收消息 (按顺序)，并把游标推进到消息区末尾。
+        - 优先按 DOM 消息 id 定位游标，其次按位置 + 文本，再次按文本回溯
+        - 首次读取或游标失效时，按未读红点数取最后若干条接收消息 (至少一条)
+        """
+        messages = list(pane.messages)
+        if not messages:
+            return []
+        cursor = self._read_cursors.get(chat_key)
+        start = None
+        if cursor is not None:
+            if cursor.last_msg_id:
+                for pos in range(len(messages) - 1, -1, -1):
+                    if messages[pos].msg_id == cursor.last_msg_id:
+                        start = pos + 1
+                        break
+            if start is None and cursor.last_index >= 0:
+                for pos, msg in enumerate(messages):
+                    if msg.index == cursor.last_index and msg.text == cursor.last_text:
+                        start = pos + 1
+                        break
+            if start is None and cursor.last_text and not cursor.last_msg_id:
+                # History was prepended/re-rendered: re-anchor on the last occurrence of the cursor text.
+                for pos in range(len(messages) - 1, -1, -1):
+                    if messages[pos].text == cursor.last_text:
+                        start = pos + 1
+                        break
+        if start is None:
+            received = [pos for pos, msg in enumerate(messages) if msg.direction == "in"]
+            take = max(1, int(unread_hint or 0))
+            start = received[-take] if len(received) >= take else (received[0] if received else len(messages))
+
+        self._advance_read_cursor(chat_key, messages[-1].index, messages[-1].text, messages[-1].msg_id)
+        return [msg for msg in messages[start:] if msg.direction == "in" and msg.text]
+
+    def _advance_read_cursor(self, chat_key: str, index: int, text: str, msg_id: str = "") -> None:
+        self._read_cursors.pop(chat_key, None)
+        self._read_cursors[chat_key] = ReadCursor(last_index=int(index), last_text=str(text or ""), last_msg_id=str(msg_id or ""))
+        if len(self._read_cursors) > 2000:
+            # Bounded: forget the oldest conversation cursor (dicts keep insertion order).
+            self._read_cursors.pop(next(iter(self._read_cursors)), None)
+
+    def process_and_reply(self, contact_name, message, observed_at: Optional[float] = None):
         """处理消息并发送回复 (模拟输入, 处理换行)"""
         reply = None
         try:
@@ -1122,7 +2116,7 @@ class WebMonitor:
             if self.message_callback:
                 is_group = False
                 try:
-                    is_group = self._is_group_chat()
+                    is_group = self.is_group_contact(contact_name)
                 except Exception:
                     is_group = False
                 message_data = {
@@ -1132,6 +2126,8 @@ class WebMonitor:
                     'sender': contact_name,
                     'is_group': is_group,
                 }
+                if observed_at:
+                    message_data['observed_at'] = observed_at
                 self.logger.info(f"🔄 调用消息回调处理来自 '{contact_name}' 的消息")
                 callback_reply = self.message_callback(message_data)
                 return callback_reply  # Gateway模式通常返回None，不直接回复
@@ -1152,27 +2148,13 @@ class WebMonitor:
                 return None
 
             try:
-                input_box = self.driver.find_element(By.CSS_SELECTOR, self.input_box_selector)
-                input_box.clear() # Clear input box first
-                
-                # Split reply by newline and send line by line with Cmd+Enter
-                lines = reply.split('\n')
-                num_lines = len(lines)
-                
-                for i, line in enumerate(lines):
-                    input_box.send_keys(line)
-                    if i < num_lines - 1: # If not the last line
-                        # Send Cmd+Enter for newline (macOS)
-                        # Use Keys.CONTROL for Windows/Linux if needed
-                        self.logger.debug("Sending Cmd+Enter for newline")
-                        input_box.send_keys(Keys.COMMAND, Keys.ENTER)
-                        time.sleep(0.1) # Small pause between lines
-                
-                # Send the final Enter to send the message
-                time.sleep(0.5) # Pause before final Enter
-                input_box.send_keys(Keys.ENTER)
-                self.logger.info(f"已向 '{contact_name}' 发送回复 (处理换行后通过 Enter): {reply[:30]}...")
-                time.sleep(1)
+                input_box = self._find_first(self.input_box_selector, self.input_box_timeout_sec)
+                if input_box is None:
+                    raise NoSuchElementException(self.input_box_selector)
+                if not self._send_text_via_input_box(input_box, reply):
+                    self.logger.error(f"向 '{contact_name}' 写入回复失败")
+                    return None
+                self.logger.info(f"已向 '{contact_name}' 发送回复: {reply[:30]}...")
                 return reply
             except NoSuchElementException:
                  self.logger.error(f"发送回复时未找到输入框 ({self.input_box_selector})")
@@ -1185,39 +2167,78 @@ class WebMonitor:
             self.logger.error(f"回复流程 ('{contact_name}') 中出错: {str(e)}")
             return None
     
-    def close(self):
-        """关闭浏览器驱动"""
+    def close(self, keep_browser: bool = True):
+        """
+        关闭浏览器驱动并停止驱动线程。独立浏览器模式 (chrome_debug_port) 下默认只停止 chromedriver，
+        Chrome 与已登录的微信页面继续运行，供下次启动附着；keep_browser=False 时连同 Chrome 一起关闭。
+        """
+        if self._scheduler.is_driver_thread():
+            self._close_driver(keep_browser)
+        else:
+            try:
+                # Runs after the step in progress; queued scans are cancelled by stop() below.
+                self.run_on_driver(
+                    lambda: self._close_driver(keep_browser),
+                    PRIORITY_SEND,
+                    "close",
+                    timeout=float(self.config.get("close_timeout_sec", 10)),
+                )
+            except Exception as e:
+                # Driver thread stuck in a hung WebDriver call: close from here so the command fails fast.
+                self.logger.warning(f"驱动线程未及时响应关闭请求，直接关闭: {e}")
+                self._close_driver(keep_browser)
+        self._scheduler.stop()
+
+    def _close_driver(self, keep_browser: bool = True):
         if self.driver:
             self.logger.info("关闭浏览器驱动...")
             try:
-                self.driver.quit()
-                self.logger.info("浏览器驱动已关闭。")
+                if self._detached is not None:
+                    if not keep_browser:
+                        try:
+                            self.driver.execute_cdp_cmd('Browser.close', {})
+                        except Exception:
+                            pass  # the connection drops as the browser exits
+                        self._detached.wait_until_gone()
+                    # Skip quit(): deleting the session is not needed, only the chromedriver process goes away.
+                    self.driver.service.stop()
+                    self.logger.info("chromedriver 已停止" + ("，Chrome 保持运行。" if keep_browser else "，Chrome 已关闭。"))
+                else:
+                    self.driver.quit()
+                    self.logger.info("浏览器驱动已关闭。")
             except Exception as e:
                  self.logger.error(f"关闭浏览器驱动时出错: {str(e)}")
             finally:
                 self.driver = None
 
-    def detect_if_group_chat(self, chat_item_element, contact_name):
+    def detect_if_group_chat(self, chat_item_element, contact_name, username: Optional[str] = None):
          """
          Attempts to detect if the currently opened chat is a group chat.
          Prefer robust checks (header / attributes) over guessed icons to avoid
          accidentally replying to group chats.
          """
-         # 1) Attribute-based hint (often present on chat list items)
-         try:
-             for attr in ("data-username", "data-uid", "username", "id"):
-                 v = chat_item_element.get_attribute(attr)
-                 if isinstance(v, str) and v.endswith("@chatroom"):
-                     return True
-         except Exception:
-             pass
+         # 0) Classification cache (dictionary lookup; filled from chat-list snapshots)
+         cached = self._group_cache.lookup(contact_name, username)
+         if cached is not None:
+             return cached
 
-         # 2) Active-chat DOM indicators (best-effort)
+         # 1) Attribute-based hint (often present on chat list items; already in the snapshot if available)
          try:
-             return bool(self._is_group_chat())
+             if chat_item_element is not None and username is None:
+                 for attr in ("data-username", "data-uid", "username", "id"):
+                     v = chat_item_element.get_attribute(attr)
+                     if is_group_username(v):
+                         self._group_cache.store(contact_name, True)
+                         return True
          except Exception:
              pass
 
+         # 2) Active-chat DOM indicator (only when the open chat is this contact)
+         probed = self._probe_group_chat(contact_name)
+         if probed is not None:
+             self._group_cache.store(contact_name, probed, username=username)
+             return probed
+
          # 3) Conservative fallback heuristics
          try:
              name = str(contact_name or "").strip()
@@ -0,0 +1,564 @@
+"""
+In-page JavaScript snippets used by WebMonitor.
+
+Each snippet is executed with a single `driver.execute_script(...)` round trip
+and returns plain JSON-serializable data, so the Python side can make its
+decisions without walking the DOM element by element over WebDriver.
+"""
+
+# arguments[0]: {
+#   login, item, name, badge, unread, active, preview  (CSS selectors)
+# }
+# returns: {logged_in: bool, ts: int, items: [{index, nickname, unread, username, active, preview_hash}]}
+CHAT_LIST_SNAPSHOT_JS = r"""
+var cfg = arguments[0] || {};
+function matches(el, sel) {
+    if (!sel) { return false; }
+    try { return el.matches(sel); } catch (e) { return null; }
+}
+function hash(s) {
+    var h = 5381;
+    for (var i = 0; i < s.length; i++) { h = ((h << 5) + h + s.charCodeAt(i)) | 0; }
+    return (h >>> 0).toString(16);
+}
+function text(el) { return el ? (el.textContent || '').replace(/\s+/g, ' ').trim() : ''; }
+var out = {logged_in: false, ts: Date.now(), items: []};
+try { out.logged_in = !!(cfg.login && document.querySelector(cfg.login)); } catch (e) {}
+var nodes = [];
+try { nodes = document.querySelectorAll(cfg.item || '.chat_item'); } catch (e) { nodes = []; }
+for (var i = 0; i < nodes.length; i++) {
+    var el = nodes[i];
+    var badge = null;
+    try { badge = cfg.badge ? el.querySelector(cfg.badge) : null; } catch (e) { badge = null; }
+    var count = 0;
+    if (badge) {
+        var n = parseInt(text(badge), 10);
+        count = isNaN(n) || n < 1 ? 1 : n;
+    }
+    var isUnread = matches(el, cfg.unread);
+    if (isUnread === null) { isUnread = !!badge; }
+    var username = '';
+    var attrs = ['data-username', 'data-uid', 'username', 'id'];
+    for (var j = 0; j < attrs.length && !username; j++) { username = el.getAttribute(attrs[j]) || ''; }
+    var isActive = matches(el, cfg.active);
+    if (isActive === null) { isActive = el.classList.contains('active'); }
+    var preview = null;
+    try { preview = cfg.preview ? el.querySelector(cfg.preview) : null; } catch (e) { preview = null; }
+    out.items.push({
+        index: i,
+        nickname: text(cfg.name ? el.querySelector(cfg.name) : null),
+        unread: isUnread ? Math.max(count, 1) : 0,
+        username: username,
+        active: !!isActive,
+        preview_hash: hash(text(preview))
+    });
+}
+return out;
+"""
+
+# arguments[0]: item selector, arguments[1]: index, arguments[2]: name selector, arguments[3]: expected nickname
+# returns: the chat item element (re-located by nickname if the list was reordered), or null.
+CHAT_ITEM_BY_INDEX_JS = r"""
+var nodes = document.querySelectorAll(arguments[0]);
+var index = arguments[1], nameSel = arguments[2], expected = arguments[3];
+function nameOf(el) {
+    var nameEl = nameSel ? el.querySelector(nameSel) : null;
+    return nameEl ? (nameEl.textContent || '').replace(/\s+/g, ' ').trim() : '';
+}
+var el = nodes[index];
+if (el && (!expected || nameOf(el) === expected)) { return el; }
+if (!expected) { return null; }
+for (var i = 0; i < nodes.length; i++) {
+    if (nameOf(nodes[i]) === expected) { return nodes[i]; }
+}
+return null;
+"""
+
+# Shared helpers prepended to scripts that classify `.message` elements.
+# Expects `cfg` in scope with: content (CSS selector), outgoing_colors (list of css colors).
+_MESSAGE_HELPERS_JS = r"""
+function __wxText(el) { return el ? (el.innerText || el.textContent || '').trim() : ''; }
+function __wxDirection(el, cfg) {
+    var cls = ' ' + (el.getAttribute('class') || '').toLowerCase() + ' ';
+    if (cls.indexOf('message-sys') >= 0) { return 'sys'; }
+    if (cls.indexOf('message-send') >= 0 || cls.indexOf(' me ') >= 0
+        || cls.indexOf('from_me') >= 0 || cls.indexOf('self') >= 0) { return 'out'; }
+    var colors = cfg.outgoing_colors || [];
+    if (colors.length) {
+        var bg = '';
+        try { bg = window.getComputedStyle(el).backgroundColor || ''; } catch (e) {}
+        for (var i = 0; i < colors.length; i++) { if (bg.indexOf(colors[i]) >= 0) { return 'out'; } }
+    }
+    return 'in';
+}
+function __wxMessageId(el) {
+    var id = el.getAttribute('data-msgid') || el.getAttribute('msgid') || '';
+    if (id) { return id; }
+    var holders = [el];
+    try { holders = holders.concat(Array.prototype.slice.call(el.querySelectorAll('[data-cm]'))); } catch (e) {}
+    for (var i = 0; i < holders.length; i++) {
+        var cm = holders[i].getAttribute && holders[i].getAttribute('data-cm');
+        if (!cm) { continue; }
+        try {
+            var parsed = JSON.parse(cm);
+            if (parsed && (parsed.msgId || parsed.MsgId)) { return String(parsed.msgId || parsed.MsgId); }
+        } catch (e) {}
+    }
+    return '';
+}
+function __wxDescribe(el, cfg) {
+    var contentEl = null;
+    try { contentEl = cfg.content ? el.querySelector(cfg.content) : null; } catch (e) { contentEl = null; }
+    return {
+        cls: el.getAttribute('class') || '',
+        direction: __wxDirection(el, cfg),
+        text: __wxText(contentEl || el),
+        has_content: !!contentEl,
+        msg_id: __wxMessageId(el)
+    };
+}
+"""
+
+# Installs (idempotently) an in-page MutationObserver that records new-message events
+# into a bounded ring buffer on `window.__wxAutoObserver`.
+# arguments[0]: {
+#   list, pane (container selectors), item, name, active, badge, message, content (CSS selectors),
+#   header (list of active-chat header selectors), outgoing_colors (list of css colors),
+#   max_events (int), switch_settle_ms (int)
+# }
+# returns: {installed: bool, fresh: bool, gen: str}
+MESSAGE_OBSERVER_INSTALL_JS = _MESSAGE_HELPERS_JS + r"""
+var cfg = arguments[0] || {};
+var existing = window.__wxAutoObserver;
+if (existing && existing.alive()) {
+    return {installed: true, fresh: false, gen: existing.gen};
+}
+if (existing) { try { existing.disconnect(); } catch (e) {} }
+function q(sel, root) { try { return sel ? (root || document).querySelector(sel) : null; } catch (e) { return null; } }
+function qa(sel, root) { try { return sel ? (root || document).querySelectorAll(sel) : []; } catch (e) { return []; } }
+var firstItem = q(cfg.item);
+var firstMessage = q(cfg.message);
+var listRoot = q(cfg.list) || (firstItem && firstItem.parentElement) || document.body;
+var paneRoot = q(cfg.pane) || (firstMessage && firstMessage.parentElement) || document.body;
+var o = {
+    gen: Date.now().toString(36) + Math.random().toString(36).slice(2, 8),
+    buf: [],
+    seq: 0,
+    dropped: 0,
+    max: cfg.max_events || 500,
+    waiter: null,
+    paneContact: null,
+    switchedAt: 0,
+    listPending: false,
+    observers: []
+};
+o.alive = function () {
+    return document.contains(listRoot) && document.contains(paneRoot);
+};
+o.disconnect = function () {
+    for (var i = 0; i < o.observers.length; i++) { o.observers[i].disconnect(); }
+    o.observers = [];
+};
+o.push = function (ev) {
+    ev.seq = ++o.seq;
+    ev.ts = Date.now();
+    o.buf.push(ev);
+    if (o.buf.length > o.max) { o.buf.shift(); o.dropped++; }
+    if (o.waiter) { o.waiter(); }
+};
+o.activeContact = function () {
+    var headers = cfg.header || [];
+    for (var i = 0; i < headers.length; i++) {
+        var t = __wxText(q(headers[i]));
+        if (t) { return t; }
+    }
+    return '';
+};
+o.activeUsername = function () {
+    var el = q(cfg.active);
+    return el ? (el.getAttribute('data-username') || '') : '';
+};
+o.scanPane = function () {
+    var contact = o.activeContact();
+    // Document-wide, so `index` matches MESSAGE_PANE_EXTRACT_JS positions.
+    var nodes = qa(cfg.message);
+    if (contact !== o.paneContact) {
+        // Chat switched: the pane is re-rendered with history; only later additions are new.
+        o.paneContact = contact;
+        o.switchedAt = Date.now();
+    }
+    if (Date.now() - o.switchedAt < (cfg.switch_settle_ms || 0)) {
+        // History may still be rendering in later tasks; the Python scan reads the switched chat itself.
+        for (var k = 0; k < nodes.length; k++) { nodes[k].__wxAutoSeen = true; }
+        return;
+    }
+    var fresh = [];
+    for (var i = nodes.length - 1; i >= 0; i--) {
+        if (nodes[i].__wxAutoSeen) { break; }
+        nodes[i].__wxAutoSeen = true;
+        fresh.push(i);
+    }
+    var username = fresh.length ? o.activeUsername() : '';
+    for (var j = fresh.length - 1; j >= 0; j--) {
+        var info = __wxDescribe(nodes[fresh[j]], cfg);
+        if (info.direction === 'sys') { continue; }
+        o.push({
+            kind: 'message',
+            contact: contact,
+            username: username,
+            index: fresh[j],
+            text: info.text,
+            outgoing: info.direction === 'out',
+            msg_id: info.msg_id
+        });
+    }
+};
+o.scanList = function () {
+    var badges = qa(cfg.badge, listRoot);
+    if (!badges.length) { o.listPending = false; return; }
+    if (o.listPending) { return; }
+    o.listPending = true;
+    o.push({kind: 'chat', unread_chats: badges.length});
+};
+var paneObserver = new MutationObserver(function () { o.scanPane(); });
+paneObserver.observe(paneRoot, {childList: true, subtree: true});
+o.observers.push(paneObserver);
+if (listRoot !== paneRoot) {
+    var listObserver = new MutationObserver(function () { o.scanList(); });
+    listObserver.observe(listRoot, {childList: true, subtree: true, characterData: true});
+    o.observers.push(listObserver);
+} else {
+    paneObserver.disconnect();
+    var bodyObserver = new MutationObserver(function () { o.scanPane(); o.scanList(); });
+    bodyObserver.observe(paneRoot, {childList: true, subtree: true, characterData: true});
+    o.observers = [bodyObserver];
+}
+o.paneContact = o.activeContact();
+var initial = qa(cfg.message);
+for (var n = 0; n < initial.length; n++) { initial[n].__wxAutoSeen = true; }
+window.__wxAutoObserver = o;
+return {installed: true, fresh: true, gen: o.gen};
+"""
+
+# execute_async_script long-poll on the observer ring buffer.
+# arguments[0]: max wait in milliseconds; last argument: completion callback.
+# returns: {installed: false} when the page was reloaded / observer detached,
+#          otherwise {installed: true, gen, events: [...], dropped}
+MESSAGE_OBSERVER_DRAIN_JS = r"""
+var done = arguments[arguments.length - 1];
+var waitMs = arguments[0] || 0;
+var o = window.__wxAutoObserver;
+if (!o || !o.alive()) { done({installed: false}); return; }
+function drain() {
+    var events = o.buf.splice(0, o.buf.length);
+    var dropped = o.dropped;
+    o.dropped = 0;
+    o.listPending = false;
+    return {installed: true, gen: o.gen, events: events, dropped: dropped};
+}
+if (o.buf.length || waitMs <= 0) { done(drain()); return; }
+var timer = setTimeout(function () { o.waiter = null; done(drain()); }, waitMs);
+o.waiter = function () {
+    clearTimeout(timer);
+    o.waiter = null;
+    // Let the rest of the mutation batch land before returning.
+    setTimeout(function () { done(drain()); }, 0);
+};
+"""
+
+# Reads the last N `.message` elements of the open chat in one round trip.
+# arguments[0]: {message, content (CSS selectors), outgoing_colors (list), limit (int)}
+# returns: {total: int, messages: [{index, cls, direction: 'in'|'out'|'sys', text, has_content, msg_id}]}
+MESSAGE_PANE_EXTRACT_JS = _MESSAGE_HELPERS_JS + r"""
+var cfg = arguments[0] || {};
+var nodes = [];
+try { nodes = document.querySelectorAll(cfg.message); } catch (e) { nodes = []; }
+var limit = cfg.limit || 30;
+var start = Math.max(0, nodes.length - limit);
+var out = {total: nodes.length, messages: []};
+for (var i = start; i < nodes.length; i++) {
+    var info = __wxDescribe(nodes[i], cfg);
+    info.index = i;
+    out.messages.push(info);
+}
+return out;
+"""
+
+# Probes an ordered list of candidate selectors for one logical element in a single round trip.
+# arguments[0]: list of CSS selectors, arguments[1]: {need_text: bool, need_visible: bool}
+# returns: {index: int (-1 if nothing matched), element, text}
+SELECTOR_PROBE_JS = r"""
+var candidates = arguments[0] || [];
+var opts = arguments[1] || {};
+function visible(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); }
+for (var i = 0; i < candidates.length; i++) {
+    var nodes = [];
+    try { nodes = document.querySelectorAll(candidates[i]); } catch (e) { continue; }
+    for (var j = 0; j < nodes.length; j++) {
+        var el = nodes[j];
+        var t = (el.innerText || el.textContent || '').trim();
+        if (opts.need_text && !t) { continue; }
+        if (opts.need_visible && !visible(el)) { continue; }
+        return {index: i, element: el, text: t};
+    }
+}
+return {index: -1, element: null, text: ''};
+"""
+
+# Shared chat-list lookup. Expects `cfg` in scope with:
+#   item, name (CSS selectors), username, nickname (strings), contains (bool: allow substring match)
+_CHAT_ITEM_FIND_JS = r"""
+function __wxFindChatItem(cfg) {
+    var nodes = [];
+    try { nodes = document.querySelectorAll(cfg.item || '.chat_item'); } catch (e) { return null; }
+    if (cfg.username) {
+        for (var i = 0; i < nodes.length; i++) {
+            if (nodes[i].getAttribute('data-username') === cfg.username) { return nodes[i]; }
+        }
+    }
+    if (!cfg.nickname) { return null; }
+    var partial = null;
+    for (var j = 0; j < nodes.length; j++) {
+        var nameEl = cfg.name ? nodes[j].querySelector(cfg.name) : null;
+        var name = nameEl ? (nameEl.textContent || '').replace(/\s+/g, ' ').trim() : '';
+        if (!name) { continue; }
+        if (name === cfg.nickname) { return nodes[j]; }
+        if (cfg.contains && !partial && name.indexOf(cfg.nickname) >= 0) { partial = nodes[j]; }
+    }
+    return partial;
+}
+"""
+
+# arguments[0]: lookup cfg (see _CHAT_ITEM_FIND_JS); returns the chat item element or null.
+CHAT_ITEM_LOOKUP_JS = _CHAT_ITEM_FIND_JS + r"""
+var el = __wxFindChatItem(arguments[0] || {});
+if (el) { try { el.scrollIntoView({block: 'center'}); } catch (e) {} }
+return el;
+"""
+
+# execute_async_script: waits in-page (polling every 30ms) until the chat item shows up,
+# e.g. after typing into the search box.
+# arguments[0]: lookup cfg, arguments[1]: timeout in ms; returns the element or null on timeout.
+CHAT_ITEM_WAIT_JS = _CHAT_ITEM_FIND_JS + r"""
+var done = arguments[arguments.length - 1];
+var cfg = arguments[0] || {};
+var deadline = Date.now() + (arguments[1] || 0);
+(function poll() {
+    var el = __wxFindChatItem(cfg);
+    if (el) {
+        try { el.scrollIntoView({block: 'center'}); } catch (e) {}
+        done(el);
+        return;
+    }
+    if (Date.now() >= deadline) { done(null); return; }
+    setTimeout(poll, 30);
+})();
+"""
+
+# Chat search box (an <input>): focus it and empty it, firing `input` so the page's model
+# (and the filtered chat list) follows. Platform independent, unlike a select-all key chord.
+# arguments[0]: search box element; returns true when the box ends up empty.
+SEARCH_BOX_CLEAR_JS = r"""
+var box = arguments[0];
+if (!box) { return false; }
+try { box.focus(); } catch (e) {}
+if ('value' in box) { box.value = ''; } else { box.textContent = ''; }
+try { box.dispatchEvent(new Event('input', {bubbles: true})); } catch (e) {}
+try { box.dispatchEvent(new Event('change', {bubbles: true})); } catch (e) {}
+return ('value' in box ? box.value : box.textContent).length === 0;
+"""
+
+# Send macro, step 1: focus the input box and empty it.
+# arguments[0]: input box element; returns true when the box is focused.
+INPUT_BOX_PREPARE_JS = r"""
+var box = arguments[0];
+if (!box) { return false; }
+try { box.focus(); } catch (e) { return false; }
+try {
+    var sel = window.getSelection();
+    var range = document.createRange();
+    range.selectNodeContents(box);
+    sel.removeAllRanges();
+    sel.addRange(range);
+    document.execCommand('delete', false, null);
+} catch (e) {}
+if ((box.innerText || box.value || '').length) {
+    if ('value' in box) { box.value = ''; } else { box.innerHTML = ''; }
+}
+return document.activeElement === box;
+"""
+
+# Send macro, step 2 (fallback when CDP Input.insertText is unavailable): insert the whole
+# text at the caret in one editing command, so the page's input listeners fire as for typing.
+# arguments[0]: input box element, arguments[1]: text; returns the resulting text length.
+INPUT_BOX_INSERT_TEXT_JS = r"""
+var box = arguments[0];
+var text = arguments[1] || '';
+if (!box) { return -1; }
+try { if (document.activeElement !== box) { box.focus(); } } catch (e) {}
+var ok = false;
+try { ok = document.execCommand('insertText', false, text); } catch (e) { ok = false; }
+if (!ok) {
+    if ('value' in box) { box.value += text; } else { box.appendChild(document.createTextNode(text)); }
+    try { box.dispatchEvent(new Event('input', {bubbles: true})); } catch (e) {}
+}
+return (box.innerText || box.value || '').length;
+"""
+
+# arguments[0]: input box element; returns the current text length (-1 if missing).
+INPUT_BOX_TEXT_LENGTH_JS = r"""
+var box = arguments[0];
+return box ? (box.innerText || box.value || '').length : -1;
+"""
+
+# Send ACK, step 1 (run before pressing Enter): registers a watch on `window.__wxSendAckHub`.
+# One shared MutationObserver looks for a new outgoing bubble whose normalized text contains
+# the expected text; bubbles already on the page when the watch is armed are ignored, so an
+# older identical message never matches. Each watch keeps the last send-state it observed
+# (pending -> sending -> delivered/failed), so the result survives the chat being switched away.
+# arguments[0]: {
+#   message, content (CSS selectors), outgoing_colors (list of css colors), expected (normalized text),
+#   sending, failed (lists of CSS selectors for the bubble's send-state icons), max_watches (int)
+# }
+# returns: the watch id (string)
+SEND_ACK_ARM_JS = _MESSAGE_HELPERS_JS + r"""
+var cfg = arguments[0] || {};
+function qa(sel, root) { try { return sel ? (root || document).querySelectorAll(sel) : []; } catch (e) { return []; } }
+function norm(t) {
+    return String(t || '').replace(/[\u200b\ufeff]/g, '').replace(/\s+/g, ' ').trim();
+}
+function shown(el) {
+    if (!el) { return false; }
+    var st = null;
+    try { st = window.getComputedStyle(el); } catch (e) {}
+    if (st && (st.display === 'none' || st.visibility === 'hidden')) { return false; }
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+function anyShown(sels, root) {
+    for (var i = 0; i < (sels || []).length; i++) {
+        var nodes = qa(sels[i], root);
+        for (var j = 0; j < nodes.length; j++) { if (shown(nodes[j])) { return true; } }
+    }
+    return false;
+}
+var hub = window.__wxSendAckHub;
+if (!hub || !hub.alive()) {
+    if (hub) { try { hub.observer.disconnect(); } catch (e) {} }
+    hub = {watches: {}, order: [], observer: null};
+    hub.alive = function () { return !!hub.observer && document.body && hub.root === document.body; };
+    hub.update = function (w) {
+        if (w.state === 'delivered' || w.state === 'failed') { return; }
+        if (!w.el) {
+            var nodes = qa(w.cfg.message);
+            for (var k = nodes.length - 1; k >= 0; k--) {
+                var el = nodes[k];
+                if (w.seen.has(el)) { break; }
+                var d = __wxDescribe(el, w.cfg);
+                if (d.direction === 'out' && w.expected && norm(d.text).indexOf(w.expected) >= 0) {
+                    w.el = el;
+                    w.msgId = d.msg_id;
+                    break;
+                }
+            }
+        }
+        if (!w.el || !w.el.isConnected) { return; }  // keep the last state seen while attached
+        if (!w.msgId) { w.msgId = __wxMessageId(w.el); }
+        if (anyShown(w.cfg.failed, w.el)) { w.state = 'failed'; }
+        else if (anyShown(w.cfg.sending, w.el)) { w.state = 'sending'; }
+        else { w.state = 'delivered'; }
+        if (w.state !== 'sending') { w.settledAt = Date.now(); }
+    };
+    hub.scan = function () {
+        for (var i = 0; i < hub.order.length; i++) {
+            var w = hub.watches[hub.order[i]];
+            if (!w) { continue; }
+            hub.update(w);
+            if (w.waiter && w.state !== 'pending' && w.state !== 'sending') {
+                var cb = w.waiter;
+                w.waiter = null;
+                cb();
+            }
+        }
+    };
+    hub.describe = function (w) {
+        return {state: w.state, msg_id: w.msgId || '', elapsed_ms: (w.settledAt || Date.now()) - w.armedAt};
+    };
+    hub.release = function (id) {
+        delete hub.watches[id];
+        var idx = hub.order.indexOf(id);
+        if (idx >= 0) { hub.order.splice(idx, 1); }
+    };
+    try {
+        hub.root = document.body;
+        hub.observer = new MutationObserver(function () { hub.scan(); });
+        hub.observer.observe(document.body, {childList: true, subtree: true, attributes: true,
+                                             attributeFilter: ['class', 'style']});
+    } catch (e) {}
+    window.__wxSendAckHub = hub;
+}
+var seen = new WeakSet();
+var existing = qa(cfg.message);
+for (var i = 0; i < existing.length; i++) { seen.add(existing[i]); }
+var w = {
+    id: String(Date.now()) + '-' + Math.random().toString(36).slice(2, 8),
+    cfg: cfg,
+    armedAt: Date.now(),
+    settledAt: 0,
+    expected: norm(cfg.expected),
+    seen: seen,
+    el: null,
+    msgId: '',
+    state: 'pending',
+    waiter: null
+};
+hub.watches[w.id] = w;
+hub.order.push(w.id);
+var maxWatches = cfg.max_watches || 200;
+while (hub.order.length > maxWatches) { hub.release(hub.order[0]); }
+return w.id;
+"""
+
+# Send ACK, step 2a (execute_async_script): waits for one armed watch to settle, then releases it.
+# arguments[0]: watch id, arguments[1]: timeout in ms,
+# arguments[2]: release the watch even if it has not settled yet (default true; false for a
+#               wait slice that will be resumed)
+# returns: {state: 'delivered'|'failed'|'sending'|'pending'|'unarmed', msg_id, elapsed_ms}
+SEND_ACK_WAIT_JS = r"""
+var done = arguments[arguments.length - 1];
+var id = arguments[0];
+var timeoutMs = arguments[1] || 0;
+var releaseUnsettled = arguments.length > 3 ? arguments[2] !== false : true;
+var hub = window.__wxSendAckHub;
+var w = hub && hub.watches[id];
+if (!w) { done({state: 'unarmed', msg_id: '', elapsed_ms: 0}); return; }
+var timer = null;
+function finish() {
+    if (timer) { clearTimeout(timer); }
+    w.waiter = null;
+    hub.update(w);
+    if (releaseUnsettled || (w.state !== 'pending' && w.state !== 'sending')) { hub.release(id); }
+    done(hub.describe(w));
+}
+w.waiter = finish;
+timer = setTimeout(finish, timeoutMs);
+hub.scan();
+"""
+
+# Send ACK, step 2b (pipelined): reads the current state of several watches in one round trip
+# and releases the ones the caller has finished with.
+# arguments[0]: list of watch ids to read, arguments[1]: list of watch ids to release
+# returns: {id: {state, msg_id, elapsed_ms}}; unknown ids report state 'unarmed'
+SEND_ACK_POLL_JS = r"""
+var ids = arguments[0] || [];
+var release = arguments[1] || [];
+var hub = window.__wxSendAckHub;
+var out = {};
+for (var i = 0; i < ids.length; i++) {
+    var w = hub && hub.watches[ids[i]];
+    if (!w) { out[ids[i]] = {state: 'unarmed', msg_id: '', elapsed_ms: 0}; continue; }
+    hub.update(w);
+    out[ids[i]] = hub.describe(w);
+}
+for (var j = 0; j < release.length; j++) { if (hub) { hub.release(release[j]); } }
+return out;
+"""
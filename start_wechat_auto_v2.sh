@@ -21,7 +21,9 @@ Usage:
 
 Commands:
   start      Start service (default; opens Chrome QR for login)
-  restart    Restart service and browser profile
+  restart    Restart service (keeps a detached Chrome running when
+             web_monitor.chrome_debug_port is set; otherwise also closes
+             Chrome using the profile)
   install    Create/activate venv and pip install dependencies
   setup      Create config.json from example (if missing)
   help       Show help
@@ -29,6 +31,9 @@ Commands:
 Options (for start):
   --no-automation   Start HTTP/WS servers only (no Selenium login)
 
+Options (for restart):
+  --fresh-browser   Also close the detached Chrome (forces a full page load)
+
 Examples:
   ./start_wechat_auto_v2.sh
   ./start_wechat_auto_v2.sh install
@@ -99,6 +104,14 @@ print(os.path.abspath(ud))
 PY
 }
 
+debug_port() {
+  python - "$CFG" <<'PY'
+import json, sys
+cfg = json.load(open(sys.argv[1], "r", encoding="utf-8"))
+print(int((cfg.get("web_monitor") or {}).get("chrome_debug_port") or 0))
+PY
+}
+
 stop_service() {
   # Best-effort stop: first SIGINT (graceful), then SIGKILL.
   local pids=""
@@ -117,15 +130,27 @@ stop_service() {
 
 restart_service() {
   setup_cfg
-  local prof
+  local prof port fresh=0
+  local args=()
+  for a in "$@"; do
+    if [ "$a" = "--fresh-browser" ]; then
+      fresh=1
+    else
+      args+=("$a")
+    fi
+  done
   prof="$(profile_dir)"
+  port="$(debug_port)"
   stop_service
-  if [ -n "$prof" ]; then
+  if [ "$port" -gt 0 ] && [ "$fresh" -eq 0 ]; then
+    # Detached mode: the logged-in Chrome keeps running and the new process re-attaches to it.
+    log "keeping detached chrome on debug port $port (use --fresh-browser to close it)"
+  elif [ -n "$prof" ]; then
     log "closing orphaned chrome using profile: $prof"
     pkill -f "$prof" >/dev/null 2>&1 || true
     sleep 0.8
   fi
-  start_service "$@"
+  start_service "${args[@]+"${args[@]}"}"
 }
 
 main() {
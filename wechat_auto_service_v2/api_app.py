@@ -1,8 +1,13 @@
+import asyncio
+import contextlib
 from typing import Any, Optional
 
 from fastapi import Body, FastAPI, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 
+from modules.metrics import CONTENT_TYPE
+
 from .runtime import WeChatAutoRuntime
 
 
@@ -36,7 +41,14 @@ class SendAppRequest(BaseModel):
 
 
 def create_api_app(runtime: WeChatAutoRuntime) -> FastAPI:
-    app = FastAPI(title="WeChat Auto Service v2 (API)", version="2.0")
+    async def lifespan(app: FastAPI):
+        lag_task = asyncio.create_task(runtime.event_loop_lag_loop("api"), name="wechat08-api-loop-lag")
+        yield
+        lag_task.cancel()
+        with contextlib.suppress(BaseException):
+            await lag_task
+
+    app = FastAPI(title="WeChat Auto Service v2 (API)", version="2.0", lifespan=lifespan)
 
     @app.get("/health")
     def health() -> dict:
@@ -47,6 +59,11 @@ def create_api_app(runtime: WeChatAutoRuntime) -> FastAPI:
             }
         )
 
+    @app.get("/metrics")
+    def metrics() -> PlainTextResponse:
+        # Prometheus text exposition (queue depths, scan / WebDriver / send latency, WS traffic, loop lag).
+        return PlainTextResponse(runtime.metrics.render(), media_type=CONTENT_TYPE)
+
     @app.get("/api/Msg/WebSocketStatus")
     def ws_status() -> dict:
         return runtime.ok(
@@ -75,20 +92,24 @@ def create_api_app(runtime: WeChatAutoRuntime) -> FastAPI:
 
     @app.post("/api/Login/HeartBeatLong")
     def login_heartbeat_long(wxid: Optional[str] = Query(default=None)) -> dict:
-        return runtime.ok({"wxid": wxid or runtime.bot_wxid})
+        account = runtime.account(wxid)
+        return runtime.ok({"wxid": account.bot_wxid if account else wxid})
 
     @app.post("/api/User/GetContractProfile")
     def get_profile(wxid: Optional[str] = Query(default=None), body: Optional[dict] = Body(default=None)) -> dict:
         req_wxid = wxid or (body or {}).get("Wxid") or runtime.bot_wxid
-        if req_wxid != runtime.bot_wxid:
+        account = runtime.accounts.get(req_wxid)
+        if account is None:
             return runtime.err(404, f"unknown wxid: {req_wxid}")
-        return runtime.ok({"wxid": runtime.bot_wxid, "nickname": runtime.bot_nickname})
+        return runtime.ok({"wxid": account.bot_wxid, "nickname": account.bot_nickname})
 
     @app.post("/api/Msg/SendTxt")
     def send_txt(req: SendTxtRequest) -> dict:
         try:
-            runtime.logger.info("wechat08 SendTxt: to=%s len=%s", req.ToWxid, len(req.Content or ""))
-            accepted, job_id = runtime.enqueue_text(req.ToWxid, req.Content)
+            runtime.logger.info("wechat08 SendTxt: wxid=%s to=%s len=%s", req.Wxid, req.ToWxid, len(req.Content or ""))
+            if runtime.account(req.Wxid) is None:
+                return runtime.err(404, f"unknown wxid: {req.Wxid}")
+            accepted, job_id = runtime.enqueue_text(req.ToWxid, req.Content, wxid=req.Wxid)
             if not accepted:
                 return runtime.err(503, "automation not ready (selenium not running)")
             # Return immediately to avoid LangBot HTTP client read timeout.
@@ -71,7 +71,7 @@ def main() -> int:
 
     runtime.logger.info("wechat08_api_base: http://%s:%s/api", api_host, api_port)
     runtime.logger.info("wechat08_ws_base: ws://%s:%s/ws", ws_host, ws_port)
-    runtime.logger.info("wxid: %s", runtime.bot_wxid)
+    runtime.logger.info("wxid: %s", ", ".join(runtime.accounts))
 
     try:
         while True:
@@ -5,10 +5,15 @@ import queue
 import random
 import threading
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from itertools import count
 from typing import Any, Optional
 
+from modules.driver_scheduler import PRIORITY_NAMES
+from modules.latency_trace import LatencyTracer, MessageTrace
+from modules.metrics import MetricsRegistry
+from modules.send_batcher import ContactAffinityBatcher
 from modules.web_monitor import WebMonitor
 
 
@@ -26,10 +31,31 @@ def _strip_chatroom_suffix(wxid_or_name: str) -> str:
     return wxid_or_name
 
 
+# stats key -> (metric name, help); per-account counters in the metrics registry (label wxid).
+_ACCOUNT_COUNTERS = {
+    "received": ("wechat_messages_received_total", "Inbound messages published to LangBot"),
+    "sent": ("wechat_send_jobs_completed_total", "Send jobs completed (sent, acked or unconfirmed)"),
+    "acked": ("wechat_send_acked_total", "Send jobs confirmed delivered by the page ACK"),
+    "ack_unconfirmed": ("wechat_send_ack_unconfirmed_total", "Send jobs sent without a confirmed ACK"),
+    "ack_failed": ("wechat_send_ack_failed_total", "Page ACKs that showed the failed icon"),
+    "send_retries": ("wechat_send_retries_total", "Send attempts scheduled for retry"),
+    "send_chat_switches": ("wechat_send_chat_switches_total", "Send jobs that had to switch the open chat"),
+    "send_batched": ("wechat_send_batched_jobs_total", "Send jobs served from a multi-job batch window"),
+}
+
+# WebMonitor timing metric -> (histogram name, help, extra labels)
+_MONITOR_HISTOGRAMS = {
+    "scan_step": ("wechat_scan_step_seconds", "Duration of one monitor step on the driver thread", ("kind",)),
+    "driver_task": ("wechat_driver_task_seconds", "Driver thread task queue wait and run time", ("priority", "phase")),
+    "webdriver_command": ("wechat_webdriver_command_seconds", "WebDriver command round trip latency", ("command",)),
+}
+
+
 @dataclass(frozen=True)
 class PublishItem:
     account_wxid: str
     payload: dict
+    trace_id: str = ""
 
 
 @dataclass
@@ -44,24 +70,36 @@ class SendJob:
     done: threading.Event = field(default_factory=threading.Event)
     ok: bool = False
     error: str = ""
+    # queued -> sending -> [pending_ack ->] acked | unconfirmed | sent (no ACK requested) | failed
+    state: str = "queued"
+    attempts: int = 0
+    ack_watch_id: str = ""
+    ack_deadline: float = 0.0
+    # Latency trace: inbound events of the correlated message + this job's enqueue/queue/send/ACK events.
+    trace: Optional[MessageTrace] = None
 
 
-class WeChatAutoRuntime:
+class AccountRuntime:
     """
-    Runtime that:
-    - runs Selenium-based WeChat Web automation (login + message monitoring)
-    - exposes a wechat08-compatible message stream (WS) + send APIs (HTTP)
+    One WeChat account hosted by the gateway:
+    - runs its own Selenium-based WeChat Web automation (Chrome profile, login + message monitoring)
+    - owns its send queue/worker, merge buffers and stats
+    - publishes into the shared outbox of the owning WeChatAutoRuntime (routed by wxid)
     """
 
-    def __init__(self, config: dict):
+    def __init__(self, hub: "WeChatAutoRuntime", config: dict):
+        self.hub = hub
         self.config = config
         self.bot_wxid: str = (config.get("bot") or {}).get("wxid") or "wxid_unknown"
         self.bot_nickname: str = (config.get("bot") or {}).get("nickname") or self.bot_wxid
 
-        self.logger = logging.getLogger("wechat_auto_service_v2")
+        self.logger = hub.logger.getChild(self.bot_wxid)
 
-        self._msg_id = count(1)
-        self._outbox: queue.Queue[PublishItem] = queue.Queue()
+        # Shared with the other accounts: message ids, job ids and the WS outbox.
+        self._msg_id = hub._msg_id
+        self._outbox = hub._outbox
+        self._send_job_id = hub._send_job_id
+        self._tracer = hub.tracer
 
         self._web_monitor: Optional[WebMonitor] = None
         self._monitor_thread: Optional[threading.Thread] = None
@@ -75,14 +113,32 @@ class WeChatAutoRuntime:
         self._send_backoff_base_sec: float = float(send_cfg.get("backoff_base_sec", 0.6))
         self._send_backoff_max_sec: float = float(send_cfg.get("backoff_max_sec", 4.0))
         self._send_request_timeout_sec: float = float(send_cfg.get("request_timeout_sec", 12.0))
+        # pipelined: the worker moves on right after Enter; pending ACKs are verified between jobs.
+        self._send_ack_mode: str = str(send_cfg.get("ack_mode", "pipelined")).strip().lower()
+        self._send_ack_poll_sec: float = float(send_cfg.get("ack_poll_sec", 0.25))
+        # Contact affinity: drain up to batch_window queued jobs and send them grouped by contact.
+        self._send_batch_window: int = max(1, int(send_cfg.get("batch_window", 8)))
+        self._send_batch_linger_sec: float = max(0.0, float(send_cfg.get("batch_linger_ms", 0))) / 1000.0
+        self._send_batcher = ContactAffinityBatcher(
+            max_reorder_delay_sec=float(send_cfg.get("max_reorder_delay_sec", 2.0)),
+            key=lambda job: _strip_chatroom_suffix(job.to_wxid),
+        )
+        self._pending_acks_lock = threading.Lock()
+        self._pending_acks: dict[str, SendJob] = {}
+        self._acks_to_release: list[str] = []
 
-        self._send_job_id = count(1)
         self._send_queue: queue.Queue[Optional[SendJob]] = queue.Queue()
         self._send_thread: Optional[threading.Thread] = None
         self._send_pending_lock = threading.Lock()
         self._send_pending: dict[tuple[str, str], SendJob] = {}
         self._send_by_id_lock = threading.Lock()
         self._send_by_id: dict[int, SendJob] = {}
+        # Per-contact order across ACKs and retries: while a job waits for its page ACK or its re-send,
+        # later jobs to the same contact are held back, then released ahead of the queue once it settles.
+        self._send_order_lock = threading.Lock()
+        self._send_unsettled: dict[str, SendJob] = {}
+        self._send_held: dict[str, list[SendJob]] = {}
+        self._send_released: deque[SendJob] = deque()
 
         merge_cfg = dict(config.get("merge") or {})
         self._merge_enabled: bool = bool(merge_cfg.get("enabled", True))
@@ -92,15 +148,71 @@ class WeChatAutoRuntime:
         self._merge_lock = threading.Lock()
         self._merge_buffers: dict[tuple[str, bool], dict[str, Any]] = {}
 
-        self.ws_clients: dict[str, set[Any]] = {}
-        self._ws_clients_lock = threading.Lock()
+        self.started_at = time.time()
+        self._register_metrics(hub.metrics)
 
-        self.stats = {
-            "received": 0,
-            "sent": 0,
-            "ws_connections": 0,
-            "started_at": time.time(),
+    @property
+    def automation_running(self) -> bool:
+        with self._automation_lock:
+            return self._automation_running
+
+    def _register_metrics(self, metrics: MetricsRegistry) -> None:
+        wxid = self.bot_wxid
+        self._counters = {
+            key: metrics.counter(name, doc, ["wxid"]).labels(wxid=wxid) for key, (name, doc) in _ACCOUNT_COUNTERS.items()
+        }
+        self._histograms = {
+            key: (metrics.histogram(name, doc, ["wxid", *labels]), labels)
+            for key, (name, doc, labels) in _MONITOR_HISTOGRAMS.items()
         }
+        gauges = {
+            "wechat_send_queue_depth": ("Send jobs waiting for the send worker", self._send_queue.qsize),
+            "wechat_send_jobs_pending": ("Accepted send jobs not finished yet", lambda: len(self._send_pending)),
+            "wechat_send_acks_in_flight": ("Pipelined sends waiting for their page ACK", lambda: len(self._pending_acks)),
+            "wechat_merge_buffers_open": ("Conversations inside a merge window", lambda: len(self._merge_buffers)),
+            "wechat_automation_running": ("1 while the Selenium automation runs", lambda: int(self.automation_running)),
+        }
+        for name, (doc, fn) in gauges.items():
+            metrics.gauge(name, doc, ["wxid"]).labels(wxid=wxid).set_function(fn)
+        queued = metrics.gauge("wechat_driver_tasks_queued", "Tasks queued for the driver thread", ["wxid", "priority"])
+        for priority, label in PRIORITY_NAMES.items():
+            queued.labels(wxid=wxid, priority=label).set_function(lambda p=priority: self._driver_queued(p))
+
+    def _driver_queued(self, priority: int) -> int:
+        monitor = self._web_monitor
+        return monitor.driver_queue_depth(priority) if monitor is not None else 0
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        self._counters[key].inc(amount)
+
+    def _observe_timing(self, metric: str, seconds: float, labels: dict) -> None:
+        """WebMonitor timing hook -> histograms labelled with this account's wxid."""
+        entry = self._histograms.get(metric)
+        if entry is None:
+            return
+        histogram, names = entry
+        histogram.labels(wxid=self.bot_wxid, **{n: labels.get(n, "") for n in names}).observe(seconds)
+
+    def snapshot_stats(self) -> dict:
+        stats = {key: int(counter.value) for key, counter in self._counters.items()}
+        stats["started_at"] = self.started_at
+        stats["automation_running"] = self.automation_running
+        with self._pending_acks_lock:
+            stats["pending_acks"] = len(self._pending_acks)
+        monitor = self._web_monitor
+        if monitor is not None:
+            try:
+                stats["monitor"] = monitor.get_stats()
+            except Exception:
+                pass
+        return stats
+
+    def driver_profile(self, reset: bool = False) -> Optional[dict]:
+        """WebDriver round trips by command / calling method / cycle (None unless driver_profiler_enabled)."""
+        monitor = self._web_monitor
+        if monitor is None:
+            return None
+        return monitor.driver_profile(reset=reset)
 
     # -----------------------
     # Automation (Selenium)
@@ -124,6 +236,7 @@ class WeChatAutoRuntime:
                 config=monitor_cfg,
                 message_callback=_on_message,
             )
+            self._web_monitor.timing_hook = self._observe_timing
 
             if not self._web_monitor.initialize():
                 self.logger.error("WeChat Web initialization/login failed.")
@@ -131,17 +244,35 @@ class WeChatAutoRuntime:
                 return False
 
             self._automation_running = True
-            self._monitor_thread = threading.Thread(target=self._web_monitor.monitor_messages, daemon=True)
+            self._monitor_thread = threading.Thread(
+                target=self._run_monitor, args=(self._web_monitor,), daemon=True, name=f"wechat_auto_monitor[{self.bot_wxid}]"
+            )
             self._monitor_thread.start()
             self._start_send_worker()
-            self.logger.info("WeChat automation started.")
+            # Recycle a bloated browser only once every accepted send job has finished.
+            self._web_monitor.start_watchdog(quiet_check=self._send_idle)
+            self.logger.info("WeChat automation started: wxid=%s", self.bot_wxid)
             return True
 
+    def _run_monitor(self, monitor: WebMonitor) -> None:
+        try:
+            monitor.monitor_messages()
+        except Exception as exc:
+            self.logger.error("monitor loop crashed: wxid=%s err=%s", self.bot_wxid, exc)
+        with self._automation_lock:
+            lost = self._automation_running and self._web_monitor is monitor
+        if lost:
+            # The loop only ends on its own when the browser is gone (e.g. a failed recycle):
+            # stop reporting a running automation and fail queued sends instead of stalling them.
+            self.logger.error("WeChat automation lost its browser, stopping: wxid=%s", self.bot_wxid)
+            self.stop_automation()
+
     def stop_automation(self) -> None:
         with self._automation_lock:
             self._automation_running = False
             if self._web_monitor:
                 try:
+                    self._web_monitor.stop_watchdog()
                     self._web_monitor.close()
                 except Exception:
                     pass
@@ -155,6 +286,13 @@ class WeChatAutoRuntime:
         if self._send_thread and self._send_thread.is_alive():
             self._send_thread.join(timeout=2)
         self._send_thread = None
+        with self._pending_acks_lock:
+            self._pending_acks.clear()
+            self._acks_to_release.clear()
+        with self._send_order_lock:
+            self._send_unsettled.clear()
+            self._send_held.clear()
+            self._send_released.clear()
         with self._send_pending_lock:
             for job in self._send_pending.values():
                 job.ok = False
@@ -172,22 +310,30 @@ class WeChatAutoRuntime:
                         pass
             self._merge_buffers.clear()
 
+    def _send_idle(self) -> bool:
+        with self._send_pending_lock:
+            return not self._send_pending
+
     def _handle_incoming_from_web_monitor(self, message_data: dict) -> None:
         try:
             contact = message_data.get("from") or message_data.get("sender") or "Unknown"
             content = message_data.get("content") or ""
             ts = message_data.get("timestamp") or time.time()
+            trace = self._tracer.start_inbound(self.bot_wxid, str(contact), observed_at=message_data.get("observed_at"))
 
             is_group = bool(message_data.get("is_group", False))
             if not is_group:
                 try:
                     if self._web_monitor is not None:
-                        is_group = bool(getattr(self._web_monitor, "_is_group_chat")())
+                        # Classification cache lookup; probes the page only for unknown contacts.
+                        is_group = bool(self._web_monitor.is_group_contact(str(contact)))
                 except Exception:
                     is_group = False
 
             if not self._merge_enabled:
-                self._emit_incoming_message(contact=str(contact), content=str(content), ts=float(ts), is_group=is_group)
+                self._emit_incoming_message(
+                    contact=str(contact), content=str(content), ts=float(ts), is_group=is_group, trace=trace
+                )
                 return
 
             key = (str(contact), bool(is_group))
@@ -204,7 +350,8 @@ class WeChatAutoRuntime:
             with self._merge_lock:
                 buf = self._merge_buffers.get(key)
                 if not buf:
-                    buf = {"parts": [], "last_ts": ts_f, "timer": None}
+                    # The first message's trace covers the whole merge window.
+                    buf = {"parts": [], "last_ts": ts_f, "timer": None, "trace": trace}
                     self._merge_buffers[key] = buf
                 buf["parts"].append(content_str)
                 buf["last_ts"] = ts_f
@@ -240,9 +387,11 @@ class WeChatAutoRuntime:
             return
         combined = "\n".join(parts) if len(parts) > 1 else parts[0]
         ts = float(buf.get("last_ts") or time.time())
-        self._emit_incoming_message(contact=contact, content=combined, ts=ts, is_group=is_group)
+        self._emit_incoming_message(contact=contact, content=combined, ts=ts, is_group=is_group, trace=buf.get("trace"))
 
-    def _emit_incoming_message(self, contact: str, content: str, ts: float, is_group: bool) -> None:
+    def _emit_incoming_message(
+        self, contact: str, content: str, ts: float, is_group: bool, trace: Optional[MessageTrace] = None
+    ) -> None:
         from_user = f"{contact}@chatroom" if is_group else str(contact)
         # wechat08 group messages often prefix sender-id line: "<sender>:\n<content>"
         # use a placeholder sender to keep LangBot's wechat08 parser happy.
@@ -267,8 +416,11 @@ class WeChatAutoRuntime:
             "count": 1,
             "messages": [msg],
         }
-        self._outbox.put(PublishItem(account_wxid=self.bot_wxid, payload=payload))
-        self.stats["received"] += 1
+        self._tracer.emitted(trace, from_user, msg_id)
+        self._outbox.put(
+            PublishItem(account_wxid=self.bot_wxid, payload=payload, trace_id=trace.trace_id if trace else "")
+        )
+        self._count("received")
 
     def _start_send_worker(self) -> None:
         if self._send_thread and self._send_thread.is_alive():
@@ -276,25 +428,109 @@ class WeChatAutoRuntime:
 
         def _loop() -> None:
             while True:
-                job = self._send_queue.get()
+                with self._pending_acks_lock:
+                    awaiting_ack = bool(self._pending_acks)
+                try:
+                    job = self._next_send_job(timeout=self._send_ack_poll_sec if awaiting_ack else None)
+                except queue.Empty:
+                    job = False
                 if job is None:
                     return
-                key = (job.to_wxid, job.content)
-                try:
-                    job.ok = self._perform_send_job(job)
-                    if not job.ok and not job.error:
-                        job.error = "send failed"
-                except Exception as exc:
-                    job.ok = False
-                    job.error = str(exc)
-                finally:
-                    job.done.set()
-                    with self._send_pending_lock:
-                        self._send_pending.pop(key, None)
-
-        self._send_thread = threading.Thread(target=_loop, daemon=True, name="wechat_auto_send_worker")
+                batch, stopping = self._drain_send_window(job) if job else ([], False)
+                for group in self._plan_send_batch(batch):
+                    for queued in group:
+                        if not self._hold_behind_unsettled(queued):
+                            self._run_send_job(queued)
+                    # One ACK poll per contact run instead of one per job.
+                    self._verify_pending_acks_safe()
+                if awaiting_ack and not batch:
+                    self._verify_pending_acks_safe()
+                if stopping:
+                    return
+
+        self._send_thread = threading.Thread(target=_loop, daemon=True, name=f"wechat_auto_send_worker[{self.bot_wxid}]")
         self._send_thread.start()
 
+    def _drain_send_window(self, first: SendJob) -> tuple[list[SendJob], bool]:
+        """Collect `first` plus whatever else is queued (up to batch_window); True if the stop sentinel was seen."""
+        batch = [first]
+        deadline = time.time() + self._send_batch_linger_sec
+        while len(batch) < self._send_batch_window:
+            remaining = deadline - time.time()
+            try:
+                job = self._next_send_job(timeout=remaining) if remaining > 0 else self._next_send_job(block=False)
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _next_send_job(self, timeout: Optional[float] = None, block: bool = True) -> Optional[SendJob]:
+        """Released (previously held) jobs first, then the send queue; raises queue.Empty."""
+        with self._send_order_lock:
+            if self._send_released:
+                return self._send_released.popleft()
+        return self._send_queue.get(block=block, timeout=timeout)
+
+    def _hold_behind_unsettled(self, job: SendJob) -> bool:
+        """Hold `job` (True) when an earlier job to the same contact is waiting for its ACK or retry."""
+        key = self._send_batcher.key(job)
+        with self._send_order_lock:
+            earlier = self._send_unsettled.get(key)
+            if earlier is None or earlier is job:
+                return False
+            self._send_held.setdefault(key, []).append(job)
+            return True
+
+    def _release_held(self, job: SendJob) -> None:
+        key = self._send_batcher.key(job)
+        with self._send_order_lock:
+            if self._send_unsettled.get(key) is job:
+                del self._send_unsettled[key]
+                self._send_released.extend(self._send_held.pop(key, []))
+
+    def _plan_send_batch(self, batch: list[SendJob]) -> list[list[SendJob]]:
+        if len(batch) <= 1:
+            return [batch] if batch else []
+        monitor = self._web_monitor
+        active = monitor.active_contact_hint() if monitor is not None else ""
+        groups = self._send_batcher.plan(batch, active_contact=active)
+        self._count("send_batched", len(batch))
+        return groups
+
+    def _run_send_job(self, job: SendJob) -> None:
+        monitor = self._web_monitor
+        if monitor is not None and monitor.active_contact_hint() != _strip_chatroom_suffix(job.to_wxid):
+            self._count("send_chat_switches")
+        self._tracer.mark(job.trace, "send_started")
+        try:
+            finished = self._perform_send_job(job)
+        except Exception as exc:
+            job.ok = False
+            job.error = str(exc)
+            job.state = "failed"
+            finished = True
+        if finished:
+            self._finish_send_job(job)
+
+    def _verify_pending_acks_safe(self) -> None:
+        try:
+            self._verify_pending_acks()
+        except Exception as exc:
+            self.logger.warning("send ack verification failed: %s", exc)
+
+    def _finish_send_job(self, job: SendJob) -> None:
+        if not job.ok and not job.error:
+            job.error = "send failed"
+        if not job.ok:
+            job.state = "failed"
+        job.done.set()
+        self._tracer.finish(job.trace, job.state, job.job_id)
+        with self._send_pending_lock:
+            self._send_pending.pop((job.to_wxid, job.content), None)
+        self._release_held(job)
+
     def enqueue_text(self, to_wxid: str, content: str) -> tuple[bool, int]:
         """
         Enqueue a send job and return (accepted, job_id).
@@ -309,6 +545,7 @@ class WeChatAutoRuntime:
             if not self._automation_running or not self._web_monitor:
                 return False, 0
 
+        received_at = time.time()
         self._start_send_worker()
         key = (to_wxid, content)
         with self._send_pending_lock:
@@ -324,10 +561,13 @@ class WeChatAutoRuntime:
                 max_attempts=self._send_max_attempts,
                 require_ack=self._send_require_ack,
                 ack_timeout_sec=self._send_ack_timeout_sec,
+                # Correlated to the latest inbound message of this conversation (LangBot replies to fromUser).
+                trace=self._tracer.start_reply(self.bot_wxid, to_wxid, received_at=received_at),
             )
             self._send_pending[key] = job
             with self._send_by_id_lock:
                 self._send_by_id[int(job.job_id)] = job
+            self._tracer.mark(job.trace, "enqueued")
             self._send_queue.put(job)
             return True, int(job.job_id)
 
@@ -343,13 +583,19 @@ class WeChatAutoRuntime:
             "done": bool(job.done.is_set()),
             "ok": bool(job.ok),
             "error": str(job.error or ""),
+            "state": str(job.state),
+            "attempts": int(job.attempts),
+            "traceId": job.trace.trace_id if job.trace else "",
+            "stagesMs": job.trace.stages_ms() if job.trace else {},
         }
 
     def _perform_send_job(self, job: SendJob) -> bool:
+        """Run a send job; returns True once the job is finished (ok or failed), False while its ACK is pending."""
+        if job.require_ack and self._send_ack_mode == "pipelined":
+            return self._dispatch_pipelined_send(job)
+
         target = _strip_chatroom_suffix(job.to_wxid)
         max_attempts = max(1, int(job.max_attempts))
-        base = max(0.05, float(self._send_backoff_base_sec))
-        cap = max(base, float(self._send_backoff_max_sec))
 
         for attempt in range(1, max_attempts + 1):
             with self._automation_lock:
@@ -357,25 +603,37 @@ class WeChatAutoRuntime:
                 running = self._automation_running
             if not running or not monitor:
                 job.error = "WeChat automation not initialized"
-                return False
+                job.ok = False
+                return True
 
+            job.attempts = attempt
+            job.state = "sending"
+            final_state = "sent"
             try:
                 if job.require_ack:
-                    ok = bool(monitor.send_message_with_ack(target, job.content, ack_timeout_sec=job.ack_timeout_sec))
+                    ack = monitor.send_message_with_ack_result(target, job.content, ack_timeout_sec=job.ack_timeout_sec)
+                    if ack.state not in ("not_sent", "unarmed"):
+                        # The ACK watch is armed right before Enter: its elapsed time dates the send.
+                        self._tracer.mark(job.trace, "sent", time.time() - ack.elapsed_ms / 1000.0)
+                    ok = bool(ack.ok)
+                    if not ok:
+                        job.error = f"ack {ack.state}"
+                    final_state = "acked" if ack.state == "delivered" else "unconfirmed"
                 else:
                     ok = bool(monitor.send_message(target, job.content))
+                    if ok:
+                        self._tracer.mark(job.trace, "sent")
             except Exception as exc:
                 ok = False
                 job.error = str(exc)
 
             if ok:
-                self.stats["sent"] += 1
-                self._publish_self_send(job.to_wxid, job.content)
+                self._complete_send_job(job, final_state)
                 return True
 
             if attempt < max_attempts:
-                delay = min(cap, base * (1.8 ** (attempt - 1)))
-                delay += random.uniform(0.0, 0.2)
+                delay = self._send_retry_delay(attempt)
+                self._count("send_retries")
                 self.logger.warning(
                     "send retry scheduled: to=%s attempt=%s/%s delay=%.2fs err=%s",
                     job.to_wxid,
@@ -386,8 +644,138 @@ class WeChatAutoRuntime:
                 )
                 time.sleep(delay)
 
+        job.ok = False
+        return True
+
+    def _send_retry_delay(self, attempt: int) -> float:
+        base = max(0.05, float(self._send_backoff_base_sec))
+        cap = max(base, float(self._send_backoff_max_sec))
+        return min(cap, base * (1.8 ** (attempt - 1))) + random.uniform(0.0, 0.2)
+
+    def _complete_send_job(self, job: SendJob, state: str) -> None:
+        job.ok = True
+        job.error = ""
+        job.state = state
+        self._count("sent")
+        if state == "acked":
+            self._count("acked")
+        elif state == "unconfirmed":
+            self._count("ack_unconfirmed")
+        self._publish_self_send(job.to_wxid, job.content)
+
+    def _dispatch_pipelined_send(self, job: SendJob) -> bool:
+        """Send without waiting for the ACK: register the page-side watch and let the verifier settle it."""
+        with self._automation_lock:
+            monitor = self._web_monitor
+            running = self._automation_running
+        if not running or not monitor:
+            job.error = "WeChat automation not initialized"
+            job.ok = False
+            return True
+
+        job.attempts += 1
+        job.state = "sending"
+        try:
+            sent, watch_id = monitor.send_message_arm_ack(_strip_chatroom_suffix(job.to_wxid), job.content)
+        except Exception as exc:
+            sent, watch_id = False, None
+            job.error = str(exc)
+
+        if not sent:
+            # Nothing reached the input box: a confirmed failure, safe to retry.
+            return self._retry_or_fail(job, job.error or "send failed")
+        if not watch_id:
+            # Sent, but the ACK watch could not be armed: no evidence either way, do not resend.
+            self._tracer.mark(job.trace, "sent")
+            self._complete_send_job(job, "unconfirmed")
+            return True
+
+        self._tracer.mark(job.trace, "sent")
+        job.state = "pending_ack"
+        job.ack_watch_id = str(watch_id)
+        job.ack_deadline = time.time() + max(0.1, float(job.ack_timeout_sec))
+        with self._send_order_lock:
+            # A failed ACK means a re-send: nothing later to this contact may overtake it meanwhile.
+            self._send_unsettled[self._send_batcher.key(job)] = job
+        with self._pending_acks_lock:
+            self._pending_acks[job.ack_watch_id] = job
+        return False
+
+    def _retry_or_fail(self, job: SendJob, error: str) -> bool:
+        """Schedule a re-send after backoff; returns True if the job is finished (out of attempts)."""
+        job.error = str(error)
+        if job.attempts >= max(1, int(job.max_attempts)):
+            job.ok = False
+            return True
+        delay = self._send_retry_delay(job.attempts)
+        self._count("send_retries")
+        self.logger.warning(
+            "send retry scheduled: to=%s attempt=%s/%s delay=%.2fs err=%s",
+            job.to_wxid,
+            job.attempts,
+            job.max_attempts,
+            delay,
+            job.error,
+        )
+        job.state = "queued"
+        with self._send_order_lock:
+            self._send_unsettled[self._send_batcher.key(job)] = job
+        timer = threading.Timer(delay, self._send_queue.put, args=(job,))
+        timer.daemon = True
+        timer.start()
         return False
 
+    def _verify_pending_acks(self) -> None:
+        """Settle pending ACKs from the page: delivered -> acked, failed icon -> retry, anything else -> unconfirmed."""
+        with self._pending_acks_lock:
+            pending = dict(self._pending_acks)
+        if not pending:
+            return
+        with self._automation_lock:
+            monitor = self._web_monitor
+        if monitor is None:
+            return
+
+        with self._pending_acks_lock:
+            release, self._acks_to_release = self._acks_to_release, []
+        states = monitor.poll_send_acks(list(pending), release=release)
+        now = time.time()
+        settled: list[str] = []
+        for watch_id, job in pending.items():
+            if states is None:
+                # Page unreachable: give up on confirmation well after the deadline, but never resend.
+                if now < job.ack_deadline + max(0.1, float(job.ack_timeout_sec)):
+                    continue
+                state = "unarmed"
+            else:
+                ack = states.get(watch_id)
+                state = ack.state if ack is not None else "unarmed"
+            expired = now >= job.ack_deadline
+            if state == "delivered":
+                self._complete_send_job(job, "acked")
+                finished = True
+            elif state == "failed":
+                # Failed icon shown on the bubble: the only confirmed failure, safe to resend.
+                self._count("ack_failed")
+                finished = self._retry_or_fail(job, "ack failed")
+            elif expired or state == "unarmed":
+                # Bubble still "sending", no matching bubble seen (re-render, normalized text, chat
+                # switched) or the watch is gone: the message may have been delivered, never resend.
+                self._complete_send_job(job, "unconfirmed")
+                finished = True
+            else:
+                continue
+            settled.append(watch_id)
+            if finished:
+                self._finish_send_job(job)
+
+        if settled:
+            with self._pending_acks_lock:
+                for watch_id in settled:
+                    self._pending_acks.pop(watch_id, None)
+                # Released in-page on the next poll round trip.
+                self._acks_to_release.extend(settled)
+
     def send_text(self, to_wxid: str, content: str) -> bool:
         accepted, job_id = self.enqueue_text(to_wxid, content)
         if not accepted or not job_id:
@@ -426,6 +814,179 @@ class WeChatAutoRuntime:
             # best-effort only
             return
 
+
+class WeChatAutoRuntime:
+    """
+    Gateway runtime that:
+    - hosts one or more WeChat accounts (an AccountRuntime each: own browser profile,
+      monitor thread, send queue and dedup state)
+    - exposes a wechat08-compatible message stream (WS, routed by wxid) + send APIs (HTTP, routed by Wxid)
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.logger = logging.getLogger("wechat_auto_service_v2")
+
+        self._msg_id = count(1)
+        self._outbox: queue.Queue[PublishItem] = queue.Queue()
+        self._send_job_id = count(1)
+        self.metrics = MetricsRegistry()
+        tracing_cfg = dict(config.get("tracing") or {})
+        self.tracer = LatencyTracer(
+            correlation_window_sec=float(tracing_cfg.get("correlation_window_sec", 120)),
+            keep_slowest=int(tracing_cfg.get("keep_slowest", 50)),
+            keep_recent=int(tracing_cfg.get("keep_recent", 200)),
+        )
+        stage_hist = self.metrics.histogram(
+            "wechat_latency_stage_seconds", "End-to-end message latency per stage (see /ws/traces)", ["wxid", "stage"]
+        )
+        self.tracer.on_stage = lambda stage, seconds, wxid: stage_hist.labels(wxid=wxid, stage=stage).observe(seconds)
+        self.metrics.gauge("wechat_outbox_depth", "Messages waiting to be published to websockets").labels().set_function(
+            self._outbox.qsize
+        )
+        self._m_ws_bytes = self.metrics.counter("wechat_ws_sent_bytes_total", "Bytes written to websocket clients", ["wxid"])
+        self._m_ws_messages = self.metrics.counter(
+            "wechat_ws_sent_messages_total", "Payloads written to websocket clients", ["wxid"]
+        )
+        self._m_loop_lag = self.metrics.histogram(
+            "wechat_event_loop_lag_seconds",
+            "Scheduling delay of the asyncio event loop serving each app",
+            ["app"],
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+        )
+
+        self.ws_clients: dict[str, set[Any]] = {}
+        self._ws_clients_lock = threading.Lock()
+
+        self.stats = {
+            "ws_connections": 0,
+            "started_at": time.time(),
+        }
+
+        self.accounts: dict[str, AccountRuntime] = {}
+        for account_cfg in self._account_configs(config):
+            account = AccountRuntime(self, account_cfg)
+            if account.bot_wxid in self.accounts:
+                self.logger.error("duplicate account wxid in config, skipped: %s", account.bot_wxid)
+                continue
+            self.accounts[account.bot_wxid] = account
+
+        ws_clients = self.metrics.gauge("wechat_ws_clients", "Connected websocket clients", ["wxid"])
+        for wxid in self.accounts:
+            ws_clients.labels(wxid=wxid).set_function(lambda w=wxid: len(self.ws_clients.get(w, ())))
+
+        default = next(iter(self.accounts.values()))
+        self.bot_wxid: str = default.bot_wxid
+        self.bot_nickname: str = default.bot_nickname
+
+    @staticmethod
+    def _account_configs(config: dict) -> list[dict]:
+        """
+        Per-account configs. `accounts: [{wxid, nickname, web_monitor?, send?, merge?}, ...]` overrides the
+        top-level sections per account; without it the single `bot` account is used.
+        """
+        accounts = [dict(a) for a in (config.get("accounts") or []) if isinstance(a, dict)]
+        if not accounts:
+            accounts = [dict(config.get("bot") or {})]
+        base_monitor = dict(config.get("web_monitor") or {})
+        result: list[dict] = []
+        for index, account in enumerate(accounts):
+            wxid = str(account.get("wxid") or ("wxid_unknown" if index == 0 else f"wxid_unknown_{index}"))
+            monitor_override = dict(account.get("web_monitor") or {})
+            monitor_cfg = {**base_monitor, **monitor_override}
+            if len(accounts) > 1 and "user_data_dir" not in monitor_override:
+                # One Chrome profile per account: a profile directory cannot be shared by two browsers.
+                base_dir = base_monitor.get("user_data_dir", "wechat_user_data_wechat08_v2")
+                monitor_cfg["user_data_dir"] = f"{base_dir}_{wxid}"
+            if len(accounts) > 1 and int(base_monitor.get("chrome_debug_port") or 0) > 0 and "chrome_debug_port" not in monitor_override:
+                # Detached browsers: one remote-debugging port per account.
+                monitor_cfg["chrome_debug_port"] = int(base_monitor["chrome_debug_port"]) + index
+            result.append(
+                {
+                    "bot": {"wxid": wxid, "nickname": account.get("nickname") or wxid},
+                    "web_monitor": monitor_cfg,
+                    "send": {**dict(config.get("send") or {}), **dict(account.get("send") or {})},
+                    "merge": {**dict(config.get("merge") or {}), **dict(account.get("merge") or {})},
+                }
+            )
+        return result
+
+    def account(self, wxid: Optional[str] = None) -> Optional[AccountRuntime]:
+        """Account for `wxid` (the default account when omitted, or when only one account is hosted)."""
+        if not wxid:
+            return self.accounts.get(self.bot_wxid)
+        account = self.accounts.get(str(wxid))
+        if account is None and len(self.accounts) == 1:
+            return self.accounts.get(self.bot_wxid)
+        return account
+
+    def snapshot_stats(self) -> dict:
+        stats = dict(self.stats)
+        accounts = {wxid: account.snapshot_stats() for wxid, account in self.accounts.items()}
+        for key in ("received", "sent", "acked", "ack_unconfirmed", "ack_failed", "send_retries", "pending_acks"):
+            stats[key] = sum(int(a.get(key, 0)) for a in accounts.values())
+        stats["accounts"] = accounts
+        stats["latency"] = self.tracer.stats()
+        return stats
+
+    def driver_profiles(self, wxid: Optional[str] = None, reset: bool = False) -> dict:
+        accounts = [self.account(wxid)] if wxid else list(self.accounts.values())
+        return {a.bot_wxid: a.driver_profile(reset=reset) for a in accounts if a is not None}
+
+    # -----------------------
+    # Automation (all accounts)
+    # -----------------------
+    def start_automation(self) -> bool:
+        """Start every account (logins run in parallel); True if all accounts started."""
+        accounts = list(self.accounts.values())
+        if len(accounts) == 1:
+            return accounts[0].start_automation()
+        results: dict[str, bool] = {}
+
+        def _start(account: AccountRuntime) -> None:
+            results[account.bot_wxid] = account.start_automation()
+
+        threads = [
+            threading.Thread(target=_start, args=(a,), daemon=True, name=f"wechat_auto_start[{a.bot_wxid}]")
+            for a in accounts
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        failed = [wxid for wxid, ok in results.items() if not ok]
+        if failed:
+            self.logger.error("automation failed to start for: %s", ", ".join(failed))
+        return not failed
+
+    def stop_automation(self) -> None:
+        for account in self.accounts.values():
+            account.stop_automation()
+
+    # -----------------------
+    # Send (routed by wxid)
+    # -----------------------
+    def enqueue_text(self, to_wxid: str, content: str, wxid: Optional[str] = None) -> tuple[bool, int]:
+        account = self.account(wxid)
+        if account is None:
+            return False, 0
+        return account.enqueue_text(to_wxid, content)
+
+    def send_text(self, to_wxid: str, content: str, wxid: Optional[str] = None) -> bool:
+        account = self.account(wxid)
+        if account is None:
+            return False
+        return account.send_text(to_wxid, content)
+
+    def get_send_job(self, job_id: int) -> Optional[dict]:
+        # Job ids are unique across accounts.
+        for account in self.accounts.values():
+            job = account.get_send_job(job_id)
+            if job:
+                job["wxid"] = account.bot_wxid
+                return job
+        return None
+
     def enqueue_test_payload(self, wxid: Optional[str] = None) -> None:
         wxid = wxid or self.bot_wxid
         payload = {
@@ -467,6 +1028,12 @@ class WeChatAutoRuntime:
                     await ws.send_text(text)
                 except Exception:
                     stale.append(ws)
+            delivered = len(clients) - len(stale)
+            if delivered:
+                self._m_ws_messages.labels(wxid=item.account_wxid).inc(delivered)
+                self._m_ws_bytes.labels(wxid=item.account_wxid).inc(delivered * len(text.encode("utf-8")))
+            if item.trace_id and delivered:
+                self.tracer.published(item.trace_id)
             if stale:
                 with self._ws_clients_lock:
                     for ws in stale:
@@ -476,6 +1043,15 @@ class WeChatAutoRuntime:
                         del self.ws_clients[item.account_wxid]
                     self.stats["ws_connections"] = sum(len(v) for v in self.ws_clients.values())
 
+    async def event_loop_lag_loop(self, app_name: str, interval_sec: float = 0.5) -> None:
+        """Observe how late the event loop wakes up from a fixed sleep (blocking handlers show up here)."""
+        histogram = self._m_loop_lag.labels(app=app_name)
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval_sec
+            await asyncio.sleep(interval_sec)
+            histogram.observe(max(0.0, loop.time() - expected))
+
     # -----------------------
     # Response helpers
     # -----------------------
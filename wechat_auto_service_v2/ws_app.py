@@ -17,10 +17,12 @@ def _resolve_wxid_from_request(ws: WebSocket, fallback: str) -> str:
 def create_ws_app(runtime: WeChatAutoRuntime) -> FastAPI:
     async def lifespan(app: FastAPI):
         task = asyncio.create_task(runtime.ws_broadcast_loop(), name="wechat08-ws-broadcast-loop")
+        lag_task = asyncio.create_task(runtime.event_loop_lag_loop("ws"), name="wechat08-ws-loop-lag")
         yield
-        task.cancel()
-        with contextlib.suppress(Exception):
-            await task
+        for t in (task, lag_task):
+            t.cancel()
+            with contextlib.suppress(BaseException):
+                await t
 
     import contextlib
 
@@ -32,7 +34,19 @@ def create_ws_app(runtime: WeChatAutoRuntime) -> FastAPI:
 
     @app.get("/ws/stats")
     def stats() -> dict:
-        return runtime.ok(runtime.stats)
+        return runtime.ok(runtime.snapshot_stats())
+
+    @app.get("/ws/traces")
+    def traces(limit: int = 20, order: str = "slowest") -> dict:
+        # Finished reply traces: per-stage latency from DOM detection to send ACK.
+        limit = max(1, min(int(limit), 500))
+        records = runtime.tracer.recent(limit) if order == "recent" else runtime.tracer.slowest(limit)
+        return runtime.ok({"order": "recent" if order == "recent" else "slowest", "traces": records})
+
+    @app.get("/ws/driver_profile")
+    def driver_profile(wxid: Optional[str] = None, reset: bool = False) -> dict:
+        # WebDriver round trips per command / WebMonitor method / cycle and send (web_monitor.driver_profiler_enabled).
+        return runtime.ok({"accounts": runtime.driver_profiles(wxid=wxid, reset=reset)})
 
     @app.post("/msg/SyncMessage/{wxid}")
     def sync_message(wxid: str) -> dict: